@@ -2,6 +2,7 @@
 Generates solcmc contracts from versions and properties files.
 """
 from setup.instrumentation import instrument_contracts
+from setup import manifest
 from pathlib import Path
 import argparse
 import glob
@@ -23,6 +24,11 @@ def main(args):
             '--output',
             '-o',
             help='Output directory path.',)
+    parser.add_argument(
+            '--jobs',
+            '-j',
+            type=int,
+            help='Max number of instrumentation processes (default: number of cores).')
     args = parser.parse_args(args)
 
     versions = Path(args.versions)
@@ -41,15 +47,18 @@ def main(args):
             if os.path.isdir(args.properties)
             else [args.properties])
 
-    contracts = instrument_contracts(versions_paths, properties_paths)
+    if args.output:
+        # Only contracts whose inputs changed are rewritten
+        result = manifest.build(versions_paths, properties_paths, args.output, args.jobs)
+        print(f'{len(result["written"])} written, '
+              f'{len(result["unchanged"])} unchanged, '
+              f'{len(result["removed"])} removed.')
+        return
+
+    contracts = instrument_contracts(versions_paths, properties_paths, args.jobs)
 
     for filename in contracts.keys():
-        if args.output:
-            output = Path(args.output)
-            with open(output.joinpath(filename), 'w+') as f:
-                f.write(contracts[filename])
-        else:
-            print(contracts[filename])
+        print(contracts[filename])
 
 if __name__ == '__main__':
         import sys
@@ -44,6 +44,7 @@ def normalize_truth_value(value):
         'N!': "FALSE",
         'UNK': "UNK",
         'ERR': "UNK",
+        'OOM': "UNK",
         'PARSE_ERROR' : "UNK",
         'UNKNOWN': "UNK",
         'TRUE': "TRUE",
@@ -166,7 +167,10 @@ def determine_solcmc_best(row):
     return res
 
 def add_column_solcmc_best(result_df):
-    if 'solcmc-z3' in result_df.columns and 'solcmc-eld' in result_df.columns:
+    if 'solcmc-best' in result_df.columns and result_df['solcmc-best'].notna().any():
+        # Recorded by the solcmc portfolio mode
+        print("\nUsing 'solcmc-best' from solcmc-best.csv.")
+    elif 'solcmc-z3' in result_df.columns and 'solcmc-eld' in result_df.columns:
         result_df['solcmc-best'] = result_df[['solcmc-z3', 'solcmc-eld']].apply(determine_solcmc_best, axis=1)
     else:
         print("\nWarning: One or both of 'solcmc-z3' and 'solcmc-eld' columns not found, cannot add 'solcmc-best'.")
@@ -222,7 +226,7 @@ def merge_verification_results(csv_files, output_path, args):
     })
     
     # Add columns for each CSV file
-    expected_files = ['ground-truth', 'certora', 'solcmc-z3', 'solcmc-eld', 'gpt-5']
+    expected_files = ['ground-truth', 'certora', 'solcmc-z3', 'solcmc-eld', 'gpt-5', 'solcmc-best']
     
     for file_key in expected_files:
         column_name = 'ground' if file_key == 'ground-truth' else file_key
@@ -357,6 +361,11 @@ Examples:
             csv_files.append(file_path)
         else:
             print(f"⚠ Warning: {filename} not found in {folder_path}")
+
+    # Written by the solcmc portfolio mode only
+    solcmc_best_path = os.path.join(folder_path, 'solcmc-best.csv')
+    if os.path.exists(solcmc_best_path):
+        csv_files.append(solcmc_best_path)
     
     if not csv_files:
         print(f"✗ No expected CSV files found in {folder_path}")
@@ -45,6 +45,7 @@ def normalize_truth_value(value):
         'UNK': "UNK",
         'UNKNOWN': "UNK",
         'ERR': "UNK",
+        'OOM': "UNK",
         'PARSE_ERROR' : "UNK",
         'TRUE': "TRUE",
         'FALSE': "FALSE",
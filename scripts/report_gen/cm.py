@@ -2,7 +2,8 @@ import argparse
 import logging
 import utils
 from utils import (UNKNOWN,
-                   ERROR)
+                   ERROR,
+                   OUT_OF_MEMORY)
 import glob
 import re
 import csv
@@ -17,6 +18,8 @@ def get_result(gt: str, out: str) -> str:
         return ERROR
     if out == UNKNOWN:
         return UNKNOWN
+    if out == OUT_OF_MEMORY:
+        return OUT_OF_MEMORY
     if gt == '0':
         if out[0] == 'N':       # e.g 'N!'[0]
             return 'T' + out    # TN
@@ -165,3 +165,45 @@ def scoring_to_csv(results: dict) -> list:
         rows.append(tool_row)
 
     return rows
+
+
+def sum_timings(timings_paths: list) -> dict:
+    """
+    Sums the resource usage of the verification tasks in a list of timings.csv
+    files.
+
+    Returns the number of tasks, the total wall and CPU times (in seconds) and
+    the peak RSS (in KiB) over all tasks. Missing values are skipped.
+    """
+    totals = {'tasks': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'max_rss': 0}
+
+    for timings_path in timings_paths:
+        with open(timings_path, 'r') as f:
+            for row in csv.DictReader(f):
+                totals['tasks'] += 1
+                if row['wall_time']:
+                    totals['wall_time'] += float(row['wall_time'])
+                if row['cpu_time']:
+                    totals['cpu_time'] += float(row['cpu_time'])
+                if row['max_rss']:
+                    totals['max_rss'] = max(totals['max_rss'], int(row['max_rss']))
+
+    return totals
+
+
+def timings_to_csv(timings: dict) -> list:
+    """
+    Converts the summed timings of each tool to a list of rows suitable for
+    writing to a CSV file.
+    """
+    header = ['tools', 'tasks', 'wall_time', 'cpu_time', 'max_rss']
+    rows = [header]
+
+    for tool, totals in timings.items():
+        rows.append([tool,
+                     totals['tasks'],
+                     f"{totals['wall_time']:.3f}",
+                     f"{totals['cpu_time']:.3f}",
+                     totals['max_rss']])
+
+    return rows
@@ -0,0 +1,110 @@
+"""
+Imports the CSVs of the use cases into the results store, exports them back
+from it, and queries it (see tools/store.py).
+
+Usage:
+    python results_store.py --import [--usecases bank htlc]
+    python results_store.py --export certora [--usecases bank] [--output-dir build]
+    python results_store.py --query "SELECT * FROM results WHERE tool = 'certora' AND result = 'FN!'"
+"""
+from pathlib import Path
+import argparse
+import csv
+import sys
+
+from tools import store
+from setup.usecases import find_usecases
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+def import_usecases(results_store, usecases):
+    '''
+    Imports the ground truth and the CSVs of the tools of the use cases.
+
+    Returns:
+        int: Number of rows imported.
+    '''
+    rows = 0
+    for usecase in usecases:
+        for path in sorted(usecase.path.glob('*.csv')):
+            count = results_store.import_csv(path, usecase.name)
+            if count is None:
+                print(f'{path}: skipped, unknown columns.')
+                continue
+            rows += count
+    return rows
+
+
+def export_usecases(results_store, usecases, tool, output_dir=None):
+    '''
+    Writes <tool>.csv of the use cases, in their directories or in
+    output_dir/<use case>/.
+    '''
+    for usecase in usecases:
+        path = usecase.path.joinpath(f'{tool}.csv')
+        if output_dir:
+            path = Path(output_dir).joinpath(usecase.name, f'{tool}.csv')
+            path.parent.mkdir(parents=True, exist_ok=True)
+        count = results_store.export_csv(usecase.name, tool, path)
+        if count:
+            print(f'{path}: {count} outcomes.')
+        elif not output_dir and path.is_file() and path.stat().st_size == 0:
+            path.unlink()
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+            '--store',
+            default=store.DEFAULT_STORE,
+            help=f'Results store (default: {store.DEFAULT_STORE}).')
+    parser.add_argument(
+            '--root',
+            '-r',
+            default=ROOT_DIR,
+            help='Benchmark root directory, with contracts/ and regression/.')
+    parser.add_argument(
+            '--usecases',
+            '-u',
+            nargs='+',
+            help='Import or export these use cases only (directory names).')
+    parser.add_argument(
+            '--import',
+            dest='import_csvs',
+            action='store_true',
+            help='Import the ground truth and the CSVs of the tools of the use cases.')
+    parser.add_argument(
+            '--export',
+            metavar='TOOL',
+            help='Write <TOOL>.csv of the use cases from the store, e.g. certora.')
+    parser.add_argument(
+            '--output-dir',
+            '-o',
+            help='With --export, write <output-dir>/<use case>/<TOOL>.csv instead.')
+    parser.add_argument(
+            '--query',
+            '-q',
+            help='SQL query, whose rows are printed as CSV.')
+    args = parser.parse_args(args)
+
+    if not (args.import_csvs or args.export or args.query):
+        parser.error('one of --import, --export or --query is required.')
+
+    with store.Store(args.store) as results_store:
+        if args.import_csvs or args.export:
+            usecases = find_usecases(args.root, args.usecases)
+        if args.import_csvs:
+            rows = import_usecases(results_store, usecases)
+            print(f'{rows} rows imported from {len(usecases)} use cases into {args.store}.')
+        if args.export:
+            export_usecases(results_store, usecases, args.export, args.output_dir)
+        if args.query:
+            cursor = results_store.query(args.query)
+            writer = csv.writer(sys.stdout)
+            writer.writerow([column[0] for column in cursor.description or []])
+            writer.writerows(cursor)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,205 @@
+"""
+Runs the experiments of every use case in contracts/ and regression/ from a
+single work queue, then writes the results back into each use case.
+
+Usage:
+    python run_benchmark.py [--usecases bank htlc] [--tools solcmc certora]
+"""
+from pathlib import Path
+import argparse
+
+import utils
+from tools import cache, scheduler, store
+from tools import solcmc, certora
+from tools.journal import Journal, JOURNAL_FILE
+from setup.usecases import find_usecases
+
+ROOT_DIR = Path(__file__).parents[1]
+TOOLS = ['solcmc', 'certora']
+SOLVERS = ['z3', 'eld']
+
+
+def solcmc_tasks(usecase, solvers, timeout, cache_dir, memory_limit=None):
+    '''
+    Returns:
+        list: [(job, output_dir, summary_csv), ...]
+    '''
+    tasks = []
+    contracts_paths = usecase.solcmc_contracts()
+
+    for solver in solvers:
+        output_dir = usecase.solcmc_output_dir(solver)
+        logs_dir = output_dir.joinpath('logs')
+        logs_dir.mkdir(parents=True, exist_ok=True)
+        peak_rss = utils.read_peak_rss(output_dir.joinpath(utils.TIMINGS_FILE))
+        for job in solcmc.make_jobs(contracts_paths, timeout, solver, cache_dir, logs_dir,
+                                    memory_limit, peak_rss):
+            tasks.append((job, output_dir, usecase.solcmc_csv(solver)))
+
+    return tasks
+
+
+def certora_tasks(usecase, only_ground_truth, cache_dir, memory_limit=None):
+    '''
+    Returns:
+        list: [(job, output_dir, summary_csv), ...]
+    '''
+    contracts_paths, specs_paths = usecase.certora_inputs()
+    peak_rss = utils.read_peak_rss(usecase.certora_output_dir().joinpath(utils.TIMINGS_FILE))
+    jobs = certora.make_jobs(contracts_paths, specs_paths, only_ground_truth,
+                             cache_dir, cwd=str(usecase.path),
+                             memory_limit=memory_limit, peak_rss=peak_rss)
+
+    return [(job, usecase.certora_output_dir(), usecase.certora_csv()) for job in jobs]
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+            '--root',
+            '-r',
+            default=ROOT_DIR,
+            help='Benchmark root directory, with contracts/ and regression/.')
+    parser.add_argument(
+            '--usecases',
+            '-u',
+            nargs='+',
+            help='Run experiments on these use cases only (directory names).')
+    parser.add_argument(
+            '--tools',
+            nargs='+',
+            choices=TOOLS,
+            default=['solcmc'],
+            help='Tools to run (default: solcmc).')
+    parser.add_argument(
+            '--solvers',
+            '-s',
+            nargs='+',
+            choices=SOLVERS,
+            default=SOLVERS,
+            help='Solcmc model checkers (default: z3 eld).')
+    parser.add_argument(
+            '--timeout',
+            '-t',
+            default=solcmc.DEFAULT_TIMEOUT,
+            help=f'Solcmc timeout (default: {solcmc.DEFAULT_TIMEOUT}).')
+    parser.add_argument(
+            '--jobs',
+            '-j',
+            type=int,
+            help='Max number of parallel processes (default: number of cores).')
+    parser.add_argument(
+            '--certora-jobs',
+            type=int,
+            default=certora.MAX_JOBS,
+            help=f'Max number of Certora jobs in flight (default: {certora.MAX_JOBS}).')
+    parser.add_argument(
+            '--memory-limit',
+            help='Max memory (address space) of each tool process, e.g. 8G: '
+                 f'tasks exceeding it are {utils.OUT_OF_MEMORY}.')
+    parser.add_argument(
+            '--memory-budget',
+            help='Max memory of all the running processes, e.g. 48G: a task starts when '
+                 'its peak RSS in the last run (timings.csv) fits in the budget left.')
+    parser.add_argument(
+            '--only_ground_truth',
+            action='store_true',
+            help='Limit Certora experiments to tasks with a ground truth.')
+    parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always run the tools, ignoring and not updating cached outcomes.')
+    parser.add_argument(
+            '--cache-dir',
+            default=cache.DEFAULT_CACHE_DIR,
+            help=f'Outcomes cache directory (default: {cache.DEFAULT_CACHE_DIR}).')
+    parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=f'Skip the tasks already completed in the output directories ({JOURNAL_FILE}), '
+                 'e.g. after a crash or an interrupted run.')
+    parser.add_argument(
+            '--store',
+            default=store.DEFAULT_STORE,
+            help=f'Results store, also written with the outcomes (default: {store.DEFAULT_STORE}).')
+    parser.add_argument(
+            '--no-store',
+            action='store_true',
+            help='Do not write the outcomes to the results store.')
+    args = parser.parse_args(args)
+
+    memory_limit = memory_budget = None
+    try:
+        if args.memory_limit:
+            memory_limit = utils.parse_memory(args.memory_limit)
+        if args.memory_budget:
+            memory_budget = utils.parse_memory(args.memory_budget)
+    except ValueError as e:
+        parser.error(str(e))
+
+    solcmc_cache_dir = None
+    certora_cache_dir = None
+    if not args.no_cache:
+        solcmc_cache_dir = Path(args.cache_dir).joinpath(solcmc.CACHE_SUBDIR)
+        certora_cache_dir = Path(args.cache_dir).joinpath(certora.CACHE_SUBDIR)
+
+    usecases = find_usecases(args.root, args.usecases)
+
+    # Enumerate all tasks in a single queue
+    tasks = []
+    for usecase in usecases:
+        if 'solcmc' in args.tools:
+            tasks += solcmc_tasks(usecase, args.solvers, args.timeout, solcmc_cache_dir, memory_limit)
+        if 'certora' in args.tools:
+            tasks += certora_tasks(usecase, args.only_ground_truth, certora_cache_dir, memory_limit)
+
+    # One journal per output directory, {output_dir: (journal, summary_csv)}
+    journals = {}
+    for _, output_dir, summary_csv in tasks:
+        if output_dir not in journals:
+            journals[output_dir] = (Journal(output_dir.joinpath(JOURNAL_FILE), args.resume), summary_csv)
+
+    # Job ids must be unique across use cases
+    destinations = {}   # {job_id: (task_id, output_dir)}
+    jobs = []
+    for job, output_dir, _ in tasks:
+        task_id = job.id
+        if task_id in journals[output_dir][0].records:
+            continue
+        job.id = f'{output_dir}:{task_id}'
+        destinations[job.id] = (task_id, output_dir)
+        jobs.append(job)
+
+    print(f'{len(jobs)} tasks from {len(usecases)} use cases.')
+
+    def on_result(job, result):
+        task_id, output_dir = destinations[job.id]
+        log_path = output_dir.joinpath('logs', task_id + '.log')
+        if result[1] is not None:   # else streamed to the log file by the job
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            utils.write_log(log_path, result[1])
+        timeout = args.timeout if job.tool == solcmc.TOOL else None
+        journals[output_dir][0].add(task_id, result[0], job.usage, log_path, timeout=timeout)
+
+    # The results are written back from the journals, also if the run is interrupted
+    try:
+        scheduler.run(jobs, args.jobs,
+                      limits={certora.TOOL: args.certora_jobs},
+                      on_result=on_result,
+                      rates={certora.TOOL: certora.SUBMIT_RATE},
+                      memory=memory_budget)
+    finally:
+        with store.open_store(None if args.no_store else args.store) as results_store:
+            for output_dir, (journal, summary_csv) in sorted(journals.items()):
+                journal.close()
+                out_csv_path = journal.write_csvs(output_dir, summary_csv, results_store)
+                print(f'{out_csv_path}: {len(journal.records)} outcomes.')
+
+    for cache_dir in [solcmc_cache_dir, certora_cache_dir]:
+        if cache_dir:
+            cache.evict(cache_dir)
+
+
+if __name__ == '__main__':
+        import sys
+        main(sys.argv[1:])
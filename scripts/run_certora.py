@@ -1,7 +1,9 @@
 """
 Operates on either a single file or every file within a directory.
 """
-from tools.certora import run_all
+from tools.certora import run_all, CACHE_SUBDIR, MAX_JOBS, TRACKER_FILE, POLL_INTERVAL
+from tools import cache, store
+from tools.journal import Journal, JOURNAL_FILE
 from pathlib import Path
 import argparse
 import utils
@@ -36,9 +38,69 @@ def main(args):
             '--only_ground_truth', 
             action='store_true', required=False, default=False, 
             help="limit experiments to verification tasks which have a ground truth in ground-truth.csv")
+    parser.add_argument(
+            '--jobs',
+            '-j',
+            type=int,
+            default=MAX_JOBS,
+            help=f'Max number of jobs submitted in parallel (default: {MAX_JOBS}).')
+    parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Verify the specs of a version with the same methods block and only '
+                 'rules and invariants in a single job.')
+    parser.add_argument(
+            '--async',
+            dest='async_mode',
+            action='store_true',
+            help=f'Submit all jobs without waiting, record them in {TRACKER_FILE} '
+                 'in the output directory, then poll their results. '
+                 'Jobs submitted by an interrupted run are polled, not resubmitted.')
+    parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help=f'Seconds between two polls of a job with --async (default: {POLL_INTERVAL}).')
+    parser.add_argument(
+            '--memory-limit',
+            help='Max memory (address space) of each local certoraRun process, e.g. 4G: '
+                 f'tasks exceeding it are {utils.OUT_OF_MEMORY}.')
+    parser.add_argument(
+            '--memory-budget',
+            help='Max memory of all the local certoraRun processes, e.g. 16G: a job starts '
+                 'when its peak RSS in the last run (timings.csv) fits in the budget left.')
+    parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always submit jobs, ignoring and not updating cached outcomes.')
+    parser.add_argument(
+            '--cache-dir',
+            help=f'Outcomes cache directory (default: {cache.DEFAULT_CACHE_DIR}).')
+    parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=f'Skip the tasks already completed in the output directory ({JOURNAL_FILE}), '
+                 'e.g. after a crash or an interrupted run.')
+    parser.add_argument(
+            '--store',
+            default=store.DEFAULT_STORE,
+            help=f'Results store, also written with the outcomes (default: {store.DEFAULT_STORE}).')
+    parser.add_argument(
+            '--no-store',
+            action='store_true',
+            help='Do not write the outcomes to the results store.')
 
     args = parser.parse_args(args)
 
+    memory_limit = memory_budget = None
+    try:
+        if args.memory_limit:
+            memory_limit = utils.parse_memory(args.memory_limit)
+        if args.memory_budget:
+            memory_budget = utils.parse_memory(args.memory_budget)
+    except ValueError as e:
+        parser.error(str(e))
+
     contracts = Path(args.contracts)
     specs = Path(args.specs)
 
@@ -63,35 +125,33 @@ def main(args):
     if args.property:
         specs_paths = [s for s in specs_paths if args.property in s]
 
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = Path(args.cache_dir or cache.DEFAULT_CACHE_DIR).joinpath(CACHE_SUBDIR)
+
+    tracker_path = None
+    if args.async_mode:
+        tracker_path = Path(args.output or '.').joinpath(TRACKER_FILE)
+
     if args.output:
         output_dir = Path(args.output)
         logs_dir = output_dir.joinpath('logs/')
 
-        outcomes = run_all(contracts_paths, specs_paths, args.only_ground_truth, logs_dir)
-        
-        verification_tasks = []
-        out_csv = [utils.OUT_HEADER]
-        out_csv_path = output_dir.joinpath('out.csv')
-        for id in outcomes.keys():
-            p = id.split('_')[0]
-            v = id.split('_')[1]
-            out_csv.append([p, v, outcomes[id]])
-            verification_tasks.append([p, v])
-
-        existing_rows = utils.read_csv(out_csv_path)
-        for existing_row in existing_rows:
-            existing_verification_task = existing_row[:2]
-            if existing_verification_task in verification_tasks:
-                continue
-            if existing_verification_task == ['property','version']:
-                continue
-            out_csv.append(existing_row)      
-            
-        utils.write_csv(out_csv_path, out_csv)
-        certora_csv_path = output_dir.joinpath('../certora.csv')
-        utils.merge_csvs(out_csv_path, certora_csv_path)
+        peak_rss = utils.read_peak_rss(output_dir.joinpath(utils.TIMINGS_FILE))
+        journal = Journal(output_dir.joinpath(JOURNAL_FILE), args.resume)
+        # The csvs are written from the journal, also if the run is interrupted
+        try:
+            run_all(contracts_paths, specs_paths, args.only_ground_truth, logs_dir, cache_dir, args.jobs,
+                    tracker_path, args.poll_interval, args.batch, None,
+                    memory_limit, memory_budget, peak_rss, journal)
+        finally:
+            journal.close()
+            with store.open_store(None if args.no_store else args.store) as results_store:
+                journal.write_csvs(output_dir, output_dir.joinpath('../certora.csv'), results_store)
     else:
-        run_all(contracts_paths, specs_paths, args.only_ground_truth)
+        run_all(contracts_paths, specs_paths, args.only_ground_truth, cache_dir=cache_dir, max_jobs=args.jobs,
+                tracker_path=tracker_path, poll_interval=args.poll_interval, batch=args.batch,
+                memory_limit=memory_limit, memory_budget=memory_budget)
 
 
 if __name__ == '__main__':
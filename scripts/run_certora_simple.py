@@ -12,6 +12,8 @@ parser.add_argument('--timeout', action='store', required=False, default="600",
                     help="timeout for each verification task")
 parser.add_argument('--only_ground_truth', action='store_true', required=False, default=False, 
                     help="limit experiments to verification tasks which have a ground truth in ground-truth.csv")
+parser.add_argument('--no_cache', action='store_true', required=False, default=False,
+                    help="always submit jobs, ignoring cached outcomes")
 
 args = parser.parse_args()
 
@@ -31,6 +33,9 @@ if args.version:
 if args.only_ground_truth:
     args_certora += ["--only_ground_truth"]
 
+if args.no_cache:
+    args_certora += ["--no-cache"]
+
 # TODO
 #if args.timeout:
 #    args_certora += ["--timeout", args.timeout]
@@ -3,67 +3,35 @@ Script to launch Halmos within the benchmark framework and format the results fo
 """
 from pathlib import Path
 import argparse
-import subprocess
 import csv
-import sys
-import re
 import utils
+from tools import halmos, store
 
-def run_halmos_for_task(p, v, halmos_dir, output_dir):
-    """
-    Executes Halmos for a specific property and version, then parses the text output.
-    Saves dedicated execution log files inside the build artifacts directory.
-    """
-    target_test = f"check_{p.replace('-', '_')}"
-    print(f"Running Halmos verification for property: '{p}', version: '{v}'...")
-    
-    try:
-        # Execute Halmos capturing both stdout and stderr
-        halmos_res = subprocess.run(["halmos"], cwd=halmos_dir, capture_output=True, text=True)
-        output = halmos_res.stdout + halmos_res.stderr
-        
-        logs_dir = Path(output_dir).joinpath("logs")
-        logs_dir.mkdir(parents=True, exist_ok=True)
-        log_filename = f"{v}_{p}.log"
-        utils.write_log(logs_dir.joinpath(log_filename), output)
-        # ---------------------------------------------------
-        
-        # Strip ANSI escape color codes from the terminal output to get clean text
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        clean_output = ansi_escape.sub('', output)
-        
-        # --- UNIVERSAL CASE-INSENSITIVE REGEX PARSING ---
-        pass_pattern = rf"\[PASS\]\s+{target_test}\s*\(.*?\)"
-        fail_pattern = rf"\[FAIL\]\s+{target_test}\s*\(.*?\)"
-        
-        if re.search(pass_pattern, clean_output, re.IGNORECASE):
-            return utils.STRONG_POSITIVE  # Maps to 'P!' (Property holds / No Bug)
-        elif re.search(fail_pattern, clean_output, re.IGNORECASE):
-            return utils.STRONG_NEGATIVE  # Maps to 'N!' (Property violated / Bug Detected)
-        else:
-            if target_test.lower() in clean_output.lower():
-                if "pass" in clean_output.lower() and "fail" not in clean_output.lower():
-                    return utils.STRONG_POSITIVE
-                elif "fail" in clean_output.lower():
-                    return utils.STRONG_NEGATIVE
-            return utils.UNKNOWN
-        
-    except Exception as e:
-        print(f"Error during Halmos execution for {p}: {e}")
-        return utils.ERROR                # Maps to 'ERR'
-    
 def main(args_list=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('--contracts', '-c', help='Contracts file or directory.', required=True)
     parser.add_argument('--output', '-o', help='Output directory.', required=True)
     parser.add_argument('--version', '-v', help='Run on this version only.', required=False)
     parser.add_argument('--property', '-p', help='Run on this property only.', required=False)
+    parser.add_argument('--escalate', '-e', required=False,
+                        help='Comma separated increasing solver timeouts, e.g. 1s,10s,1m: '
+                             'run all tasks with the first one, then re-run UNK tasks with the next ones.')
+    parser.add_argument('--store', default=store.DEFAULT_STORE,
+                        help=f'Results store, also written with the outcomes (default: {store.DEFAULT_STORE}).')
+    parser.add_argument('--no-store', action='store_true', help='Do not write the outcomes to the results store.')
     
     if args_list is not None:
         args = parser.parse_args(args_list)
     else:
         args = parser.parse_args()
 
+    timeouts = [None]
+    if args.escalate:
+        try:
+            timeouts = utils.parse_timeouts(args.escalate)
+        except ValueError as e:
+            parser.error(str(e))
+
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
     halmos_dir = Path("./halmos")
@@ -85,33 +53,48 @@ def main(args_list=None):
         else:
             tasks.append(("unknown-property", "v1"))
 
+    logs_dir = output_dir.joinpath("logs")
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    # Halmos runs once for all pending tasks, then results are demultiplexed
     current_results = {}
-    for p, v in tasks:
-        # Pass both directories: halmos_dir for context execution, output_dir for clean log writing
-        res = run_halmos_for_task(p, v, halmos_dir, output_dir)
-        current_results[(p, v)] = res
+    reached = {}
+    usages = {}
+    pending = tasks
+    for timeout in timeouts:
+        timeout_ms = None
+        if timeout:
+            print(f"Solver timeout {timeout}: {len(pending)} tasks.")
+            timeout_ms = int(utils.parse_timeout(timeout) * 1000)
+        else:
+            print(f"Running Halmos verification for {len(pending)} tasks...")
 
-    out_csv_path = output_dir.joinpath('out.csv')
-    existing_rows = []
-    if out_csv_path.exists():
-        try:
-            with open(out_csv_path, 'r') as f:
-                reader = csv.reader(f)
-                next(reader)
-                for row in reader:
-                    if row:
-                        if (row[0], row[1]) not in current_results:
-                            existing_rows.append(row)
-        except Exception:
-            pass
+        # The whole suite on the first run, only the UNK tests afterwards
+        only_tasks = bool(args.property) or pending is not tasks
+        outcomes, logs, output = halmos.run_all(pending, halmos_dir, timeout_ms, only_tasks, usages)
+        utils.write_log(logs_dir.joinpath(f"halmos-{timeout}.log" if timeout else "halmos.log"), output)
 
-    out_csv = [utils.OUT_HEADER] + existing_rows
-    for (p, v), res in current_results.items():
-        out_csv.append([p, v, res])
+        for p, v in pending:
+            utils.write_log(logs_dir.joinpath(f"{v}_{p}.log"), logs[(p, v)])
+            current_results[(p, v)] = outcomes[(p, v)]
+            reached[(p, v)] = timeout
+        pending = [(p, v) for p, v in pending if current_results[(p, v)] == utils.UNKNOWN]
+        if not pending:
+            break
 
-    with open(out_csv_path, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerows(out_csv)
+    out_csv_path = output_dir.joinpath('out.csv')
+    utils.update_out_csv(out_csv_path,
+                         {f'{p}_{v}': res for (p, v), res in current_results.items()},
+                         {f'{p}_{v}': t for (p, v), t in reached.items() if t} if args.escalate else None)
+    utils.update_timings_csv(output_dir.joinpath(utils.TIMINGS_FILE),
+                             {f'{p}_{v}': usage for (p, v), usage in usages.items()})
+    # Run from the use case directory, see ground-truth.csv above
+    with store.open_store(None if args.no_store else args.store) as results_store:
+        if results_store is not None:
+            results_store.put_usecase(Path.cwd(), 'halmos',
+                                      {f'{p}_{v}': res for (p, v), res in current_results.items()},
+                                      {f'{p}_{v}': t for (p, v), t in reached.items() if t} if args.escalate else None,
+                                      {f'{p}_{v}': usage for (p, v), usage in usages.items()})
         
     for (p, v), res in current_results.items():
         print(f"Halmos result appended for {p} ({v}): {res}")
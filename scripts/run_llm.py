@@ -3,15 +3,19 @@ import argparse
 import os
 import sys
 import json
-import openai
-import anthropic
 import re
 import datetime 
 import random
 random.seed(42)
 import time
-import pandas as pd
 import csv
+import threading
+import functools
+
+from tools import llm
+from tools import cache
+from tools import llm_results
+from tools import store
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # root del progetto
 SCRIPTS_DIR = os.path.join(BASE_DIR, "scripts")
@@ -35,6 +39,7 @@ def sanitize_for_csv(text):
     text = remove_repeated_quotes(text)
     return text
 
+@functools.lru_cache(maxsize=None)
 def load_api_key(path=OPENAI_API_KEY_FILE):
     if not os.path.exists(path):
         print(f"Error: file {path} does not exists.", file=sys.stderr)
@@ -43,7 +48,7 @@ def load_api_key(path=OPENAI_API_KEY_FILE):
         return f.read().strip()
 
 
-def list_properties(contract_path):
+def load_properties(contract_path):
     skeleton_path = os.path.join(contract_path, "skeleton.json")
     if not os.path.exists(skeleton_path):
         print(f"Error: {skeleton_path} not found.", file=sys.stderr)
@@ -52,7 +57,7 @@ def list_properties(contract_path):
     with open(skeleton_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    return sorted(list(data.get("properties", {}).keys()))
+    return data.get("properties", {})
 
 def get_ground_truths(contract_path):
     truth_path = os.path.join(contract_path, "ground-truth.csv")
@@ -68,10 +73,11 @@ def get_ground_truths(contract_path):
                 ground_truths[(parts[0],parts[1].replace("v",""))] = True if parts[2] == "1" else False
     return ground_truths
 
-def choose_verification_tasks(prop, versions, ground_truths : dict, args):
+def choose_verification_tasks(prop, versions, ground_truths : dict, args, verification_tasks_from_csv=None):
     if args.use_csv_verification_tasks:
         verification_tasks = []
-        verification_tasks_from_csv = get_verification_tasks_from_csv(args.use_csv_verification_tasks)
+        if verification_tasks_from_csv is None:
+            verification_tasks_from_csv = get_verification_tasks_from_csv(args.use_csv_verification_tasks)
         for property, version in verification_tasks_from_csv:
             if property == prop and version in versions:
                 if ground_truths.get((prop,version)) is None:
@@ -152,49 +158,22 @@ def list_versions(versions_path):
                 versions.append(parts[1])
     return sorted(versions, key=lambda x: int(re.sub(r'\D', '', x) or 0))
 
-
-
-def load_contract_code(contract, version):
-    version_folder = os.path.join(CONTRACTS_DIR, contract, "versions")
-
-    target = f"{normalize_name(contract)}v{normalize_name(version)}"
-
-    for fname in os.listdir(version_folder):
+def load_codes(versions_path):
+    """ Returns {normalized file name: code without the "/// @custom:" lines} of every version. """
+    codes = {}
+    if not os.path.exists(versions_path):
+        return codes
+    for fname in os.listdir(versions_path):
         if fname.endswith(".sol"):
-            candidate = normalize_name(fname.replace(".sol", ""))
-            if candidate == target:
-                filepath = os.path.join(version_folder, fname)
-                break
-    else:
-        print(f"Error: no solidity file found for {contract} v{version} in {version_folder}", file=sys.stderr)
-        sys.exit(1)
-
-    with open(filepath, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    # Removes all lines which  start with "/// @custom:"
-    cleaned_lines = [line for line in lines if not line.strip().startswith("/// @custom:")]
-    return "".join(cleaned_lines)
+            with open(os.path.join(versions_path, fname), "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            # Removes all lines which  start with "/// @custom:"
+            cleaned_lines = [line for line in lines if not line.strip().startswith("/// @custom:")]
+            codes[normalize_name(fname.replace(".sol", ""))] = "".join(cleaned_lines)
+    return codes
 
 
 
-def load_property_description(contract, property_name):
-    skeleton_path = os.path.join(CONTRACTS_DIR, contract, "skeleton.json")
-    if not os.path.exists(skeleton_path):
-        print(f"Error: {skeleton_path} not found.", file=sys.stderr)
-        sys.exit(1)
-
-    with open(skeleton_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    props = data.get("properties", {})
-    if property_name not in props:
-        print(f"Error: property {property_name} not found in {skeleton_path}.", file=sys.stderr)
-        sys.exit(1)
-
-    return props[property_name]
-
-
 def parse_llm_output(text):
     match = re.search(
         r"ANSWER:\s*(.*?)\s*EXPLANATION:\s*(.*?)\s*COUNTEREXAMPLE:\s*(.*)",
@@ -215,62 +194,141 @@ def parse_llm_output(text):
 
     return answer, explanation, counterexample
 
-def run_experiment(contract, prop, version, prompt_file, token_limit, model):
-    # Load prompt
-    prompt_path = os.path.join(SCRIPTS_DIR, f"prompt_templates/{prompt_file}")
-    if not os.path.exists(prompt_path):
-        print(f"Error: prompt file {prompt_path} non found.", file=sys.stderr)
-        sys.exit(1)
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        prompt_template = f.read()
-
-    # Load  Solidity code and property description
-    code = load_contract_code(contract, version)
-    property_desc = load_property_description(contract, prop)
-
-    # Replace placeholders
-    prompt_text = prompt_template.replace("{code}", code).replace("{property_desc}", property_desc)
-
-    #with open(f"logs_prompt/prompt{str(datetime.datetime.now())}.txt", "w", encoding="utf-8") as f:
-    #    f.write(prompt_text)
+class TaskIndex:
+    """
+    In-memory index of the inputs of the verification tasks of a contract,
+    read once: prompt templates, cleaned code of every version, property
+    descriptions and ground truths. Assembling a prompt is then a lookup.
+    """
+
+    def __init__(self, contract):
+        self.contract = contract
+        base_path = os.path.join(CONTRACTS_DIR, contract)
+        self.properties = load_properties(base_path)
+        self.ground_truths = get_ground_truths(base_path)
+        self.versions_path = os.path.join(base_path, "versions")
+        self.versions = list_versions(self.versions_path)
+        self.codes = load_codes(self.versions_path)
+        self.templates = {}
+
+    def code(self, version):
+        target = f"{normalize_name(self.contract)}v{normalize_name(version)}"
+        if target not in self.codes:
+            print(f"Error: no solidity file found for {self.contract} v{version} in {self.versions_path}", file=sys.stderr)
+            sys.exit(1)
+        return self.codes[target]
 
+    def property_description(self, property_name):
+        if property_name not in self.properties:
+            print(f"Error: property {property_name} not found in {os.path.join(CONTRACTS_DIR, self.contract, 'skeleton.json')}.", file=sys.stderr)
+            sys.exit(1)
+        return self.properties[property_name]
+
+    def template(self, prompt_file):
+        if prompt_file not in self.templates:
+            prompt_path = os.path.join(SCRIPTS_DIR, f"prompt_templates/{prompt_file}")
+            if not os.path.exists(prompt_path):
+                print(f"Error: prompt file {prompt_path} non found.", file=sys.stderr)
+                sys.exit(1)
+            with open(prompt_path, "r", encoding="utf-8") as f:
+                self.templates[prompt_file] = f.read()
+        return self.templates[prompt_file]
+
+    def prompt(self, prop, version, prompt_file):
+        # Replace placeholders
+        return (self.template(prompt_file)
+                .replace("{code}", self.code(version))
+                .replace("{property_desc}", self.property_description(prop)))
+
+    def prefix_length(self, prop, version, prompt_file):
+        """
+        Length of the prefix of the prompt before the property description:
+        the instructions and the code, shared by the prompts of a version, so
+        that providers can cache it. 0 if the code is not before the property.
+        """
+        head, sep, _ = self.template(prompt_file).partition("{property_desc}")
+        if not sep or "{code}" not in head:
+            return 0
+        return len(head.replace("{code}", self.code(version)))
+
+# Clients shared by the threads of the requests, see get_client
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(provider, base_url=None, timeout=None):
+    """
+    Client of provider ("anthropic" or "openai"), created on first use and reused for the
+    whole run, so that requests share its pool of keep-alive connections instead of opening
+    a connection (and a TLS handshake) each. The SDK is imported on first use, so that runs
+    which send no request do not load it. Thread safe.
+    Retries are left to the caller (see tools/llm.py), so the clients do not retry.
+    Without timeout, the clients keep the default one of the SDK (None would disable it).
+    """
+    key = (provider, base_url, timeout)
+    options = {"timeout": timeout} if timeout is not None else {}
+    with _clients_lock:
+        if key not in _clients:
+            if provider == "anthropic":
+                import anthropic
+                _clients[key] = anthropic.Anthropic(api_key=load_api_key(ANTHROPIC_API_KEY_FILE),
+                                                    base_url=base_url, max_retries=0, **options)
+            else:
+                import openai
+                _clients[key] = openai.OpenAI(api_key=load_api_key(OPENAI_API_KEY_FILE),
+                                              base_url=base_url and f"{base_url}/v1", max_retries=0, **options)
+        return _clients[key]
+
+def call_model(prompt_text, token_limit, model, base_url=None, timeout=None, prefix_length=0, prompt_cache_key=None):
+    """
+    Sends the prompt to the model, raising the errors of the API.
+    base_url is the root of an OpenAI/Anthropic compatible server, e.g. test/bin/llm_server.py.
+    With prefix_length, the first prefix_length characters of the prompt are marked as
+    cacheable (Anthropic); OpenAI caches prefixes automatically, prompt_cache_key routes
+    the prompts sharing one to the same cache.
+    Returns (output, time, token usage), see llm.token_usage.
+    """
     start_time = time.time()
-
-    try:
-        if model.startswith("claude-"):
-            # Anthropic / Claude models (streaming required for long requests)
-            client = anthropic.Anthropic(api_key=load_api_key(ANTHROPIC_API_KEY_FILE))
-            with client.messages.stream(
-                model=model,
-                max_tokens=token_limit or 500,
-                messages=[{"role": "user", "content": prompt_text}]
-            ) as stream:
-                output_text = stream.get_final_text()
-        elif model.startswith("gpt-4o") or model.startswith("gpt-3.5"):
-            # Legacy OpenAI chat models
-            client = openai.OpenAI(api_key=load_api_key(OPENAI_API_KEY_FILE))
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt_text}],
-                max_tokens=token_limit or 500
-            )
-            output_text = response.choices[0].message.content
-        else:
-            # New OpenAI models (gpt-5, gpt-4.1, ecc.)
-            client = openai.OpenAI(api_key=load_api_key(OPENAI_API_KEY_FILE))
-            response = client.responses.create(
-                model=model,
-                input=[{"role": "user", "content": prompt_text}],
-                max_output_tokens=token_limit or 500
-            )
-            output_text = response.output_text
-        end_time = time.time()
-        total_time = end_time - start_time
-        return output_text, total_time
-
-    except Exception as e:
-        print(f"Error during API call: {e}", file=sys.stderr)
-        sys.exit(1)
+    content = prompt_text
+    openai_options = {"extra_body": {"prompt_cache_key": prompt_cache_key}} if prompt_cache_key else {}
+
+    if model.startswith("claude-"):
+        # Anthropic / Claude models (streaming required for long requests)
+        if prefix_length:
+            content = [{"type": "text", "text": prompt_text[:prefix_length], "cache_control": {"type": "ephemeral"}},
+                       {"type": "text", "text": prompt_text[prefix_length:]}]
+        client = get_client("anthropic", base_url, timeout)
+        with client.messages.stream(
+            model=model,
+            max_tokens=token_limit or 500,
+            messages=[{"role": "user", "content": content}]
+        ) as stream:
+            output_text = stream.get_final_text()
+            usage = stream.get_final_message().usage
+    elif model.startswith("gpt-4o") or model.startswith("gpt-3.5"):
+        # Legacy OpenAI chat models
+        client = get_client("openai", base_url, timeout)
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": content}],
+            max_tokens=token_limit or 500,
+            **openai_options
+        )
+        output_text = response.choices[0].message.content
+        usage = response.usage
+    else:
+        # New OpenAI models (gpt-5, gpt-4.1, ecc.)
+        client = get_client("openai", base_url, timeout)
+        response = client.responses.create(
+            model=model,
+            input=[{"role": "user", "content": content}],
+            max_output_tokens=token_limit or 500,
+            **openai_options
+        )
+        output_text = response.output_text
+        usage = response.usage
+    end_time = time.time()
+    total_time = end_time - start_time
+    return output_text, total_time, usage and llm.token_usage(usage)
 
 
 def normalize_name(name: str) -> str:
@@ -292,6 +350,16 @@ def check_all_verification_tasks_have_ground_truth(verification_tasks, ground_tr
             print(f"Error: ground truth for ({prop}, {version}) not found.", file=sys.stderr)
             sys.exit(1)
 
+SANITIZED_FIELDS = ["llm_explanation", "llm_counterexample", "raw_output"]
+
+def format_results_header():
+    return ",".join(f"\"{field}\"" for field in llm_results.RESULTS_HEADER) + "\n"
+
+def format_result_row(result):
+    # Sanitize text fields (result is not modified)
+    values = [sanitize_for_csv(result[field]) if field in SANITIZED_FIELDS else result[field] for field in llm_results.RESULTS_HEADER]
+    return ",".join(f"\"{value}\"" for value in values) + "\n"
+
 def write_results_to_csv(results, output_file, temp=False):
 
     if not temp and os.path.exists(output_file):
@@ -299,39 +367,50 @@ def write_results_to_csv(results, output_file, temp=False):
         os.rename(output_file, output_file_backup)
         print(f"Backup of existing file saved as {output_file_backup}")
 
-    text = "\"contract_id\",\"property_id\",\"ground_truth\",\"llm_answer\",\"llm_explanation\",\"llm_counterexample\",\"time\",\"tokens\",\"raw_output\"\n"
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(format_results_header())
+        f.writelines(format_result_row(result) for result in results)
 
-    for result in results:
-        # Sanitize text fields
-        result["llm_explanation"] = sanitize_for_csv(result["llm_explanation"])
-        result["llm_counterexample"] = sanitize_for_csv(result["llm_counterexample"])
-        result["raw_output"] = sanitize_for_csv(result["raw_output"])
+class ResultsStream:
+    """
+    Results file written as the tasks complete: one row per task, appended and
+    flushed, so that the completed tasks survive a crash. Rows are in the order
+    of completion, in the format of write_results_to_csv.
+    """
 
-        row = f"\"{result['contract_id']}\",\"{result['property_id']}\",\"{result['ground_truth']}\",\"{result['llm_answer']}\",\"{result['llm_explanation']}\",\"{result['llm_counterexample']}\",\"{result['time']}\",\"{result['tokens']}\",\"{result['raw_output']}\"\n"
-        text = text + row        
+    def __init__(self, output_file):
+        self.file = open(output_file, "w", encoding="utf-8")
+        self.file.write(format_results_header())
+        self.file.flush()
 
-    with open(output_file, "w", encoding="utf-8") as f: 
-        f.write(text)
+    def write(self, result):
+        self.file.write(format_result_row(result))
+        self.file.flush()
 
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_usage(usage_file, verification_task, usage):
+    new_file = not os.path.exists(usage_file)
+    with open(usage_file, "a", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(llm.USAGE_HEADER)
+        writer.writerow([*verification_task, *(usage[k] for k in llm.USAGE_HEADER[2:])])
 
 def get_results_from_csv(input_file):
     if not os.path.exists(input_file):
         print(f"Error: the file {input_file} does not exist.", file=sys.stderr)
         sys.exit(1)
-    with open(input_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    results = []
-    header = lines[0].strip().split(',')
-    for line in lines[1:]:
-        parts = line.strip().split('","')
-        if len(parts) == len(header):
-            entry = {header[i].strip('"'): parts[i].strip('"') for i in range(len(header))}
-            #entry["ground_truth"] = entry["ground_truth"] == "True"
-            #entry["time"] = float(entry["time"])
-            results.append(entry)
-        else:
-            print(f"Warning: malformed line in {input_file}: {line}", file=sys.stderr)
-    return results
+    # Rows as str, rewritten as they are (see llm_results.load_results for typed columns)
+    return llm_results.read_results_csv(input_file)
 
 def get_previous_verification_tasks(previous_results):
     previous_verification_tasks = set()
@@ -341,29 +420,16 @@ def get_previous_verification_tasks(previous_results):
     return previous_verification_tasks
 
 def merge_results(old_results, new_results):
-    merged_results = []
-    seen_keys = set()
-
-    # Add old results
+    # {(contract_id, property_id): result}, in the order of the old results, then of the new ones
+    merged_results = {}
     for res in old_results:
-        key = (res['contract_id'], res['property_id'])
-        merged_results.append(res)
-        seen_keys.add(key)
+        merged_results[(res['contract_id'], res['property_id'])] = res
 
-    # Add new results, overwriting if key already seen
+    # Add new results, overwriting if key already seen (in place)
     for res in new_results:
-        key = (res['contract_id'], res['property_id'])
-        if key in seen_keys:
-            #  Overwrite existing entry
-            for i, existing_res in enumerate(merged_results):
-                if (existing_res['contract_id'], existing_res['property_id']) == key:
-                    merged_results[i] = res
-                    break
-        else:
-            merged_results.append(res)
-            seen_keys.add(key)
+        merged_results[(res['contract_id'], res['property_id'])] = res
 
-    return merged_results
+    return list(merged_results.values())
 
 def main():
     parser = argparse.ArgumentParser(description="Run ChatGPT experiments on benchmark.")
@@ -377,6 +443,15 @@ def main():
     parser.add_argument("--use_csv_verification_tasks", required=False, default=False, help="Use verification tasks from a CSV file. ")
     parser.add_argument("--at_least_n_prop", type=int, default=0, help="Force to pick at least N verification task per property.")
     parser.add_argument("--force_overwrite", action='store_true', required=False, default=False, help="Don't run verification tasks already present in the results file.")
+    parser.add_argument("--jobs", type=int, default=llm.DEFAULT_CONCURRENCY, help=f"Max number of requests in flight, reduced while the API returns 429s or timeouts (default {llm.DEFAULT_CONCURRENCY}).")
+    parser.add_argument("--retries", type=int, default=llm.RETRIES, help=f"Max retries of a request after a 429 or a timeout (default {llm.RETRIES}).")
+    parser.add_argument("--request_timeout", type=float, help="Timeout of a request in seconds (default: the one of the API client, 600).")
+    parser.add_argument("--base_url", help="Root URL of an OpenAI/Anthropic compatible server, e.g. test/bin/llm_server.py.")
+    parser.add_argument("--prefix_cache", action='store_true', default=False, help="Group tasks by version and mark the instructions and code shared by the prompts of a version as cacheable by the provider.")
+    parser.add_argument("--no_cache", action='store_true', default=False, help="Always call the API, ignoring and not updating cached responses.")
+    parser.add_argument("--cache_dir", help=f"Responses cache directory (default {cache.DEFAULT_CACHE_DIR.joinpath(llm.CACHE_SUBDIR)}).")
+    parser.add_argument("--store", default=store.DEFAULT_STORE, help=f"Results store, also written with the answers (default {store.DEFAULT_STORE}).")
+    parser.add_argument("--no_store", action='store_true', default=False, help="Do not write the answers to the results store.")
 
 
     args = parser.parse_args()
@@ -402,16 +477,23 @@ def main():
 
     base_path = os.path.join(CONTRACTS_DIR, contract_folder)
 
+    # Templates, code, properties and ground truths, read once
+    index = TaskIndex(contract_folder)
+
     # If `property` not specified → consider all properties
-    properties = [args.property] if args.property else list_properties(base_path)
+    properties = [args.property] if args.property else sorted(index.properties)
     print(properties)
     if not properties:
         print(f"No property found in {base_path}", file=sys.stderr)
         sys.exit(1)
 
-    versions_path = os.path.join(base_path, "versions")
+    versions_path = index.versions_path
 
-    ground_truths = get_ground_truths(base_path)
+    ground_truths = index.ground_truths
+
+    verification_tasks_from_csv = None
+    if args.use_csv_verification_tasks:
+        verification_tasks_from_csv = get_verification_tasks_from_csv(args.use_csv_verification_tasks)
 
     output_file = f"llms_results/results_{args.model}_{args.prompt}_{args.contract}_{args.tokens}tok.csv".replace(".txt","")
     print(f"Results will be saved to {output_file}")
@@ -426,11 +508,11 @@ def main():
     verification_tasks = []
     for prop in properties:
         # If `version` not specified → consider all versions
-        versions = [args.version] if args.version else list_versions(versions_path)
+        versions = [args.version] if args.version else index.versions
         if not versions:
             print(f"No versions found in {versions_path}", file=sys.stderr)
 
-        verification_tasks_prop = choose_verification_tasks(prop, versions, ground_truths, args)
+        verification_tasks_prop = choose_verification_tasks(prop, versions, ground_truths, args, verification_tasks_from_csv)
         #print(f"{verification_tasks_prop=}")
         verification_tasks.extend(verification_tasks_prop)  
 
@@ -453,20 +535,43 @@ def main():
 
     check_all_verification_tasks_have_ground_truth(verification_tasks, ground_truths)
 
-    results = []
-
     starting_time = str(datetime.datetime.now())
-
-
-    for verification_task in verification_tasks:
-        prop, version = verification_task
-        ground_truth = ground_truths[(prop,version)]
-        output, total_time = run_experiment(contract_folder, prop, version, args.prompt, args.tokens, args.model)
+    temp_file = f"logs_results/results_temp_{starting_time}.txt"
+
+    prompts = [index.prompt(prop, version, args.prompt) for prop, version in verification_tasks]
+
+    response_cache = None
+    if not args.no_cache:
+        response_cache = llm.ResponseCache(args.cache_dir or cache.DEFAULT_CACHE_DIR.joinpath(llm.CACHE_SUBDIR))
+
+    prefix_lengths = [0] * len(verification_tasks)
+    if args.prefix_cache:
+        prefix_lengths = [index.prefix_length(prop, version, args.prompt) for prop, version in verification_tasks]
+
+    def call(i):
+        prop, version = verification_tasks[i]
+        prompt_cache_key = f"{contract_folder}_v{version}_{args.prompt}" if args.prefix_cache else None
+        if response_cache is None:
+            return call_model(prompts[i], args.tokens, args.model, args.base_url, args.request_timeout,
+                              prefix_lengths[i], prompt_cache_key)
+        # Same prompt, model and token limit: the answer is reused, also from other results files
+        key = llm.cache_key(prompts[i], args.model, args.tokens, args.base_url)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return (*cached, None)
+        output, total_time, usage = call_model(prompts[i], args.tokens, args.model, args.base_url, args.request_timeout,
+                                               prefix_lengths[i], prompt_cache_key)
+        response_cache.put(key, output, total_time, model=args.model, tokens=args.tokens)
+        return output, total_time, usage
+
+    def make_entry(i, result):
+        prop, version = verification_tasks[i]
+        output, total_time, _ = result
         answer, explanation, counterexample = parse_llm_output(output)
-        result_entry = {
+        return {
             "contract_id": version,
             "property_id": prop,
-            "ground_truth": ground_truth,
+            "ground_truth": ground_truths[(prop,version)],
             "llm_answer": answer,
             "llm_explanation": explanation,
             "llm_counterexample": counterexample,
@@ -474,14 +579,49 @@ def main():
             "tokens": args.tokens,
             "raw_output": output
         }
-        results.append(result_entry)
-        temp_file = f"logs_results/results_temp_{starting_time}.txt"
-        write_results_to_csv(results, temp_file, temp=True)
-        
+
+    # Token usage of the API calls, to see the savings of --prefix_cache
+    usage_file = f"logs_results/usage_{starting_time}.csv"
+    usages = []
+
+    # Completed results, appended to temp_file as they complete
+    completed = {}
+    def on_result(i, result):
+        completed[i] = make_entry(i, result)
+        print(f"{verification_tasks[i]}: {completed[i]['llm_answer']} ({len(completed)}/{len(verification_tasks)})")
+        temp_results.write(completed[i])
+        if result[2]:
+            usages.append(result[2])
+            write_usage(usage_file, verification_tasks[i], result[2])
+
+    # With --prefix_cache, the first task of every version caches its prefix for the others
+    if args.prefix_cache:
+        phases = llm.order_by_prefix([version for _, version in verification_tasks])
+    else:
+        phases = [list(range(len(verification_tasks)))]
+
+    temp_results = ResultsStream(temp_file)
+    try:
+        for phase in phases:
+            llm.run(phase, call, args.jobs, args.retries, lambda j, result, phase=phase: on_result(phase[j], result))
+    except Exception as e:
+        print(f"Error during API call: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        temp_results.close()
+        if response_cache is not None:
+            print(f"Responses cache: {response_cache}")
+            response_cache.evict()
+        if usages:
+            input_tokens = sum(u["input_tokens"] for u in usages)
+            cache_read_tokens = sum(u["cache_read_tokens"] for u in usages)
+            print(f"Input tokens: {input_tokens}, read from the provider cache: {cache_read_tokens} "
+                  f"({100 * cache_read_tokens / max(1, input_tokens):.0f}%). Usage saved to {usage_file}")
+    new_results = [completed[i] for i in range(len(verification_tasks))]
+    results = new_results
 
     #print(results)
-    results_df = pd.DataFrame(results)
-    
+
     if os.path.exists(output_file):
         previous_results = get_results_from_csv(output_file)
         #for res in previous_results:
@@ -490,6 +630,15 @@ def main():
         results = merge_results(previous_results, results)
 
     write_results_to_csv(results, output_file)
+
+    # Answers of this run, as those of a tool named after the results file, e.g. gpt-5_zeroshot_20000tok
+    if not args.no_store and new_results:
+        tool = f"{args.model}_{args.prompt}_{args.tokens}tok".replace(".txt", "")
+        with store.Store(args.store) as results_store:
+            results_store.put_usecase(base_path, tool,
+                                      {f"{r['property_id']}_v{r['contract_id']}": r["llm_answer"] for r in new_results},
+                                      usages={f"{r['property_id']}_v{r['contract_id']}": {"wall_time": r["time"]} for r in new_results},
+                                      header=store.LLM_HEADER)
     
     
 
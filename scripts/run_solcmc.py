@@ -7,7 +7,10 @@ import glob
 import os
 
 import utils
-from tools.solcmc import run_all
+from tools import cache, store
+from tools.journal import Journal, JOURNAL_FILE
+from tools.solcmc import (run_all, run_all_escalating, run_all_portfolio, get_id,
+                          CACHE_SUBDIR, PORTFOLIO_SOLVERS, BEST)
 
 DEFAULT_TIMEOUT = '10m'
 DEFAULT_SOLVER = 'z3'
@@ -28,10 +31,21 @@ def main(args):
             '--timeout',
             '-t',
             help='Timeout time.')
+    parser.add_argument(
+            '--escalate',
+            '-e',
+            help='Comma separated increasing timeouts, e.g. 30s,2m,10m: run all tasks '
+                 'with the first one, then re-run UNK tasks with the next ones.')
     parser.add_argument(
             '--solver',
             '-s',
             help='Model checker: {z3, eld}')
+    parser.add_argument(
+            '--portfolio',
+            action='store_true',
+            help=f'Race {" and ".join(PORTFOLIO_SOLVERS)} on each contract, killing the slower one '
+                 'on a definitive outcome. The output dir gets the best outcomes, '
+                 'its siblings the outcomes of each solver.')
     parser.add_argument(
             '--version',
             '-v',
@@ -40,9 +54,60 @@ def main(args):
             '--property',
             '-p',
             help='Run experiments on this property only.')
+    parser.add_argument(
+            '--jobs',
+            '-j',
+            type=int,
+            help='Max number of parallel solc processes (default: number of cores).')
+    parser.add_argument(
+            '--memory-limit',
+            help='Max memory (address space) of each solc process and of its solver, '
+                 f'e.g. 8G: tasks exceeding it are {utils.OUT_OF_MEMORY}.')
+    parser.add_argument(
+            '--memory-budget',
+            help='Max memory of all the running tasks, e.g. 48G: a task starts when '
+                 'its peak RSS in the last run (timings.csv) fits in the budget left.')
+    parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always run solc, ignoring and not updating cached outcomes.')
+    parser.add_argument(
+            '--cache-dir',
+            help=f'Outcomes cache directory (default: {cache.DEFAULT_CACHE_DIR}).')
+    parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=f'Skip the tasks already completed in the output directory ({JOURNAL_FILE}), '
+                 'e.g. after a crash or an interrupted run.')
+    parser.add_argument(
+            '--store',
+            default=store.DEFAULT_STORE,
+            help=f'Results store, also written with the outcomes (default: {store.DEFAULT_STORE}).')
+    parser.add_argument(
+            '--no-store',
+            action='store_true',
+            help='Do not write the outcomes to the results store.')
     args = parser.parse_args(args)
     contracts = Path(args.contracts)
 
+    timeouts = None
+    if args.escalate:
+        if args.portfolio:
+            parser.error('--escalate cannot be used with --portfolio.')
+        try:
+            timeouts = utils.parse_timeouts(args.escalate)
+        except ValueError as e:
+            parser.error(str(e))
+
+    memory_limit = memory_budget = None
+    try:
+        if args.memory_limit:
+            memory_limit = utils.parse_memory(args.memory_limit)
+        if args.memory_budget:
+            memory_budget = utils.parse_memory(args.memory_budget)
+    except ValueError as e:
+        parser.error(str(e))
+
     # Get contracts paths
     contracts_paths = (
             glob.glob(f'{contracts}/*.sol')
@@ -61,38 +126,91 @@ def main(args):
     timeout = args.timeout if args.timeout else DEFAULT_TIMEOUT
     solver = args.solver if args.solver else DEFAULT_SOLVER
 
-    if args.output:
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = Path(args.cache_dir or cache.DEFAULT_CACHE_DIR).joinpath(CACHE_SUBDIR)
+
+    if args.portfolio:
+        run_portfolio(args, contracts_paths, timeout, cache_dir, memory_limit, memory_budget)
+    elif args.output:
         output_dir = Path(args.output)
         output_dir.mkdir(parents=True, exist_ok=True)
         logs_dir = output_dir.joinpath('logs/')
         logs_dir.mkdir(parents=True, exist_ok=True)
 
-        outcomes = run_all(contracts_paths, timeout, logs_dir, solver)
-
-        verification_tasks = []
-        out_csv = [utils.OUT_HEADER]
-        for id in outcomes.keys():
-            p = id.split('_')[0]
-            v = id.split('_')[1]
-            out_csv.append([p, v, outcomes[id]])
-            verification_tasks.append([p, v])
-
-        out_csv_path = output_dir.joinpath('out.csv')
-        existing_rows = utils.read_csv(out_csv_path)
-        for existing_row in existing_rows:
-            existing_verification_task = existing_row[:2]
-            if existing_verification_task in verification_tasks:
-                continue
-            if existing_verification_task == ['property','version']:
-                continue
-            out_csv.append(existing_row)        
-
-        utils.write_csv(out_csv_path, out_csv)
-
-        solver_csv_path = output_dir.joinpath(f"../../../solcmc-{solver}.csv")
-        utils.merge_csvs(out_csv_path, solver_csv_path)
+        peak_rss = utils.read_peak_rss(output_dir.joinpath(utils.TIMINGS_FILE))
+        journal = Journal(output_dir.joinpath(JOURNAL_FILE), args.resume)
+        # The csvs are written from the journal, also if the run is interrupted
+        try:
+            if timeouts:
+                start = get_start(journal, timeouts)
+                contracts_paths = [c for c in contracts_paths if start.get(get_id(c), 0) < len(timeouts)]
+                run_all_escalating(contracts_paths, timeouts, logs_dir, solver, cache_dir, args.jobs,
+                                   None, memory_limit, memory_budget, peak_rss, journal, start)
+            else:
+                contracts_paths = [c for c in contracts_paths if get_id(c) not in journal.records]
+                run_all(contracts_paths, timeout, logs_dir, solver, cache_dir, args.jobs, None,
+                        memory_limit, memory_budget, peak_rss, journal)
+        finally:
+            journal.close()
+            with store.open_store(None if args.no_store else args.store) as results_store:
+                journal.write_csvs(output_dir, output_dir.joinpath(f"../../../solcmc-{solver}.csv"), results_store,
+                                   with_timeouts=bool(timeouts))
+    elif timeouts:
+        run_all_escalating(contracts_paths, timeouts, solver=solver, cache_dir=cache_dir, concurrency=args.jobs,
+                           memory_limit=memory_limit, memory_budget=memory_budget)
     else:
-        run_all(contracts_paths, timeout, solver=solver)
+        run_all(contracts_paths, timeout, solver=solver, cache_dir=cache_dir, concurrency=args.jobs,
+                memory_limit=memory_limit, memory_budget=memory_budget)
+
+
+def get_start(journal, timeouts):
+    '''
+    Returns:
+        dict: {id: index of the first timeout to run}, for the tasks in the
+        journal: past the last timeout if their outcome is definitive, after
+        their last timeout if it is UNK.
+    '''
+    seconds = [utils.parse_timeout(t) for t in timeouts]
+    start = {}
+    for id, record in journal.records.items():
+        if record['outcome'] != utils.UNKNOWN or not record.get('timeout'):
+            start[id] = len(timeouts)
+        else:
+            last = utils.parse_timeout(record['timeout'])
+            start[id] = len([s for s in seconds if s <= last])
+    return start
+
+
+def run_portfolio(args, contracts_paths, timeout, cache_dir, memory_limit=None, memory_budget=None):
+    if not args.output:
+        run_all_portfolio(contracts_paths, timeout, cache_dir=cache_dir, concurrency=args.jobs,
+                          memory_limit=memory_limit, memory_budget=memory_budget)
+        return
+
+    # build/best/ and build/<solver>/
+    output_dirs = {name: Path(args.output).parent.joinpath(name) for name in PORTFOLIO_SOLVERS}
+    output_dirs[BEST] = Path(args.output)
+    logs_dirs = {name: output_dir.joinpath('logs/') for name, output_dir in output_dirs.items()}
+    for logs_dir in logs_dirs.values():
+        logs_dir.mkdir(parents=True, exist_ok=True)
+
+    peak_rss = {name: utils.read_peak_rss(output_dirs[name].joinpath(utils.TIMINGS_FILE))
+                for name in PORTFOLIO_SOLVERS}
+    journals = {name: Journal(output_dir.joinpath(JOURNAL_FILE), args.resume)
+                for name, output_dir in output_dirs.items()}
+    contracts_paths = [c for c in contracts_paths if get_id(c) not in journals[BEST].records]
+    try:
+        run_all_portfolio(contracts_paths, timeout, logs_dirs, cache_dir=cache_dir, concurrency=args.jobs,
+                          memory_limit=memory_limit, memory_budget=memory_budget, peak_rss=peak_rss,
+                          journals=journals)
+    finally:
+        with store.open_store(None if args.no_store else args.store) as results_store:
+            for name, output_dir in output_dirs.items():
+                journals[name].close()
+                journals[name].write_csvs(output_dir, output_dir.joinpath(f"../../../solcmc-{name}.csv"),
+                                          results_store)
+
 
 if __name__ == '__main__':
         import sys
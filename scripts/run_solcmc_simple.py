@@ -12,6 +12,12 @@ parser.add_argument('--solver', action='store', required=False, type=str,
                     help="[z3, eld] (if not specified, runs with all solvers)")
 parser.add_argument('--timeout', action='store', required=False, default="600",
                     help="timeout for each verification task")
+parser.add_argument('--escalate', action='store', required=False, type=str,
+                    help="comma separated increasing timeouts, e.g. 30s,2m,10m: re-run UNK tasks with the next timeout (overrides --timeout)")
+parser.add_argument('--portfolio', action='store_true', required=False, default=False,
+                    help="race z3 and eld on each task, killing the slower one (ignores --solver)")
+parser.add_argument('--no_cache', action='store_true', required=False, default=False,
+                    help="always run solc, ignoring cached outcomes")
 
 args = parser.parse_args()
 
@@ -33,7 +39,17 @@ if args.property:
 if args.timeout:
     args_solcmc += ["--timeout", args.timeout]
 
-if args.solver:
+if args.escalate:
+    args_solcmc += ["--escalate", args.escalate]
+
+if args.no_cache:
+    args_solcmc += ["--no-cache"]
+
+if args.portfolio:
+    args_solcmc += ["--portfolio"]
+    args_solcmc += ["--output", f"../contracts/{args.contract}/solcmc/build/best"]
+    run_solcmc.main(args_solcmc)
+elif args.solver:
     args_solcmc += ["--solver", args.solver]
     args_solcmc += ["--output", f"../contracts/{args.contract}/solcmc/build/{args.solver}"]
     run_solcmc.main(args_solcmc)
@@ -3,13 +3,21 @@ import argparse
 import utils
 from report_gen.scoring import (compute_total_score,
                                 count_total_outcomes,
-                                scoring_to_csv)
+                                scoring_to_csv,
+                                sum_timings,
+                                timings_to_csv)
 
 
 SOLCMC_Z3_CM_PATTERN = 'solcmc/build/z3/cm.csv'
 SOLCMC_ELD_CM_PATTERN = 'solcmc/build/eld/cm.csv'
 CERTORA_CM_PATTERN = 'certora/build/cm.csv'
 SCORES_FILE_NAME = 'scores.csv'
+TIMINGS_FILE_NAME = 'timings.csv'
+
+# Resource usage of the tasks, next to out.csv
+TIMINGS_PATTERNS = {'solcmc-z3': 'solcmc/build/z3/' + utils.TIMINGS_FILE,
+                    'solcmc-eld': 'solcmc/build/eld/' + utils.TIMINGS_FILE,
+                    'certora': 'certora/build/' + utils.TIMINGS_FILE}
 
 
 if __name__ == '__main__':
@@ -61,3 +69,11 @@ if __name__ == '__main__':
     utils.write_csv(output_path, csv_rows)
 
     print(f'Scores available in "{output_path}".')
+
+    # Sum the resource usage of every tool
+    timings = {tool: sum_timings(utils.find_paths_with_subpath(args.dir, pattern))
+               for tool, pattern in TIMINGS_PATTERNS.items()}
+    timings_path = Path(args.output).joinpath(TIMINGS_FILE_NAME)
+    utils.write_csv(timings_path, timings_to_csv(timings))
+
+    print(f'Timings available in "{timings_path}".')
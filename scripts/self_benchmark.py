@@ -0,0 +1,279 @@
+"""
+Benchmarks the toolchain itself on synthetic use cases, from the
+instrumentation to the README, without running any verification tool.
+
+Every stage is timed at several multiples of the size of the bank use case.
+Results can be saved and compared with those of another commit:
+    python self_benchmark.py --scales 10,100 --output before.json
+    python self_benchmark.py --scales 10,100 --compare before.json
+"""
+from contextlib import redirect_stdout
+from pathlib import Path
+import subprocess
+import tracemalloc
+import argparse
+import platform
+import tempfile
+import logging
+import json
+import math
+import time
+import sys
+import os
+
+import utils
+from setup import synthetic
+from setup.instrumentation import instrument_contracts
+from report_gen import cm, mdtable, readme
+from report_gen.scoring import (compute_total_score,
+                                count_total_outcomes,
+                                scoring_to_csv)
+
+DEFAULT_SCALES = '10,100,1000'
+STAGES = ['instrument', 'cm', 'mdtable', 'score', 'merge', 'readme']
+
+# Results of merge_tools_results, as read by the merge stage
+MERGE_CSVS = ['ground-truth.csv', 'certora.csv', 'solcmc-z3.csv', 'gpt-5.csv']
+
+
+class Skipped(Exception):
+    """ A stage that cannot run in this environment. """
+
+
+def get_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).parent)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def make_stages(usecase_dir, inputs, jobs):
+    """
+    Returns:
+        dict: {stage: function running the stage on the use case}.
+    """
+    gt_csv = usecase_dir.joinpath('ground-truth.csv')
+    properties_dir = usecase_dir.joinpath('solcmc')
+    out_csvs = [usecase_dir.joinpath(p) for p in synthetic.OUT_CSV_PATHS.values()]
+
+    def instrument():
+        instrument_contracts(inputs['versions'], inputs['properties'], jobs)
+
+    def gen_cms():
+        # As cm_gen.py does in the Makefiles
+        for out_csv in out_csvs:
+            utils.write_csv(out_csv.with_name('cm.csv'),
+                            cm.gen(gt_csv, out_csv, properties_dir))
+
+    # Inputs of the later stages, so that any stage can run alone
+    gen_cms()
+    cm_rows = cm.gen(gt_csv, out_csvs[0], properties_dir)[1:]
+
+    def gen_mdtable():
+        # As mdtable.gen_from_csv does, without the parsing
+        data = {(row[0], row[1]): (row[2], row[3] if len(row) == 4 else '')
+                for row in cm_rows}
+        mdtable.gen_from_dict(data)
+
+    def score():
+        # As score.py does
+        results = {}
+        for tool, out_csv_path in synthetic.OUT_CSV_PATHS.items():
+            cm_path = str(Path(out_csv_path).with_name('cm.csv'))
+            cm_paths = utils.find_paths_with_subpath(str(usecase_dir), cm_path)
+            results[tool] = (compute_total_score(cm_paths), count_total_outcomes(cm_paths))
+        scoring_to_csv(results)
+
+    # Imported here, so that loading pandas is not timed in the first scale
+    try:
+        import merge_tools_results
+        merge_error = None
+    except ImportError as e:
+        merge_error = str(e)
+
+    def merge():
+        if merge_error:
+            raise Skipped(merge_error)
+        args = argparse.Namespace(subdataset=False)
+        merge_tools_results.merge_verification_results(
+                [str(usecase_dir.joinpath(f)) for f in MERGE_CSVS],
+                str(usecase_dir.joinpath('merged.csv')), args)
+
+    def gen_readme():
+        readme.gen(usecase_dir)
+
+    return {'instrument': instrument,
+            'cm': gen_cms,
+            'mdtable': gen_mdtable,
+            'score': score,
+            'merge': merge,
+            'readme': gen_readme}
+
+
+def measure(stage, repeat, memory):
+    """
+    Runs a stage repeat times, then once more under tracemalloc if memory.
+
+    Returns:
+        tuple: (best time in seconds, peak of Python allocations in bytes or None)
+    """
+    seconds = math.inf
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stage()
+            seconds = min(seconds, time.perf_counter() - start)
+
+        peak = None
+        if memory:
+            # Traced separately, since tracing slows down allocations
+            tracemalloc.start()
+            try:
+                stage()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    return seconds, peak
+
+
+def growth(results, result):
+    """
+    Returns the exponent of the time of a stage in the number of tasks, from
+    the previous scale: about 1 if linear, 2 if quadratic.
+    """
+    previous = [r for r in results
+                if r['stage'] == result['stage'] and r['tasks'] < result['tasks']
+                and r['seconds']]
+    if not previous or not result['seconds']:
+        return None
+    prev = previous[-1]
+    return (math.log(result['seconds'] / prev['seconds'])
+            / math.log(result['tasks'] / prev['tasks']))
+
+
+def run(scales, stages, sizes, ghosts, jobs, repeat, memory, work_dir):
+    results = []
+    for scale in scales:
+        versions, properties = synthetic.get_size(scale)
+        versions = sizes['versions'] or versions
+        properties = sizes['properties'] or properties
+
+        usecase_dir = Path(work_dir).joinpath(f'synth-{scale}')
+        inputs = synthetic.generate(usecase_dir, versions, properties, ghosts)
+        print(f'Scale {scale}: {versions} versions, {properties} properties, '
+              f'{inputs["tasks"]} tasks.', file=sys.stderr)
+
+        for name, stage in make_stages(usecase_dir, inputs, jobs).items():
+            if name not in stages:
+                continue
+            result = {'scale': scale, 'versions': versions, 'properties': properties,
+                      'tasks': inputs['tasks'], 'stage': name,
+                      'seconds': None, 'tasks_per_second': None, 'peak_memory_mib': None}
+            try:
+                seconds, peak = measure(stage, repeat, memory)
+            except Skipped as e:
+                logging.warning(f'{name} skipped: {e}')
+                result['skipped'] = str(e)
+            else:
+                result['seconds'] = seconds
+                result['tasks_per_second'] = inputs['tasks'] / seconds if seconds else None
+                result['peak_memory_mib'] = peak / 2**20 if peak is not None else None
+            result['growth'] = growth(results, result)
+            results.append(result)
+            print_result(result, file=sys.stderr)
+
+    return results
+
+
+def format_value(value, fmt):
+    return '-' if value is None else format(value, fmt)
+
+
+def print_result(result, baseline=None, file=sys.stdout):
+    line = (f'{result["scale"]:>6}x {result["stage"]:<10} '
+            f'{format_value(result["seconds"], ".3f"):>10}s '
+            f'{format_value(result["tasks_per_second"], ".0f"):>12} tasks/s '
+            f'{format_value(result["peak_memory_mib"], ".1f"):>9} MiB '
+            f'growth {format_value(result["growth"], ".2f"):>5}')
+    if baseline is not None:
+        line += f' vs baseline {format_value(baseline, ".2f")}x'
+    print(line, file=file)
+
+
+def compare(results, baseline_path):
+    """ Prints the time of every stage relative to the same stage of a previous run. """
+    with open(baseline_path, 'r') as file:
+        baseline = json.load(file)
+    print(f'Baseline: commit {baseline.get("commit")}')
+
+    seconds = {(r['scale'], r['stage']): r['seconds'] for r in baseline['results']}
+    for result in results:
+        before = seconds.get((result['scale'], result['stage']))
+        ratio = result['seconds'] / before if before and result['seconds'] else None
+        print_result(result, ratio)
+
+
+def main(args_list=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='Comma separated multiples of the size of bank '
+                             f'(default: {DEFAULT_SCALES}).')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help='Comma separated stages to run (default: all).')
+    parser.add_argument('--versions', type=int,
+                        help='Number of versions, instead of the one of the scale.')
+    parser.add_argument('--properties', type=int,
+                        help='Number of properties, instead of the one of the scale.')
+    parser.add_argument('--ghosts', type=int, default=4,
+                        help='Number of ghost tags per property (default: 4).')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Max number of instrumentation processes (default: 1).')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Time every stage this many times and keep the best (default: 1).')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Do not measure the peak memory of the stages.')
+    parser.add_argument('--work-dir',
+                        help='Directory of the synthetic use cases (default: a temporary one).')
+    parser.add_argument('--output', '-o', help='Save the results to this JSON file.')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with.')
+
+    args = parser.parse_args(args_list)
+
+    try:
+        scales = [float(s) if '.' in s else int(s) for s in args.scales.split(',')]
+    except ValueError:
+        parser.error(f'Invalid scales "{args.scales}".')
+    stages = args.stages.split(',')
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f'Unknown stage "{stage}", choose from {", ".join(STAGES)}.')
+
+    sizes = {'versions': args.versions, 'properties': args.properties}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = run(scales, stages, sizes, args.ghosts, args.jobs,
+                      max(1, args.repeat), not args.no_memory, args.work_dir or tmp_dir)
+
+    if args.compare:
+        compare(results, args.compare)
+    else:
+        for result in results:
+            print_result(result)
+
+    if args.output:
+        report = {'commit': get_commit(),
+                  'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  'python': platform.python_version(),
+                  'platform': platform.platform(),
+                  'ghosts': args.ghosts,
+                  'jobs': args.jobs,
+                  'results': results}
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f'Results available in "{args.output}".')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,14 @@
 Generates solcmc contracts from versions and properties files.
 '''
 
+from concurrent.futures import ProcessPoolExecutor
 from setup import injector
 from pathlib import Path
 import logging
 import utils
 import sys
+import io
+import os
 import re
 
 
@@ -15,6 +18,9 @@ TAG_PREGHOST = '/// @custom:preghost'
 TAG_POSTGHOST = '/// @custom:postghost'
 TAG_INVARIANT = '/// @custom:invariant'
 
+# Below this number of lines to instrument (~0.1s), a single process is faster
+MIN_PARALLEL_LINES = 100000
+
 
 def get_ghost(lines: list, i: int) -> tuple:
     '''
@@ -65,6 +71,17 @@ def get_ghosts(property_path: str) -> dict:
         The function relies on the get_ghost helper function for extracting
         ghost code sections.
 
+    '''
+    # Support old specifications, to be removed later
+    with open(property_path, 'r') as f:
+        code = f.read()
+
+    return parse_ghosts(code)
+
+
+def parse_ghosts(code: str) -> dict:
+    '''
+    Extracts ghost code from the code of a solcmc property file, see get_ghosts.
     '''
     ghosts = {
             'pre': {},
@@ -73,10 +90,6 @@ def get_ghosts(property_path: str) -> dict:
             'invariants': []
             }
 
-    # Support old specifications, to be removed later
-    with open(property_path, 'r') as f:
-        code = f.read()
-
     # Empty property
     if not code.strip():
         return ghosts
@@ -91,8 +104,7 @@ def get_ghosts(property_path: str) -> dict:
         return ghosts
 
     # Yield verification ghosts
-    with open(property_path, 'r') as f:
-        lines = f.readlines()
+    lines = io.StringIO(code).readlines()
 
     header_collected = False   # To collect header
     header = []
@@ -136,7 +148,154 @@ def get_ghosts(property_path: str) -> dict:
     return ghosts
 
 
-def instrument_contracts(versions_paths: list, properties_paths: list) -> dict:
+def get_filename(version_path: str, property_path: str) -> str:
+    '''
+    Returns the filename of the contract instrumenting a version with a
+    property, e.g. Bank_p1_v1.sol.
+    '''
+    name, version_id = Path(version_path).stem.split('_')
+    property_id = Path(property_path).stem.split('_')[0]    # split to eventually remove version
+    return f'{name}_{property_id}_{version_id}.sol'
+
+
+def parse_version(version_path: str) -> dict:
+    '''
+    Reads a version once for all its instrumentations.
+
+    Returns:
+        dict: {'code': code, 'lines': [code_lines, ...],
+               'name': contract name, None until needed}
+    '''
+    with open(version_path, 'r') as f:
+        code = f.read()
+
+    return {'code': code, 'lines': io.StringIO(code).readlines(), 'name': None}
+
+
+def inject_ghosts(version: dict, ghosts: dict, version_path: str, property_path: str) -> str:
+    '''
+    Instruments a parsed version with parsed ghosts.
+
+    Args:
+        version (dict): Version, as returned by parse_version.
+        ghosts (dict): Property ghosts, as returned by get_ghosts.
+        version_path (str): Version path, for error messages.
+        property_path (str): Property path, for error messages.
+
+    Returns:
+        str: Instrumented contract code.
+    '''
+    contract = list(version['lines'])   # contract to instrument
+
+    ''' Move this into another function '''
+    # Empty property file
+    if not any(ghosts[key] for key in ['state', 'pre', 'post', 'invariants']):
+        logging.warning(f'No instrumentation found in {property_path}.')
+
+    if ghosts['state']:
+        # Inject before last bracket
+        name = version['name'] or utils.get_contract_name(version_path, version['code'])
+        contract_pattern = 'contract ' + name
+        contract = injector.inject_after(contract, ghosts['state'], contract_pattern)
+        if contract is None:
+            state = ''.join(l for l in ghosts['state'])
+            logging.error(f'Ghost state injection failed: {property_path}: '
+                          f'{version_path}: {state}.')
+            sys.exit(1)
+
+    for fun, code in ghosts['pre'].items():
+        # Inject after function signature
+        contract = injector.inject_after(contract, code, fun)
+        if contract is None:
+            logging.error(
+                    f'Preghost injection failed: {property_path}: '
+                    f'{version_path}: {fun}.')
+            sys.exit(1)
+
+    for fun, code in ghosts['post'].items():
+        # Inject before last bracket of function
+        contract = injector.inject_postcond(contract, code, fun)
+        if contract is None:
+            logging.error(
+                    f'Postghost injection failed: {property_path}: '
+                    f'{version_path}: {fun}.')
+            sys.exit(1)
+
+    for inv in ghosts['invariants']:
+        # Inject before last bracket
+        contract = injector.inject_before_last_bracket(contract, inv)
+        if contract is None:
+            inv_as_string = ''.join(l for l in inv)
+            logging.error(f'Invariant injection failed: {property_path}: '
+                          f'{version_path}: {inv_as_string}.')
+            sys.exit(1)
+
+    return ''.join(l for l in contract)
+
+
+def instrument_contract(version_path: str, property_path: str) -> str:
+    '''
+    Instruments a version with a property.
+
+    Returns:
+        str: Instrumented contract code.
+    '''
+    return inject_ghosts(parse_version(version_path), get_ghosts(property_path),
+                         version_path, property_path)
+
+
+# Parsed versions and properties of a pool worker, see instrument_pairs
+_parsed = {}
+
+
+def _init_worker(versions, properties):
+    _parsed['versions'] = versions
+    _parsed['properties'] = properties
+
+
+def _inject_pair(pair):
+    version_path, property_path = pair
+    return inject_ghosts(_parsed['versions'][version_path],
+                         _parsed['properties'][property_path],
+                         version_path, property_path)
+
+
+def instrument_pairs(pairs: list, jobs: int = None) -> dict:
+    '''
+    Instruments versions with properties, parsing every version and property
+    once and injecting them in parallel.
+
+    Args:
+        pairs (list): [(version_path, property_path), ...]
+        jobs (int): Max number of processes, default: number of cores.
+
+    Returns:
+        dict: { filename: contract_code, ...}, in the order of pairs.
+    '''
+    versions = {v: parse_version(v) for v in dict.fromkeys(v for v, _ in pairs)}
+    properties = {p: get_ghosts(p) for p in dict.fromkeys(p for _, p in pairs)}
+    filenames = [get_filename(v, p) for v, p in pairs]
+
+    # Contract names are needed only to inject ghost state
+    for v, p in pairs:
+        if properties[p]['state'] and versions[v]['name'] is None:
+            versions[v]['name'] = utils.get_contract_name(v, versions[v]['code'])
+
+    jobs = jobs or os.cpu_count() or 1
+    lines = sum(len(versions[v]['lines']) for v, _ in pairs)
+    if jobs == 1 or lines < MIN_PARALLEL_LINES:
+        _init_worker(versions, properties)
+        codes = map(_inject_pair, pairs)
+        return dict(zip(filenames, codes))
+
+    chunksize = max(1, len(pairs) // (jobs * 4))
+    with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                             initargs=(versions, properties)) as executor:
+        codes = executor.map(_inject_pair, pairs, chunksize=chunksize)
+        return dict(zip(filenames, codes))
+
+
+def instrument_contracts(versions_paths: list, properties_paths: list, jobs: int = None) -> dict:
     '''
     Instruments contracts to verify from versions and properties.
     They will go to build/contracts.
@@ -144,8 +303,7 @@ def instrument_contracts(versions_paths: list, properties_paths: list) -> dict:
     Returns:
         dict: { filename: contract_code, ...}
     '''
-
-    contracts = {}
+    pairs = []
 
     for version_path in versions_paths:
         # Get list of properties to verify for this version
@@ -153,60 +311,6 @@ def instrument_contracts(versions_paths: list, properties_paths: list) -> dict:
 
         # Instrument version for every property
         for property_path in version_properties_paths:
+            pairs.append((version_path, property_path))
 
-            contract = []   # contract to instrument
-            with open(version_path, 'r') as f:
-                contract = f.readlines()
-
-            ghosts = get_ghosts(property_path)
-
-            ''' Move this into another function '''
-            # Empty property file
-            if not any(ghosts[key] for key in ['state', 'pre', 'post', 'invariants']):
-                logging.warning(f'No instrumentation found in {property_path}.')
-
-            if ghosts['state']:
-                # Inject before last bracket
-                contract_pattern = 'contract ' + utils.get_contract_name(version_path)
-                contract = injector.inject_after(contract, ghosts['state'], contract_pattern)
-                if contract is None:
-                    state = ''.join(l for l in code)
-                    logging.error(f'Ghost state injection failed: {property_path}: '
-                                  f'{version_path}: {state}.')
-                    sys.exit(1)
-
-            for fun, code in ghosts['pre'].items():
-                # Inject after function signature
-                contract = injector.inject_after(contract, code, fun)
-                if contract is None:
-                    logging.error(
-                            f'Preghost injection failed: {property_path}: '
-                            f'{version_path}: {fun}.')
-                    sys.exit(1)
-
-            for fun, code in ghosts['post'].items():
-                # Inject before last bracket of function
-                contract = injector.inject_postcond(contract, code, fun)
-                if contract is None:
-                    logging.error(
-                            f'Postghost injection failed: {property_path}: '
-                            f'{version_path}: {fun}.')
-                    sys.exit(1)
-
-            for inv in ghosts['invariants']:
-                # Inject before last bracket
-                contract = injector.inject_before_last_bracket(contract, inv)
-                if contract is None:
-                    inv_as_string = ''.join(l for l in inv)
-                    logging.error(f'Invariant injection failed: {property_path}: '
-                                  f'{version_path}: {inv_as_string}.')
-                    sys.exit(1)
-
-            # Construct filename
-            name, version_id = Path(version_path).stem.split('_')
-            property_id = Path(property_path).stem.split('_')[0]    # split to eventually remove version
-            filename = f'{name}_{property_id}_{version_id}.sol'
-
-            contracts.update({filename: ''.join(l for l in contract)})
-
-    return contracts
+    return instrument_pairs(pairs, jobs)
@@ -0,0 +1,139 @@
+'''
+Incremental instrumentation of the solcmc contracts.
+
+A manifest in the output directory maps every instrumented contract to a hash
+of its inputs: the version, the property and the instrumentation code. Only
+the contracts whose inputs changed are instrumented again, and a contract is
+rewritten only if its code changed, so that the others keep their mtime.
+A stamp file is touched on every build, so that make sees the build as up to
+date also when the manifest was not rewritten.
+'''
+
+from setup.instrumentation import get_filename, instrument_pairs
+from tools.cache import hash_file, hash_key
+from functools import lru_cache
+from pathlib import Path
+import json
+import os
+
+import utils
+
+
+MANIFEST_FILE = '.manifest.json'
+STAMP_FILE = '.build.stamp'
+
+# Sources whose changes may change the instrumented contracts
+INSTRUMENTATION_SOURCES = [Path(__file__).parent.joinpath('injector.py'),
+                           Path(__file__).parent.joinpath('instrumentation.py')]
+
+
+@lru_cache(maxsize=None)
+def instrumentation_hash() -> str:
+    return hash_key(*[hash_file(path) for path in INSTRUMENTATION_SOURCES])
+
+
+def inputs_hash(version_path, property_path, file_hashes=None) -> str:
+    '''
+    Hashes the inputs of an instrumented contract.
+
+    Args:
+        file_hashes (dict): {path: hash} of the files already hashed.
+    '''
+    file_hashes = {} if file_hashes is None else file_hashes
+    for path in [version_path, property_path]:
+        if path not in file_hashes:
+            file_hashes[path] = hash_file(path)
+
+    return hash_key(file_hashes[version_path],
+                    file_hashes[property_path],
+                    instrumentation_hash())
+
+
+def load(output_dir) -> dict:
+    '''
+    Returns:
+        dict: {filename: inputs hash}, empty if there is no manifest.
+    '''
+    manifest_path = Path(output_dir).joinpath(MANIFEST_FILE)
+    if not manifest_path.is_file():
+        return {}
+    try:
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+    except ValueError:
+        return {}
+
+
+def save(output_dir, manifest):
+    manifest_path = Path(output_dir).joinpath(MANIFEST_FILE)
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def write_if_changed(path, code) -> bool:
+    '''
+    Writes code to path, unless the file already contains it.
+
+    Returns:
+        bool: True if the file was written.
+    '''
+    if os.path.isfile(path):
+        with open(path, 'r') as file:
+            if file.read() == code:
+                return False
+    with open(path, 'w') as file:
+        file.write(code)
+    return True
+
+
+def build(versions_paths, properties_paths, output_dir, jobs=None) -> dict:
+    '''
+    Instruments the contracts whose inputs changed since the last build and
+    removes the contracts of the version/property pairs that no longer exist.
+    The manifest is rewritten only if it changed; the stamp file is always
+    touched.
+
+    Args:
+        jobs (int): Max number of instrumentation processes, default: number of cores.
+
+    Returns:
+        dict: {'written': [filename, ...],
+               'unchanged': [filename, ...],
+               'removed': [filename, ...]}
+    '''
+    output_dir = Path(output_dir)
+    old_manifest = load(output_dir)
+    manifest = {}
+    result = {'written': [], 'unchanged': [], 'removed': []}
+
+    file_hashes = {}
+    changed_pairs = []
+    for version_path in versions_paths:
+        for property_path in utils.get_properties(version_path, properties_paths):
+            filename = get_filename(version_path, property_path)
+            manifest[filename] = inputs_hash(version_path, property_path, file_hashes)
+
+            if (old_manifest.get(filename) == manifest[filename]
+                    and output_dir.joinpath(filename).is_file()):
+                result['unchanged'].append(filename)
+            else:
+                changed_pairs.append((version_path, property_path))
+
+    for filename, code in instrument_pairs(changed_pairs, jobs).items():
+        if write_if_changed(output_dir.joinpath(filename), code):
+            result['written'].append(filename)
+        else:
+            result['unchanged'].append(filename)
+
+    for filename in old_manifest:
+        if filename not in manifest:
+            output_dir.joinpath(filename).unlink(missing_ok=True)
+            result['removed'].append(filename)
+
+    if manifest != old_manifest:
+        save(output_dir, manifest)
+    output_dir.joinpath(STAMP_FILE).touch()
+
+    return result
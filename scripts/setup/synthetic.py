@@ -0,0 +1,187 @@
+'''
+Generates synthetic use cases, to benchmark the toolchain itself.
+
+A synthetic use case has the layout of a real one (skeleton.json, spec.md,
+versions/, solcmc/, ground-truth.csv) and fake tool outputs (out.csv of
+solcmc and Certora, solcmc-<solver>.csv, certora.csv, gpt-5.csv), so that
+every stage from the instrumentation to the README can run on it without
+running any tool. Contents are random, but deterministic given the seed.
+'''
+
+from pathlib import Path
+import random
+import json
+import math
+import csv
+
+from utils import (OUT_HEADER,
+                   STRONG_POSITIVE,
+                   STRONG_NEGATIVE,
+                   WEAK_POSITIVE,
+                   WEAK_NEGATIVE,
+                   UNKNOWN,
+                   ERROR)
+
+
+NAME = 'Synth'
+
+# Size of the bank use case
+BANK_VERSIONS = 17
+BANK_PROPERTIES = 27
+
+TAGS = ['/// @custom:ghost',
+        '/// @custom:preghost',
+        '/// @custom:postghost',
+        '/// @custom:invariant']
+
+OUTCOMES = [STRONG_POSITIVE, STRONG_NEGATIVE, WEAK_POSITIVE,
+            WEAK_NEGATIVE, UNKNOWN, ERROR]
+
+GT_HEADER = ['property', 'version', 'truth', 'footnote-md']
+LLM_HEADER = ['property_id', 'contract_id', 'llm_answer']
+
+# Fake outputs, relative to the use case directory
+OUT_CSV_PATHS = {'solcmc-z3': 'solcmc/build/z3/out.csv',
+                 'solcmc-eld': 'solcmc/build/eld/out.csv',
+                 'certora': 'certora/build/out.csv'}
+
+
+def get_size(scale: float) -> tuple:
+    '''
+    Returns:
+        tuple: (versions, properties) of a use case with about scale times the
+        verification tasks of bank, growing both dimensions alike.
+    '''
+    factor = math.sqrt(scale)
+    return (max(1, round(BANK_VERSIONS * factor)),
+            max(1, round(BANK_PROPERTIES * factor)))
+
+
+def function_name(j: int) -> str:
+    # Fixed width, since ghosts find their function by substring
+    return f'op{j:05d}'
+
+
+def property_id(j: int) -> str:
+    return f'prop-{j:05d}'
+
+
+def gen_version(i: int, functions: int) -> str:
+    '''
+    Returns:
+        str: Code of the i-th version, with the given number of functions.
+    '''
+    lines = ['//SPDX-License-Identifier: UNLICENSED\n',
+             'pragma solidity >= 0.8.2;\n',
+             '\n',
+             f'/// @custom:version synthetic version {i}\n',
+             '\n',
+             f'contract {NAME} {{\n',
+             '    mapping (address => uint) balances;\n',
+             '    uint total;\n']
+
+    for j in range(functions):
+        lines += ['\n',
+                  f'    function {function_name(j)}(uint amount) public {{\n',
+                  f'        require(amount > {i});\n',
+                  '        balances[msg.sender] += amount;\n',
+                  '        total += amount;\n',
+                  '    }\n']
+
+    lines.append('}\n')
+    return ''.join(lines)
+
+
+def gen_property(j: int, ghosts: int, functions: int) -> str:
+    '''
+    Returns:
+        str: Code of the j-th solcmc property, with the given number of ghost
+        tags, cycling through state ghosts, preghosts, postghosts and
+        invariants. Pre/postghosts of a property target distinct functions.
+    '''
+    lines = []
+    for k in range(ghosts):
+        tag = TAGS[k % len(TAGS)]
+        fun = function_name((j + k) % functions)
+        if tag == '/// @custom:ghost':
+            lines += [f'{tag}\n', f'uint ghost_{k};\n']
+        elif tag == '/// @custom:preghost':
+            lines += [f'{tag} function {fun}\n',
+                      f'uint old_total_{k} = total;\n']
+        elif tag == '/// @custom:postghost':
+            lines += [f'{tag} function {fun}\n',
+                      f'assert(total >= amount);\n']
+        else:
+            lines += [f'{tag}\n',
+                      f'function invariant_{k}() public view {{\n',
+                      '    assert(total >= balances[msg.sender]);\n',
+                      '}\n']
+    return ''.join(lines)
+
+
+def write_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+
+def generate(usecase_dir, versions: int, properties: int, ghosts: int = 4, seed: int = 0) -> dict:
+    '''
+    Generates a synthetic use case in usecase_dir.
+
+    Args:
+        versions (int): Number of versions.
+        properties (int): Number of solcmc properties.
+        ghosts (int): Number of ghost tags per property.
+        seed (int): Seed of the random outcomes and ground truth.
+
+    Returns:
+        dict: {'versions': [version_path, ...],
+               'properties': [property_path, ...],
+               'tasks': number of (property, version) pairs}
+    '''
+    rng = random.Random(seed)
+    usecase_dir = Path(usecase_dir)
+    versions_dir = usecase_dir.joinpath('versions')
+    properties_dir = usecase_dir.joinpath('solcmc')
+    versions_dir.mkdir(parents=True, exist_ok=True)
+    properties_dir.mkdir(parents=True, exist_ok=True)
+
+    # Enough functions for the pre/postghosts of a property to be distinct
+    functions = max(1, ghosts)
+
+    versions_paths = []
+    for i in range(1, versions + 1):
+        path = versions_dir.joinpath(f'{NAME}_v{i}.sol')
+        path.write_text(gen_version(i, functions))
+        versions_paths.append(str(path))
+
+    properties_paths = []
+    properties_ids = [property_id(j) for j in range(properties)]
+    for j, p in enumerate(properties_ids):
+        path = properties_dir.joinpath(f'{p}.sol')
+        path.write_text(gen_property(j, ghosts, functions))
+        properties_paths.append(str(path))
+
+    skeleton = {'name': NAME,
+                'specification': 'file:spec.md',
+                'properties': {p: f'synthetic property {p}' for p in properties_ids}}
+    with open(usecase_dir.joinpath('skeleton.json'), 'w') as file:
+        json.dump(skeleton, file, indent=4)
+    usecase_dir.joinpath('spec.md').write_text('A synthetic use case.\n')
+
+    tasks = [(p, f'v{i}') for p in properties_ids for i in range(1, versions + 1)]
+    write_csv(usecase_dir.joinpath('ground-truth.csv'),
+              [GT_HEADER] + [[p, v, rng.choice('01'), ''] for p, v in tasks])
+
+    for tool, out_csv_path in OUT_CSV_PATHS.items():
+        rows = [OUT_HEADER] + [[p, v, rng.choice(OUTCOMES)] for p, v in tasks]
+        write_csv(usecase_dir.joinpath(out_csv_path), rows)
+        write_csv(usecase_dir.joinpath(f'{tool}.csv'), rows)
+
+    write_csv(usecase_dir.joinpath('gpt-5.csv'),
+              [LLM_HEADER] + [[p, v[1:], rng.choice(['TRUE', 'FALSE'])] for p, v in tasks])
+
+    return {'versions': versions_paths,
+            'properties': properties_paths,
+            'tasks': len(tasks)}
@@ -0,0 +1,156 @@
+'''
+Discovers the use cases of the benchmark and prepares their inputs.
+
+Two layouts are supported:
+    contracts/<usecase>/    versions/ + solcmc/ properties + certora/ specs
+    regression/<usecase>/   <Name>_v1.sol + instrumented solcmc/ + certora/ specs
+'''
+
+from setup.injector import inject_before_last_bracket
+from setup import manifest
+from pathlib import Path
+import shutil
+import glob
+
+
+USECASES_DIRS = ['contracts', 'regression']
+TEMPLATE_DIR = 'template'
+LIB_DIR = 'lib'
+GETTERS_FILE = 'getters.sol'
+
+
+class UseCase:
+    '''
+    A use case directory of the benchmark.
+
+    Args:
+        path (Path): Use case directory.
+        layout (str): 'contracts' or 'regression'.
+    '''
+
+    def __init__(self, path, layout):
+        self.path = Path(path)
+        self.layout = layout
+        self.name = f'{layout}/{self.path.name}'
+
+    def __repr__(self):
+        return self.name
+
+    def solcmc_output_dir(self, solver):
+        if self.layout == 'contracts':
+            return self.path.joinpath('solcmc', 'build', solver)
+        return self.path.joinpath('build', solver)
+
+    def certora_output_dir(self):
+        if self.layout == 'contracts':
+            return self.path.joinpath('certora', 'build')
+        return self.path.joinpath('build', 'certora')
+
+    def solcmc_csv(self, solver):
+        return self.path.joinpath(f'solcmc-{solver}.csv')
+
+    def certora_csv(self):
+        return self.path.joinpath('certora.csv')
+
+    def ground_truth(self):
+        return self.path.joinpath('ground-truth.csv')
+
+    def solcmc_contracts(self):
+        '''
+        Returns the paths of the contracts to verify with solcmc, instrumenting
+        versions with properties for the contracts layout (only those whose
+        inputs changed since the last build).
+        '''
+        solcmc_dir = self.path.joinpath('solcmc')
+        if not solcmc_dir.is_dir():
+            return []
+
+        if self.layout == 'regression':
+            return sorted(str(p) for p in solcmc_dir.rglob('*_v*.sol')
+                          if 'build' not in p.parts)
+
+        versions_paths = glob.glob(f'{self.path}/versions/*v*.sol')
+        properties_paths = glob.glob(f'{solcmc_dir}/*.sol')
+        if not versions_paths or not properties_paths:
+            return []
+
+        contracts_dir = solcmc_dir.joinpath('build', 'contracts')
+        contracts_dir.mkdir(parents=True, exist_ok=True)
+        copy_lib(contracts_dir)
+
+        result = manifest.build(versions_paths, properties_paths, contracts_dir)
+        contracts = result['written'] + result['unchanged']
+
+        return sorted(str(contracts_dir.joinpath(f)) for f in contracts)
+
+    def certora_inputs(self):
+        '''
+        Returns the inputs to verify with certora. For the contracts layout,
+        versions are written to certora/build/contracts with lib/ next to them
+        (and the getters of certora/getters.sol, if any), like the certora
+        Makefile does; a contract is rewritten only if its code changed.
+
+        Returns:
+            tuple: (contracts_paths, specs_paths) to verify with certora.
+        '''
+        specs_paths = sorted(glob.glob(f'{self.path}/certora/*.spec'))
+        if self.layout == 'contracts':
+            contracts_dir = self.certora_output_dir().joinpath('contracts')
+            contracts_dir.mkdir(parents=True, exist_ok=True)
+            copy_lib(contracts_dir)
+
+            getters_path = self.path.joinpath('certora', GETTERS_FILE)
+            getters = getters_path.read_text().splitlines(keepends=True) if getters_path.is_file() else None
+            contracts_paths = []
+            for version_path in glob.glob(f'{self.path}/versions/*_v*.sol'):
+                with open(version_path, 'r') as file:
+                    code = file.readlines()
+                if getters:
+                    code = inject_before_last_bracket(code, getters)
+                contract_path = contracts_dir.joinpath(Path(version_path).name)
+                manifest.write_if_changed(contract_path, ''.join(code))
+                contracts_paths.append(str(contract_path))
+        else:
+            contracts_paths = (glob.glob(f'{self.path}/*_v*.sol') or
+                               glob.glob(f'{self.path}/versions/*_v*.sol'))
+        return sorted(contracts_paths), specs_paths
+
+
+def copy_lib(contracts_dir):
+    '''
+    Copies the benchmark lib/ next to the contracts to verify.
+    '''
+    lib_dir = Path(__file__).parents[2].joinpath(LIB_DIR)
+    shutil.copytree(lib_dir, Path(contracts_dir).joinpath(LIB_DIR), dirs_exist_ok=True)
+
+
+def find_usecases(root, names=None) -> list:
+    '''
+    Finds the use cases under contracts/ and regression/ of the benchmark root.
+
+    Args:
+        root (str): Benchmark root directory.
+        names (list): Keep only these use cases (directory names).
+
+    Returns:
+        list: UseCase objects, sorted by name.
+    '''
+    usecases = []
+    # Absolute, since certora runs in the use case directory
+    root = Path(root).resolve()
+
+    for layout in USECASES_DIRS:
+        layout_dir = root.joinpath(layout)
+        if not layout_dir.is_dir():
+            continue
+
+        for path in sorted(layout_dir.iterdir()):
+            if not path.is_dir() or path.name == TEMPLATE_DIR:
+                continue
+            if names and path.name not in names:
+                continue
+            if not path.joinpath('ground-truth.csv').is_file():
+                continue
+            usecases.append(UseCase(path, layout))
+
+    return usecases
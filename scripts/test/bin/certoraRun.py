@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+'''
+Fake certoraRun.py, to test the Certora toolchain offline.
+
+Every rule and invariant of the spec is verified, unless its code contains
+"assert false", in which case it is violated.
+
+With --wait_for_results, prints the verdicts as the short output of
+certoraRun. Otherwise, prints the URL of the job and publishes its results in
+$FAKE_CERTORA_SERVER/output/fake/<job_id>/output.json, after
+$FAKE_CERTORA_DELAY seconds (default: 0).
+
+Usage:
+    PATH=test/bin:$PATH python run_certora.py -c <contracts> -s <specs> --async
+'''
+
+from pathlib import Path
+import subprocess
+import tempfile
+import json
+import uuid
+import sys
+import os
+import re
+
+
+def get_spec_path(args):
+    if '--verify' in args:
+        return args[args.index('--verify') + 1].split(':', 1)[1]
+    for arg in args:
+        if arg.endswith('.conf'):
+            with open(arg, 'r') as file:
+                conf = json.load(file)
+            return conf['verify'].split(':', 1)[1]
+    sys.exit('ERROR: no spec to verify')
+
+
+def main(args):
+    with open(get_spec_path(args), 'r') as file:
+        spec = file.read()
+
+    rules = {}
+    for code in re.split(r'(?=\b(?:rule|invariant)\s+\w+)', spec):
+        rule = re.match(r'(?:rule|invariant)\s+(\w+)', code)
+        if rule:
+            rules[rule.group(1)] = 'FAILURE' if 'assert false' in code else 'SUCCESS'
+
+    if '--wait_for_results' in args:
+        for rule, status in rules.items():
+            print(f'{"Violated" if status == "FAILURE" else "Verified"}: {rule}')
+        if 'FAILURE' in rules.values():
+            print('Failures summary:')
+        return
+
+    server = os.environ.get('FAKE_CERTORA_SERVER',
+                            os.path.join(tempfile.gettempdir(), 'fake-certora-server'))
+    job_dir = Path(server).resolve().joinpath('output', 'fake', uuid.uuid4().hex)
+    job_dir.mkdir(parents=True)
+    results = json.dumps({'rules': rules})
+
+    # Publish the results later, without keeping the output pipes open
+    delay = float(os.environ.get('FAKE_CERTORA_DELAY', 0))
+    publish = ('import sys, time; time.sleep(float(sys.argv[1])); '
+               'open(sys.argv[2] + ".tmp", "w").write(sys.argv[3]); '
+               'import os; os.replace(sys.argv[2] + ".tmp", sys.argv[2])')
+    subprocess.Popen([sys.executable, '-c', publish, str(delay),
+                      str(job_dir.joinpath('output.json')), results],
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+    print('Job submitted to server')
+    print(f'Follow your job and see verification results at {job_dir.as_uri()}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
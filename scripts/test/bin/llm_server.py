@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+'''
+Local stand-in of the OpenAI and Anthropic APIs, to test run_llm.py offline.
+
+Serves the endpoints used by run_llm.py:
+    POST /v1/responses          OpenAI responses (gpt-5, gpt-4.1, ...)
+    POST /v1/chat/completions   OpenAI chat completions (gpt-4o, gpt-3.5)
+    POST /v1/messages           Anthropic messages, also streamed
+Every request waits --latency seconds, then gets an answer in the format
+expected by run_llm.parse_llm_output: TRUE or FALSE, depending on a hash of
+the prompt. Beyond --max-concurrent requests in flight, requests get a 429,
+like a rate limited provider.
+
+Prompt caching is simulated, counting words as tokens: Anthropic blocks up to
+the last one with cache_control are cached, and read by the later requests
+with the same prefix; OpenAI requests read the longest prefix they share with
+a previous prompt with the same prompt_cache_key. A prefix is cached when its
+request completes. Cached tokens are reported in the usage, and cut the
+latency: a fully cached prompt waits 20% of --latency.
+
+Prints the URL of the server on the first line of stdout, then serves until
+killed. Usage:
+    python test/bin/llm_server.py --port 8765 --latency 2 --max-concurrent 16
+    python run_llm.py --base_url http://127.0.0.1:8765 ...
+'''
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import argparse
+import zlib
+import json
+import time
+import sys
+
+
+CACHED_LATENCY = 0.2
+CACHE_ENTRIES = 100     # per cache key
+
+
+def get_blocks(body):
+    messages = body.get('messages') or body.get('input') or []
+    content = messages[-1]['content'] if messages else ''
+    return [{'text': content}] if isinstance(content, str) else content
+
+
+def get_prompt(body):
+    return ''.join(block.get('text', '') for block in get_blocks(body))
+
+
+def common_prefix(words, other):
+    n = 0
+    for word, other_word in zip(words, other):
+        if word != other_word:
+            break
+        n += 1
+    return n
+
+
+def get_answer(prompt):
+    if zlib.crc32(prompt.encode()) % 2:
+        return 'ANSWER: TRUE\nEXPLANATION: The property holds.\nCOUNTEREXAMPLE: N/A'
+    return ('ANSWER: FALSE\nEXPLANATION: The property does not hold.\n'
+            'COUNTEREXAMPLE: A call violating the property.')
+
+
+def cache_entry(body, anthropic):
+    '''
+    Returns:
+        tuple: (cache key, words of the cacheable prefix of the prompt), or
+        None. Anthropic caches the blocks up to the last one with
+        cache_control; OpenAI caches whole prompts, routed by prompt_cache_key.
+    '''
+    if not anthropic:
+        return body.get('prompt_cache_key', ''), get_prompt(body).split()
+    blocks = get_blocks(body)
+    marked = [i for i, block in enumerate(blocks) if block.get('cache_control')]
+    if not marked:
+        return None
+    return 'anthropic', ''.join(block.get('text', '') for block in blocks[:marked[-1] + 1]).split()
+
+
+def cached_tokens(server, entry, anthropic):
+    '''
+    Returns:
+        int: Tokens of the prefix already cached by completed requests: the
+        whole prefix for Anthropic, the longest common prefix for OpenAI.
+    '''
+    key, words = entry
+    with server.lock:
+        cached = server.cache.get(key, [])
+        if anthropic:
+            return len(words) if words in cached else 0
+        return max((common_prefix(words, other) for other in cached), default=0)
+
+
+def write_cache(server, entry):
+    key, words = entry
+    with server.lock:
+        cached = server.cache.setdefault(key, [])
+        if words not in cached:
+            cached.append(words)
+            del cached[:-CACHE_ENTRIES]
+
+
+def responses(body, text, tokens):
+    input_tokens, read, _, output_tokens = tokens
+    return {'id': 'resp_fake', 'object': 'response', 'created_at': int(time.time()),
+            'model': body.get('model'), 'status': 'completed',
+            'output': [{'id': 'msg_fake', 'type': 'message', 'role': 'assistant', 'status': 'completed',
+                        'content': [{'type': 'output_text', 'text': text, 'annotations': []}]}],
+            'usage': {'input_tokens': input_tokens, 'input_tokens_details': {'cached_tokens': read},
+                      'output_tokens': output_tokens, 'output_tokens_details': {'reasoning_tokens': 0},
+                      'total_tokens': input_tokens + output_tokens}}
+
+
+def chat_completions(body, text, tokens):
+    input_tokens, read, _, output_tokens = tokens
+    return {'id': 'chatcmpl_fake', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': text}}],
+            'usage': {'prompt_tokens': input_tokens, 'prompt_tokens_details': {'cached_tokens': read},
+                      'completion_tokens': output_tokens, 'total_tokens': input_tokens + output_tokens}}
+
+
+def messages(body, text, tokens):
+    # Anthropic input_tokens do not include the cached ones
+    input_tokens, read, write, output_tokens = tokens
+    return {'id': 'msg_fake', 'type': 'message', 'role': 'assistant', 'model': body.get('model'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': input_tokens - read - write, 'output_tokens': output_tokens,
+                      'cache_read_input_tokens': read, 'cache_creation_input_tokens': write}}
+
+
+def message_events(body, text, tokens):
+    message = messages(body, text, tokens)
+    yield 'message_start', {'type': 'message_start',
+                            'message': {**message, 'content': [], 'stop_reason': None}}
+    yield 'content_block_start', {'type': 'content_block_start', 'index': 0,
+                                  'content_block': {'type': 'text', 'text': ''}}
+    yield 'content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                  'delta': {'type': 'text_delta', 'text': text}}
+    yield 'content_block_stop', {'type': 'content_block_stop', 'index': 0}
+    yield 'message_delta', {'type': 'message_delta',
+                            'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                            'usage': {'output_tokens': message['usage']['output_tokens']}}
+    yield 'message_stop', {'type': 'message_stop'}
+
+
+ENDPOINTS = {'/v1/responses': responses,
+             '/v1/chat/completions': chat_completions,
+             '/v1/messages': messages}
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024   # default: 5, which serializes bursts of connections
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # Once per connection, kept alive across requests
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def send_json(self, status, data, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_events(self, events):
+        # All at once, with a length, so that the connection is kept alive
+        payload = ''.join(f'event: {event}\ndata: {json.dumps(data)}\n\n' for event, data in events).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or '{}')
+        endpoint = ENDPOINTS.get(self.path.split('?')[0])
+        if endpoint is None:
+            self.send_json(404, {'error': {'type': 'not_found', 'message': self.path}})
+            return
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            admitted = server.running < server.max_concurrent
+            if admitted:
+                server.running += 1
+                server.peak = max(server.peak, server.running)
+            else:
+                server.rejected += 1
+        if not admitted:
+            self.send_json(429, {'type': 'error', 'error': {'type': 'rate_limit_error',
+                                                            'message': 'Too many requests in flight.'}},
+                           {'Retry-After': '0'})
+            return
+
+        try:
+            prompt = get_prompt(body)
+            text = get_answer(prompt)
+            input_tokens = len(prompt.split())
+            anthropic = endpoint is messages
+            entry = cache_entry(body, anthropic)
+            read = cached_tokens(server, entry, anthropic) if entry else 0
+            write = len(entry[1]) if entry and anthropic and not read else 0
+            with server.lock:
+                server.input_tokens += input_tokens
+                server.cache_read_tokens += read
+            uncached = 1 - read / input_tokens if input_tokens else 1
+            time.sleep(server.latency * (CACHED_LATENCY + (1 - CACHED_LATENCY) * uncached))
+            if entry:
+                write_cache(server, entry)
+            tokens = (input_tokens, read, write, len(text.split()))
+            if endpoint is messages and body.get('stream'):
+                self.send_events(message_events(body, text, tokens))
+            else:
+                self.send_json(200, endpoint(body, text, tokens))
+        finally:
+            with server.lock:
+                server.running -= 1
+
+    def do_GET(self):
+        # Counters, for the tests
+        with self.server.lock:
+            self.send_json(200, {'requests': self.server.requests, 'rejected': self.server.rejected,
+                                 'peak': self.server.peak, 'connections': self.server.connections,
+                                 'input_tokens': self.server.input_tokens,
+                                 'cache_read_tokens': self.server.cache_read_tokens})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=0, help='Port (default: a free one).')
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds per request (default: 0.5).')
+    parser.add_argument('--max-concurrent', type=int, default=1000,
+                        help='Requests in flight beyond which requests get a 429 (default: 1000).')
+    args = parser.parse_args(args)
+
+    server = Server(('127.0.0.1', args.port), Handler)
+    server.lock = threading.Lock()
+    server.latency = args.latency
+    server.max_concurrent = args.max_concurrent
+    server.running = server.requests = server.rejected = server.peak = server.connections = 0
+    server.input_tokens = server.cache_read_tokens = 0
+    server.cache = {}   # {cache key: [words of a cached prefix, ...]}
+
+    print(f'http://127.0.0.1:{server.server_address[1]}', flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+from tools import cache
+from tools.solcmc import run, cache_key
+from utils import STRONG_POSITIVE
+import unittest
+import tempfile
+import time
+import os
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.temp_dir.cleanup()
+
+    def test_miss(self):
+        self.assertIsNone(cache.get(self.cache_dir, cache.hash_key('a')))
+
+    def test_put_get(self):
+        key = cache.hash_key('a', 'b')
+        cache.put(self.cache_dir, key, STRONG_POSITIVE, 'log', solver='z3')
+
+        entry = cache.get(self.cache_dir, key)
+
+        self.assertEqual(entry['outcome'], STRONG_POSITIVE)
+        self.assertEqual(entry['log'], 'log')
+        self.assertEqual(entry['solver'], 'z3')
+
+    def test_hash_key_parts(self):
+        self.assertNotEqual(cache.hash_key('ab', 'c'), cache.hash_key('a', 'bc'))
+        self.assertEqual(cache.hash_key('a', None), cache.hash_key('a', ''))
+
+    def test_evict_max_entries(self):
+        keys = [cache.hash_key(str(i)) for i in range(5)]
+        for i, key in enumerate(keys):
+            cache.put(self.cache_dir, key, STRONG_POSITIVE, '')
+            meta_path = os.path.join(self.cache_dir, key[:2], key + '.json')
+            os.utime(meta_path, (i, time.time() - 100 + i))
+
+        removed = cache.evict(self.cache_dir, max_entries=2)
+
+        self.assertEqual(removed, 3)
+        self.assertIsNone(cache.get(self.cache_dir, keys[0]))
+        self.assertIsNotNone(cache.get(self.cache_dir, keys[4]))
+
+    def test_evict_max_age(self):
+        old, new = cache.hash_key('old'), cache.hash_key('new')
+        cache.put(self.cache_dir, old, STRONG_POSITIVE, '')
+        cache.put(self.cache_dir, new, STRONG_POSITIVE, '')
+        old_meta_path = os.path.join(self.cache_dir, old[:2], old + '.json')
+        os.utime(old_meta_path, (0, time.time() - 3 * 24 * 60 * 60))
+
+        removed = cache.evict(self.cache_dir, max_age_days=2)
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(cache.get(self.cache_dir, old))
+        self.assertIsNotNone(cache.get(self.cache_dir, new))
+
+
+class TestSolcmcCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.contract_path = os.path.join(self.temp_dir.name, 'Test_p_v1.sol')
+        with open(self.contract_path, 'w') as f:
+            f.write('import "./lib/L.sol";\ncontract Test {}\n')
+        os.mkdir(os.path.join(self.temp_dir.name, 'lib'))
+        self.lib_path = os.path.join(self.temp_dir.name, 'lib', 'L.sol')
+        with open(self.lib_path, 'w') as f:
+            f.write('contract L {}\n')
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.temp_dir.cleanup()
+
+    def test_hit_does_not_run_solc(self):
+        key = cache_key(self.contract_path, '10m', 'z3')
+        cache.put(self.cache_dir, key, STRONG_POSITIVE, 'cached log')
+
+        outcome, log = run(self.contract_path, '10m', 'z3', self.cache_dir)
+
+        self.assertEqual(outcome, STRONG_POSITIVE)
+        self.assertEqual(log, 'cached log')
+
+    def test_key_depends_on_inputs(self):
+        key = cache_key(self.contract_path, '10m', 'z3')
+
+        self.assertNotEqual(key, cache_key(self.contract_path, '1m', 'z3'))
+        self.assertNotEqual(key, cache_key(self.contract_path, '10m', 'eld'))
+
+        with open(self.lib_path, 'a') as f:
+            f.write('// changed\n')
+
+        self.assertNotEqual(key, cache_key(self.contract_path, '10m', 'z3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+from tools import certora
+from tools import cache
+from utils import STRONG_POSITIVE, WEAK_NEGATIVE, OUT_OF_MEMORY
+from unittest.mock import patch
+from pathlib import Path
+import unittest
+import tempfile
+import json
+import os
+
+
+FAKE_BIN_DIR = os.path.join(os.path.dirname(__file__), 'bin')
+
+
+class TestParseVerdicts(unittest.TestCase):
+
+    def test_verdicts(self):
+        output = '''Verified: deposit_revert
+Violated: withdraw_revert
+Verified: withdraw_revert
+'''
+        verdicts = certora.parse_verdicts(output)
+
+        self.assertEqual(verdicts, {'deposit_revert': 'Verified',
+                                    'withdraw_revert': 'Violated'})
+
+    def test_no_verdicts(self):
+        self.assertEqual(certora.parse_verdicts('CRITICAL: solc had an error'), {})
+
+
+class TestClassifyFunction(unittest.TestCase):
+
+    def test_out_of_memory(self):
+        stderr = 'java.lang.OutOfMemoryError: Java heap space\n'
+        outcome, _ = certora.classify('', stderr, 'p.spec', False, True, False, returncode=1)
+
+        self.assertEqual(outcome, OUT_OF_MEMORY)
+
+    def test_killed(self):
+        outcome, _ = certora.classify('Verified: p\n', '', 'p.spec', False, True, False, returncode=-9)
+
+        self.assertEqual(outcome, OUT_OF_MEMORY)
+
+
+class TestCertoraCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.contract_path = os.path.join(self.temp_dir.name, 'Test_v1.sol')
+        self.spec_path = os.path.join(self.temp_dir.name, 'prop.spec')
+        with open(self.contract_path, 'w') as f:
+            f.write('contract Test {}\n')
+        with open(self.spec_path, 'w') as f:
+            f.write('rule prop { assert true; }\n')
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_spec(self):
+        key = certora.cache_key(self.contract_path, self.spec_path)
+
+        with open(self.spec_path, 'a') as f:
+            f.write('// changed\n')
+
+        self.assertNotEqual(key, certora.cache_key(self.contract_path, self.spec_path))
+
+    def test_key_depends_on_version(self):
+        with patch('tools.certora.get_certora_version', return_value='certora-cli 7.0.0'):
+            key = certora.cache_key(self.contract_path, self.spec_path)
+        with patch('tools.certora.get_certora_version', return_value='certora-cli 8.0.0'):
+            self.assertNotEqual(key, certora.cache_key(self.contract_path, self.spec_path))
+
+    def test_run_all_serves_hits(self):
+        key = certora.cache_key(self.contract_path, self.spec_path)
+        cache.put(self.cache_dir, key, STRONG_POSITIVE, 'Verified: prop')
+        logs_dir = Path(self.temp_dir.name).joinpath('logs')
+
+        outcomes = certora.run_all([self.contract_path], [self.spec_path],
+                                   False, logs_dir, self.cache_dir)
+
+        self.assertEqual(outcomes, {'prop_v1': STRONG_POSITIVE})
+        with open(logs_dir.joinpath('prop_v1.log')) as f:
+            self.assertEqual(f.read(), 'Verified: prop')
+
+
+class TestRenderResults(unittest.TestCase):
+
+    def test_parametric_rule(self):
+        results = {'rules': {'prop': {'SUCCESS': ['deposit()'], 'FAILURE': ['withdraw()']},
+                             'other': 'SUCCESS',
+                             'slow': 'TIMEOUT'}}
+
+        output = certora.render_results(results)
+
+        self.assertIn('Violated: prop', output)
+        self.assertIn('Verified: other', output)
+        self.assertNotIn(': slow', output)
+        self.assertIn('Failures summary', output)
+
+
+class TestAsyncMode(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.contract_path = os.path.join(self.temp_dir.name, 'Test_v1.sol')
+        self.tracker_path = os.path.join(self.temp_dir.name, certora.TRACKER_FILE)
+        with open(self.contract_path, 'w') as f:
+            f.write('contract Test {}\n')
+        self.specs_paths = []
+        for property_id, assertion in [('p1', 'true'), ('p2', 'false')]:
+            spec_path = os.path.join(self.temp_dir.name, f'{property_id}.spec')
+            with open(spec_path, 'w') as f:
+                f.write(f'rule {property_id} {{ assert {assertion}; }}\n')
+            self.specs_paths.append(spec_path)
+
+        self.env = {'PATH': FAKE_BIN_DIR + os.pathsep + os.environ.get('PATH', ''),
+                    'FAKE_CERTORA_SERVER': os.path.join(self.temp_dir.name, 'server'),
+                    'FAKE_CERTORA_DELAY': '0.2'}
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.temp_dir.cleanup()
+
+    def run_all(self):
+        return certora.run_all([self.contract_path], self.specs_paths, False,
+                               tracker_path=self.tracker_path, poll_interval=0.05)
+
+    def test_submit_then_poll(self):
+        with patch.dict(os.environ, self.env):
+            outcomes = self.run_all()
+
+        self.assertEqual(outcomes, {'p1_v1': STRONG_POSITIVE, 'p2_v1': WEAK_NEGATIVE})
+        tracker = certora.Tracker(self.tracker_path)
+        self.assertEqual(tracker.records['p2_v1']['outcome'], WEAK_NEGATIVE)
+        self.assertTrue(tracker.records['p2_v1']['url'].startswith('file://'))
+
+    def test_interrupted_run_polls_submitted_jobs(self):
+        with patch.dict(os.environ, self.env):
+            self.run_all()
+
+        # Forget the outcomes, as if the run had been interrupted after submitting
+        with open(self.tracker_path, 'r') as f:
+            submissions = [l for l in f if 'outcome' not in json.loads(l)]
+        with open(self.tracker_path, 'w') as f:
+            f.writelines(submissions)
+
+        # certoraRun.py is not available: the jobs can only be polled
+        with patch.dict(os.environ, {'PATH': ''}):
+            outcomes = self.run_all()
+
+        self.assertEqual(outcomes, {'p1_v1': STRONG_POSITIVE, 'p2_v1': WEAK_NEGATIVE})
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.contract_path = os.path.join(self.temp_dir.name, 'Test_v1.sol')
+        with open(self.contract_path, 'w') as f:
+            f.write('contract Test {}\n')
+        specs = {'p1': 'rule p1 { assert true; }\n',
+                 'p2': 'rule p2 { assert false; }\n',
+                 'p3': '/// @custom:negate\nrule p3 { assert false; }\n',
+                 'p4': 'ghost mathint g;\nrule p4 { assert true; }\n'}
+        self.specs_paths = []
+        for property_id, code in specs.items():
+            spec_path = os.path.join(self.temp_dir.name, f'{property_id}.spec')
+            with open(spec_path, 'w') as f:
+                f.write(code)
+            self.specs_paths.append(spec_path)
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.temp_dir.cleanup()
+
+    def test_split_declarations(self):
+        code = '''methods { function f() external returns (uint) envfree; }
+rule r(method m) filtered { m -> !m.isView } { assert true; }
+invariant i() f() >= 0;
+'''
+        declarations = certora.split_declarations(code)
+
+        self.assertEqual([kind for kind, _ in declarations], ['methods', 'rule', 'invariant'])
+        self.assertTrue(declarations[1][1].endswith('{ assert true; }'))
+
+    def test_split_output(self):
+        renames = {'p1__p1': ('p1_v1', 'p1'), 'p2__p2': ('p2_v1', 'p2')}
+        output = 'Verified: p1__p1\nViolated: p2__p2\nFailures summary:\n'
+
+        outputs = certora.split_batch_output(output, renames)
+
+        self.assertEqual(outputs['p1_v1'], 'Verified: p1')
+        self.assertEqual(outputs['p2_v1'], 'Violated: p2\nFailures summary:')
+
+    def test_one_job_per_version(self):
+        jobs = certora.make_jobs([self.contract_path], self.specs_paths, False, batch=True)
+
+        self.assertEqual(sorted(job.id for job in jobs), ['batch:Test_v1_0', 'p4_v1'])
+
+    def test_same_outcomes(self):
+        env = {'PATH': FAKE_BIN_DIR + os.pathsep + os.environ.get('PATH', '')}
+        with patch.dict(os.environ, env):
+            outcomes = certora.run_all([self.contract_path], self.specs_paths, False)
+            batch_outcomes = certora.run_all([self.contract_path], self.specs_paths, False, batch=True)
+
+        self.assertEqual(len(batch_outcomes), 4)
+        self.assertEqual(batch_outcomes, outcomes)
+
+
+if __name__ == '__main__':
+    unittest.main()
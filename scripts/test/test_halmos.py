@@ -0,0 +1,79 @@
+from tools.halmos import parse_output, parse_times, find_test_file, run_all
+from unittest.mock import patch
+from utils import STRONG_POSITIVE, STRONG_NEGATIVE, UNKNOWN
+import unittest
+
+
+OUTPUT = '''Running 1 tests for Bank_p1_v1.t.sol:BankTest
+[PASS] check_p1(uint256) (paths: 2, time: 0.05s, bounds: [])
+Symbolic test result: 1 passed; 0 failed; time: 0.10s
+
+Running 1 tests for Bank_p1_v2.t.sol:BankTest
+\x1b[31m[FAIL]\x1b[0m check_p1(uint256) (paths: 1/2, time: 0.08s, bounds: [])
+Counterexample:
+    p_amount_uint256 = 0x00
+Symbolic test result: 0 passed; 1 failed; time: 0.12s
+
+Running 1 tests for Bank_p-two_v1.t.sol:BankTest
+[TIMEOUT] check_p_two(uint256) (paths: 1, time: 60.00s, bounds: [])
+'''
+
+
+class TestParseOutputFunction(unittest.TestCase):
+
+    def test_results(self):
+        results, _ = parse_output(OUTPUT)
+
+        self.assertEqual(results, {
+            ('Bank_p1_v1.t.sol', 'check_p1'): STRONG_POSITIVE,
+            ('Bank_p1_v2.t.sol', 'check_p1'): STRONG_NEGATIVE,
+            ('Bank_p-two_v1.t.sol', 'check_p_two'): UNKNOWN})
+
+    def test_sections(self):
+        _, sections = parse_output(OUTPUT)
+
+        self.assertTrue(sections['Bank_p1_v2.t.sol'].startswith('Running 1 tests for Bank_p1_v2'))
+        self.assertIn('Counterexample', sections['Bank_p1_v2.t.sol'])
+        self.assertNotIn('Counterexample', sections['Bank_p1_v1.t.sol'])
+
+
+class TestParseTimesFunction(unittest.TestCase):
+
+    def test_times(self):
+        times = parse_times(OUTPUT)
+
+        self.assertEqual(times[('Bank_p1_v2.t.sol', 'check_p1')], 0.08)
+        self.assertEqual(times[('Bank_p-two_v1.t.sol', 'check_p_two')], 60.0)
+
+class TestFindTestFileFunction(unittest.TestCase):
+
+    def test_versions(self):
+        results, _ = parse_output(OUTPUT)
+
+        self.assertEqual(find_test_file(results, 'p1', 'v2'), 'Bank_p1_v2.t.sol')
+        self.assertIsNone(find_test_file(results, 'p1', 'v3'))
+
+    def test_single_suite(self):
+        results = {('test/Bank.t.sol', 'check_p1'): STRONG_POSITIVE}
+
+        self.assertEqual(find_test_file(results, 'p1', 'v1'), 'test/Bank.t.sol')
+
+
+class TestRunAllFunction(unittest.TestCase):
+
+    @patch('tools.halmos.run', return_value=OUTPUT)
+    def test_single_run(self, run):
+        tasks = [('p1', 'v1'), ('p1', 'v2'), ('p-two', 'v1'), ('p3', 'v1')]
+
+        outcomes, logs, _ = run_all(tasks, 'halmos')
+
+        run.assert_called_once()
+        self.assertEqual(outcomes, {('p1', 'v1'): STRONG_POSITIVE,
+                                    ('p1', 'v2'): STRONG_NEGATIVE,
+                                    ('p-two', 'v1'): UNKNOWN,
+                                    ('p3', 'v1'): UNKNOWN})
+        self.assertIn('[PASS] check_p1', logs[('p1', 'v1')])
+
+
+if __name__ == '__main__':
+    unittest.main()
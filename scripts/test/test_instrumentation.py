@@ -1,4 +1,5 @@
 from setup.instrumentation import instrument_contracts
+from setup import instrumentation
 from unittest.mock import patch
 import unittest
 import tempfile
@@ -529,5 +530,45 @@ uint _z = 1;'''
         mock.assert_called_once_with(f'No instrumentation found in {property_path}.')
 
 
+class TestInstrumentPairs(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.versions_paths = []
+        for i in range(1, 4):
+            version_path = os.path.join(self.temp_dir.name, f'Test_v{i}.sol')
+            with open(version_path, 'w') as f:
+                f.write(f'contract Test {{\n    uint x = {i};\n\n    function f() public {{\n    }}\n}}\n')
+            self.versions_paths.append(version_path)
+
+        self.properties_paths = []
+        for i in range(1, 4):
+            property_path = os.path.join(self.temp_dir.name, f'p{i}.sol')
+            with open(property_path, 'w') as f:
+                f.write(f'/// @custom:ghost\nuint g{i};\n'
+                        f'/// @custom:preghost function f\nuint old{i} = x;\n'
+                        f'/// @custom:invariant\nfunction invariant() public view {{ assert(x == {i}); }}\n')
+            self.properties_paths.append(property_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parallel_same_output(self):
+        sequential = instrument_contracts(self.versions_paths, self.properties_paths, jobs=1)
+
+        with patch.object(instrumentation, 'MIN_PARALLEL_LINES', 0):
+            parallel = instrument_contracts(self.versions_paths, self.properties_paths, jobs=2)
+
+        self.assertEqual(len(sequential), 9)
+        self.assertEqual(list(parallel.items()), list(sequential.items()))
+
+    def test_ghost_state_injection_failed(self):
+        with open(self.versions_paths[0], 'w') as f:
+            f.write('contract\tTest {\n}\n')     # name found, pattern not found
+
+        with self.assertRaises(SystemExit):
+            instrument_contracts(self.versions_paths[:1], self.properties_paths[:1], jobs=1)
+
+
 if __name__ == '__main__':
     unittest.main()
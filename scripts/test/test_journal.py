@@ -0,0 +1,90 @@
+from tools.journal import Journal
+from run_solcmc import get_start
+import utils
+import unittest
+import tempfile
+import os
+
+USAGE = {'wall_time': 2.0, 'cpu_time': 1.5, 'max_rss': 1000}
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'journal.jsonl')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resume(self):
+        with Journal(self.path) as journal:
+            journal.add('p1_v1', 'P!', USAGE, 'logs/p1_v1.log', timeout='10m')
+        journal = Journal(self.path, resume=True)
+        journal.close()
+        self.assertEqual(journal.outcomes(), {'p1_v1': 'P!'})
+        self.assertEqual(journal.timeouts(), {'p1_v1': '10m'})
+        self.assertEqual(journal.records['p1_v1']['log'], 'logs/p1_v1.log')
+
+    def test_new_run(self):
+        with Journal(self.path) as journal:
+            journal.add('p1_v1', 'P!')
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.records, {})
+        with Journal(self.path, resume=True) as journal:
+            self.assertEqual(journal.records, {})
+
+    def test_torn_line(self):
+        with Journal(self.path) as journal:
+            journal.add('p1_v1', 'P!')
+            journal.add('p2_v1', 'N!')
+        with open(self.path, 'a') as file:
+            file.write('{"id": "p3_v1", "outc')
+        with Journal(self.path, resume=True) as journal:
+            self.assertEqual(journal.outcomes(), {'p1_v1': 'P!', 'p2_v1': 'N!'})
+
+    def test_steps(self):
+        with Journal(self.path) as journal:
+            journal.add('p1_v1', 'UNK', USAGE, timeout='1s')
+            journal.add('p1_v1', 'P!', USAGE, timeout='1m')
+        with Journal(self.path, resume=True) as journal:
+            self.assertEqual(journal.outcomes(), {'p1_v1': 'P!'})
+            self.assertEqual(journal.timeouts(), {'p1_v1': '1m'})
+            self.assertEqual(journal.usages['p1_v1'],
+                             {'wall_time': 4.0, 'cpu_time': 3.0, 'max_rss': 1000})
+
+    def test_write_csvs(self):
+        summary_csv = os.path.join(self.temp_dir.name, 'solcmc-z3.csv')
+        utils.write_csv(summary_csv, [utils.OUT_HEADER, ['p2', 'v1', 'N']])
+        with Journal(self.path) as journal:
+            journal.add('p1_v1', 'P!', USAGE, timeout='10m')
+            journal.write_csvs(self.temp_dir.name, summary_csv)
+        self.assertEqual(utils.read_csv(os.path.join(self.temp_dir.name, 'out.csv')),
+                         [utils.OUT_HEADER, ['p1', 'v1', 'P!']])
+        self.assertEqual(utils.read_peak_rss(os.path.join(self.temp_dir.name, utils.TIMINGS_FILE)),
+                         {'p1_v1': 1000})
+        self.assertEqual(utils.read_csv(summary_csv), [utils.OUT_HEADER, ['p1', 'v1', 'P!'], ['p2', 'v1', 'N']])
+
+    def test_write_csvs_timeouts(self):
+        with Journal(self.path) as journal:
+            journal.add('p1_v1', 'P!', USAGE, timeout='10m')
+            journal.write_csvs(self.temp_dir.name, with_timeouts=True)
+        self.assertEqual(utils.read_csv(os.path.join(self.temp_dir.name, 'out.csv')),
+                         [utils.OUT_HEADER + [utils.TIMEOUT_COLUMN], ['p1', 'v1', 'P!', '10m']])
+
+
+class TestGetStartFunction(unittest.TestCase):
+
+    def test_escalation(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with Journal(os.path.join(temp_dir, 'journal.jsonl')) as journal:
+                journal.add('p1_v1', 'P!', timeout='1s')
+                journal.add('p2_v1', 'UNK', timeout='1s')
+                journal.add('p3_v1', 'UNK', timeout='1m')
+                journal.add('p4_v1', 'ERR', timeout='1s')
+            start = get_start(journal, ['1s', '10s', '1m'])
+        self.assertEqual(start, {'p1_v1': 3, 'p2_v1': 1, 'p3_v1': 3, 'p4_v1': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
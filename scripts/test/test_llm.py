@@ -0,0 +1,213 @@
+from tools import llm
+from urllib.error import HTTPError
+from types import SimpleNamespace
+import urllib.request
+import subprocess
+import unittest
+import tempfile
+import asyncio
+import random
+import json
+import time
+import sys
+import os
+
+
+FAKE_SERVER = os.path.join(os.path.dirname(__file__), 'bin', 'llm_server.py')
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class TestIsOverloadFunction(unittest.TestCase):
+
+    def test_overload(self):
+        self.assertTrue(llm.is_overload(RateLimitError()))
+        self.assertTrue(llm.is_overload(TimeoutError()))
+        self.assertTrue(llm.is_overload(HTTPError('http://x', 429, 'Too Many Requests', {}, None)))
+
+    def test_not_overload(self):
+        self.assertFalse(llm.is_overload(ValueError()))
+        self.assertFalse(llm.is_overload(HTTPError('http://x', 400, 'Bad Request', {}, None)))
+
+
+class TestAIMD(unittest.TestCase):
+
+    def test_decrease_once_per_epoch(self):
+        async def burst():
+            limiter = llm.AIMD(8)
+            epochs = [await limiter.acquire() for _ in range(8)]
+            for epoch in epochs:
+                await limiter.release(epoch, overload=True)
+            return limiter.limit
+
+        self.assertEqual(asyncio.run(burst()), 4)
+
+    def test_increase(self):
+        async def recover():
+            limiter = llm.AIMD(8)
+            await limiter.release(await limiter.acquire(), overload=True)
+            await limiter.release(await limiter.acquire(), overload=True)
+            for _ in range(2):
+                await limiter.release(await limiter.acquire())
+            return limiter.limit
+
+        self.assertEqual(asyncio.run(recover()), 3)
+
+
+class TestRunFunction(unittest.TestCase):
+
+    def test_order(self):
+        def call(task):
+            time.sleep(random.uniform(0, 0.02))
+            return task * 2
+
+        completed = []
+        results = llm.run(list(range(20)), call, 5, on_result=lambda i, r: completed.append(i))
+
+        self.assertEqual(results, [i * 2 for i in range(20)])
+        self.assertEqual(sorted(completed), list(range(20)))
+
+    def test_retry(self):
+        attempts = []
+
+        def call(task):
+            attempts.append(task)
+            if attempts.count(task) == 1:
+                raise RateLimitError()
+            return task
+
+        self.assertEqual(llm.run([1, 2], call, 2, backoff=0), [1, 2])
+        self.assertEqual(len(attempts), 4)
+
+    def test_error(self):
+        def call(task):
+            raise ValueError('invalid request')
+
+        with self.assertRaises(ValueError):
+            llm.run([1], call, backoff=0)
+
+    def test_retries_exhausted(self):
+        def call(task):
+            raise RateLimitError()
+
+        with self.assertRaises(RateLimitError):
+            llm.run([1], call, retries=2, backoff=0)
+
+
+class TestTokenUsageFunction(unittest.TestCase):
+
+    def test_anthropic(self):
+        usage = SimpleNamespace(input_tokens=10, output_tokens=5,
+                                cache_read_input_tokens=900, cache_creation_input_tokens=0)
+        self.assertEqual(llm.token_usage(usage), {'input_tokens': 910, 'cache_read_tokens': 900,
+                                                  'cache_write_tokens': 0, 'output_tokens': 5})
+
+    def test_openai_responses(self):
+        usage = SimpleNamespace(input_tokens=910, output_tokens=5,
+                                input_tokens_details=SimpleNamespace(cached_tokens=896))
+        self.assertEqual(llm.token_usage(usage)['cache_read_tokens'], 896)
+        self.assertEqual(llm.token_usage(usage)['input_tokens'], 910)
+
+    def test_openai_chat(self):
+        usage = SimpleNamespace(prompt_tokens=910, completion_tokens=5, prompt_tokens_details=None)
+        self.assertEqual(llm.token_usage(usage)['cache_read_tokens'], 0)
+
+
+class TestOrderByPrefixFunction(unittest.TestCase):
+
+    def test_order(self):
+        first, rest = llm.order_by_prefix(['1', '2', '1', '3', '2', '1'])
+        self.assertEqual(first, [0, 1, 3])
+        self.assertEqual(rest, [2, 5, 4])
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = llm.ResponseCache(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hit(self):
+        key = llm.cache_key('prompt', 'gpt-5', 20000)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, 'ANSWER: TRUE', 12.5, model='gpt-5')
+
+        self.assertEqual(llm.ResponseCache(self.temp_dir.name).get(key), ('ANSWER: TRUE', 12.5))
+        self.assertEqual(self.cache.get(key), ('ANSWER: TRUE', 12.5))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key(self):
+        key = llm.cache_key('prompt', 'gpt-5', 20000)
+        self.assertNotEqual(key, llm.cache_key('prompt', 'gpt-5', 10000))
+        self.assertNotEqual(key, llm.cache_key('prompt', 'gpt-4o', 20000))
+        self.assertNotEqual(key, llm.cache_key('prompt!', 'gpt-5', 20000))
+        self.assertNotEqual(key, llm.cache_key('prompt', 'gpt-5', 20000, 'http://127.0.0.1:8765'))
+
+
+class TestFakeServer(unittest.TestCase):
+    ''' Throughput against test/bin/llm_server.py. '''
+
+    def start(self, *args):
+        server = subprocess.Popen([sys.executable, FAKE_SERVER, *args], stdout=subprocess.PIPE, text=True)
+        self.addCleanup(server.wait)
+        self.addCleanup(server.kill)
+        return server.stdout.readline().strip()
+
+    def post(self, url, body):
+        request = urllib.request.Request(url, json.dumps(body).encode(), {'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.load(response)
+
+    def call(self, url):
+        def call(task):
+            body = {'model': 'gpt-5', 'input': [{'role': 'user', 'content': f'task {task}'}]}
+            output = self.post(f'{url}/v1/responses', body)['output'][0]['content'][0]['text']
+            return task, output.split('\n')[0]
+        return call
+
+    def stats(self, url):
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return json.load(response)
+
+    def test_concurrency(self):
+        url = self.start('--latency', '0.2')
+        start = time.perf_counter()
+        results = llm.run(list(range(16)), self.call(url), 8)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([task for task, _ in results], list(range(16)))
+        self.assertIn(results[0][1], ['ANSWER: TRUE', 'ANSWER: FALSE'])
+        self.assertLess(elapsed, 16 * 0.2 / 2)
+        self.assertEqual(self.stats(url)['peak'], 8)
+
+    def test_rate_limited(self):
+        url = self.start('--latency', '0.05', '--max-concurrent', '2')
+        results = llm.run(list(range(12)), self.call(url), 8, backoff=0.01)
+
+        self.assertEqual([task for task, _ in results], list(range(12)))
+        stats = self.stats(url)
+        self.assertGreater(stats['rejected'], 0)
+        self.assertEqual(stats['requests'], 12 + stats['rejected'])
+
+    def test_prompt_caching(self):
+        url = self.start('--latency', '0')
+        prefix = 'contract code ' * 100
+
+        def message(property):
+            body = {'model': 'claude-sonnet-4-5', 'max_tokens': 10, 'messages': [{'role': 'user', 'content': [
+                    {'type': 'text', 'text': prefix, 'cache_control': {'type': 'ephemeral'}},
+                    {'type': 'text', 'text': property}]}]}
+            return self.post(f'{url}/v1/messages', body)['usage']
+
+        self.assertEqual(message('p1')['cache_creation_input_tokens'], 200)
+        self.assertEqual(message('p2')['cache_read_input_tokens'], 200)
+        self.assertEqual(message('p2')['input_tokens'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from tools import llm_results
+import unittest
+import tempfile
+import pickle
+import os
+
+HEADER = '"contract_id","property_id","ground_truth","llm_answer","llm_explanation","llm_counterexample","time","tokens","raw_output"\n'
+
+
+class TestLLMResults(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'results.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, *rows):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(HEADER + ''.join(rows))
+
+    def test_read(self):
+        self.write('"1","p1","True","TRUE","a ""quoted"", b","N/A","12.5","20000","ANSWER: TRUE\\nEXPLANATION: x"\n')
+        results = llm_results.read_results_csv(self.path)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['llm_explanation'], 'a "quoted", b')
+        self.assertEqual(results[0]['raw_output'], 'ANSWER: TRUE\\nEXPLANATION: x')
+
+    def test_read_legacy(self):
+        # Undoubled quotes, written by older versions
+        self.write('"1","p1","True","TRUE","require(x, "msg")","N/A","12.5","20000","raw"\n',
+                   '"2","p2","False","FALSE","ok","N/A","3.0","20000","raw"\n')
+        results = llm_results.read_results_csv(self.path)
+        self.assertEqual([r['property_id'] for r in results], ['p1', 'p2'])
+        self.assertEqual(results[0]['llm_explanation'], 'require(x, "msg")')
+
+    def test_types(self):
+        self.write('"1","p1","True","TRUE","","","12.5","20000",""\n',
+                   '"2","p2","False","PARSE_ERROR","","","","",""\n')
+        df = llm_results.load_results(self.path, use_sidecar=False)
+        self.assertEqual(df['ground_truth'].tolist(), [True, False])
+        self.assertEqual(df['time'][0], 12.5)
+        self.assertEqual(df['tokens'][0], 20000)
+        self.assertTrue(df['tokens'].isna()[1])
+
+    def test_sidecar(self):
+        self.write('"1","p1","True","TRUE","","","12.5","20000",""\n')
+        llm_results.load_results(self.path)
+        sidecar = llm_results.sidecar_path(self.path)
+        self.assertTrue(sidecar.is_file())
+
+        # Served from the sidecar while the csv is unchanged
+        with open(sidecar, 'rb') as file:
+            stamp, df = pickle.load(file)
+        df['llm_answer'] = 'CACHED'
+        with open(sidecar, 'wb') as file:
+            pickle.dump((stamp, df), file)
+        self.assertEqual(llm_results.load_results(self.path)['llm_answer'][0], 'CACHED')
+
+        self.write('"1","p1","True","FALSE","","","12.5","20000",""\n')
+        self.assertEqual(llm_results.load_results(self.path)['llm_answer'][0], 'FALSE')
+
+
+if __name__ == '__main__':
+    unittest.main()
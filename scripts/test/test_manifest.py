@@ -0,0 +1,77 @@
+from setup.manifest import build, load, MANIFEST_FILE, STAMP_FILE
+import unittest
+import tempfile
+import os
+
+
+class TestBuildFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.temp_dir.name, 'build')
+        os.mkdir(self.output_dir)
+
+        self.version_path = os.path.join(self.temp_dir.name, 'Test_v1.sol')
+        with open(self.version_path, 'w') as f:
+            f.write('contract Test {\n    uint x;\n}\n')
+
+        self.properties_paths = []
+        for property_id in ['p1', 'p2']:
+            property_path = os.path.join(self.temp_dir.name, f'{property_id}.sol')
+            with open(property_path, 'w') as f:
+                f.write(f'function invariant() public view {{ assert(x == {property_id[1]}); }}\n')
+            self.properties_paths.append(property_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def mtime(self, filename):
+        return os.stat(os.path.join(self.output_dir, filename)).st_mtime_ns
+
+    def test_first_build(self):
+        result = build([self.version_path], self.properties_paths, self.output_dir)
+
+        self.assertEqual(sorted(result['written']), ['Test_p1_v1.sol', 'Test_p2_v1.sol'])
+        self.assertEqual(sorted(load(self.output_dir)), ['Test_p1_v1.sol', 'Test_p2_v1.sol'])
+
+    def test_unchanged_keeps_mtime(self):
+        build([self.version_path], self.properties_paths, self.output_dir)
+        mtime = self.mtime('Test_p1_v1.sol')
+
+        result = build([self.version_path], self.properties_paths, self.output_dir)
+
+        self.assertEqual(result['written'], [])
+        self.assertEqual(self.mtime('Test_p1_v1.sol'), mtime)
+
+    def test_unchanged_touches_stamp(self):
+        build([self.version_path], self.properties_paths, self.output_dir)
+        for filename in [MANIFEST_FILE, STAMP_FILE]:
+            os.utime(os.path.join(self.output_dir, filename), ns=(0, 0))
+
+        build([self.version_path], self.properties_paths, self.output_dir)
+
+        self.assertEqual(self.mtime(MANIFEST_FILE), 0)
+        self.assertGreater(self.mtime(STAMP_FILE), 0)
+
+    def test_changed_property(self):
+        build([self.version_path], self.properties_paths, self.output_dir)
+        with open(self.properties_paths[1], 'a') as f:
+            f.write('// changed\n')
+
+        result = build([self.version_path], self.properties_paths, self.output_dir)
+
+        self.assertEqual(result['written'], ['Test_p2_v1.sol'])
+        self.assertEqual(result['unchanged'], ['Test_p1_v1.sol'])
+
+    def test_removed_property(self):
+        build([self.version_path], self.properties_paths, self.output_dir)
+
+        result = build([self.version_path], self.properties_paths[:1], self.output_dir)
+
+        self.assertEqual(result['removed'], ['Test_p2_v1.sol'])
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'Test_p2_v1.sol')))
+        self.assertEqual(list(load(self.output_dir)), ['Test_p1_v1.sol'])
+
+
+if __name__ == '__main__':
+    unittest.main()
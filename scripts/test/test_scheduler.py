@@ -0,0 +1,221 @@
+from tools.scheduler import Job, Portfolio, run, iter_results, add_usage, out_of_memory
+from tools import scheduler
+from unittest.mock import patch
+from utils import ERROR
+import unittest
+import asyncio
+import sys
+import time
+
+
+def sleep_job(id, seconds, tool='test'):
+    command = [sys.executable, '-c', f'import time; time.sleep({seconds}); print("{id}")']
+    return Job(id, tool, command, lambda returncode, stdout, stderr: stdout.strip())
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_results(self):
+        jobs = [sleep_job(f'j{i}', 0) for i in range(4)]
+
+        results = run(jobs, concurrency=2)
+
+        self.assertEqual(results, {f'j{i}': f'j{i}' for i in range(4)})
+
+    def test_job_without_command(self):
+        results = run([Job('cached', 'test', result='P!')])
+
+        self.assertEqual(results, {'cached': 'P!'})
+
+    def test_command_not_found(self):
+        job = Job('missing', 'test', ['nonexistent-command-xyz'], None)
+
+        outcome, _ = run([job])['missing']
+
+        self.assertEqual(outcome, ERROR)
+
+    def test_completion_order(self):
+        jobs = [sleep_job('slow', 0.5), sleep_job('fast', 0)]
+
+        async def collect():
+            return [job.id async for job, _ in iter_results(jobs, concurrency=2)]
+
+        self.assertEqual(asyncio.run(collect()), ['fast', 'slow'])
+
+    def test_tool_limit(self):
+        jobs = [sleep_job(f'j{i}', 0.3, tool='limited') for i in range(3)]
+
+        start = time.time()
+        run(jobs, concurrency=3, limits={'limited': 1})
+
+        self.assertGreaterEqual(time.time() - start, 0.9)
+
+    def test_tool_rate(self):
+        jobs = [sleep_job(f'j{i}', 0, tool='rated') for i in range(3)]
+
+        start = time.time()
+        run(jobs, concurrency=3, rates={'rated': 5})
+
+        # One launch at once, then one every 0.2s
+        self.assertGreaterEqual(time.time() - start, 0.4)
+
+    def test_then_outside_slots(self):
+        async def then(result):
+            await asyncio.sleep(0.3)
+            return result + '-polled'
+
+        jobs = [sleep_job(f'j{i}', 0) for i in range(3)]
+        for job in jobs:
+            job.then = then
+
+        start = time.time()
+        results = run(jobs, concurrency=1)
+
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(results['j0'], 'j0-polled')
+
+
+class TestUsage(unittest.TestCase):
+
+    def test_process_tree(self):
+        # The memory is allocated by a grandchild
+        child = 'x = bytearray(100 << 20); sum(range(10 ** 6))'
+        command = [sys.executable, '-c',
+                   f'import subprocess, sys; subprocess.run([sys.executable, "-c", "{child}"])']
+        job = Job('tree', 'test', command, lambda returncode, stdout, stderr: returncode)
+
+        self.assertEqual(run([job]), {'tree': 0})
+        self.assertGreater(job.usage['max_rss'], 100 << 10)   # KiB
+        self.assertGreater(job.usage['cpu_time'], 0)
+        self.assertGreaterEqual(job.usage['wall_time'], job.usage['cpu_time'] / 2)
+
+    def test_no_process(self):
+        job = Job('cached', 'test', result='P!')
+        run([job])
+
+        self.assertIsNone(job.usage)
+
+    def test_add_usage(self):
+        usage = add_usage({'wall_time': 1, 'cpu_time': None, 'max_rss': 10},
+                          {'wall_time': 2, 'cpu_time': 3, 'max_rss': 5})
+
+        self.assertEqual(usage, {'wall_time': 3, 'cpu_time': 3, 'max_rss': 10})
+
+
+class TestMemory(unittest.TestCase):
+
+    def test_memory_limit(self):
+        command = [sys.executable, '-c', 'x = bytearray(1 << 30)']
+        job = Job('oom', 'test', command, lambda returncode, stdout, stderr: out_of_memory(returncode, stderr),
+                  memory_limit=512 << 10)     # KiB
+
+        self.assertEqual(run([job]), {'oom': True})
+
+    def test_no_memory_limit(self):
+        command = [sys.executable, '-c', 'x = bytearray(1 << 20)']
+        job = Job('ok', 'test', command, lambda returncode, stdout, stderr: out_of_memory(returncode, stderr),
+                  memory_limit=512 << 10)
+
+        self.assertEqual(run([job]), {'ok': False})
+
+    def test_killed(self):
+        self.assertTrue(out_of_memory(-9))
+        self.assertTrue(out_of_memory(137))
+        self.assertFalse(out_of_memory(1, 'Error: Expected pragma.'))
+
+    def test_budget(self):
+        jobs = [sleep_job(f'j{i}', 0.3) for i in range(3)]
+        for job in jobs:
+            job.memory = 60
+
+        start = time.time()
+        run(jobs, concurrency=3, memory=100)
+
+        # Only one job fits at a time
+        self.assertGreaterEqual(time.time() - start, 0.9)
+
+    def test_budget_shared(self):
+        jobs = [sleep_job(f'j{i}', 0.3) for i in range(3)]
+        for job in jobs:
+            job.memory = 30
+
+        start = time.time()
+        run(jobs, concurrency=3, memory=100)
+
+        self.assertLess(time.time() - start, 0.6)
+
+    def test_larger_than_budget(self):
+        job = sleep_job('large', 0)
+        job.memory = 1000
+
+        self.assertEqual(run([job], memory=100), {'large': 'large'})
+
+class TestTimeout(unittest.TestCase):
+
+    def test_partial_output(self):
+        command = [sys.executable, '-c', 'import time; print("partial", flush=True); time.sleep(10)']
+        job = Job('slow', 'test', command, lambda returncode, stdout, stderr: stdout, timeout=0.5)
+
+        start = time.time()
+        results = run([job])
+
+        self.assertLess(time.time() - start, 3)
+        self.assertEqual(results, {'slow': 'partial\n'})
+        self.assertTrue(job.timed_out)
+
+    def test_not_timed_out(self):
+        job = sleep_job('fast', 0)
+        job.timeout = 5
+
+        self.assertEqual(run([job]), {'fast': 'fast'})
+        self.assertFalse(job.timed_out)
+
+    def test_sigterm_ignored(self):
+        code = ('import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+                'print("ready", flush=True); time.sleep(10)')
+        job = Job('stubborn', 'test', [sys.executable, '-c', code],
+                  lambda returncode, stdout, stderr: returncode, timeout=0.5)
+
+        start = time.time()
+        with patch.object(scheduler, 'KILL_GRACE', 0.5):
+            results = run([job])
+
+        self.assertLess(time.time() - start, 3)
+        self.assertEqual(results, {'stubborn': -9})
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def portfolio(self, jobs):
+        return Portfolio('task', jobs,
+                         decisive=lambda result: result == 'fast',
+                         combine=lambda results: results)
+
+    def test_loser_killed(self):
+        portfolio = self.portfolio([sleep_job('slow', 5), sleep_job('fast', 0)])
+
+        start = time.time()
+        results = run([portfolio], concurrency=2)
+
+        self.assertLess(time.time() - start, 4)
+        self.assertEqual(results, {'task': {'slow': None, 'fast': 'fast'}})
+
+    def test_not_decisive(self):
+        portfolio = self.portfolio([sleep_job('a', 0), sleep_job('b', 0.2)])
+
+        results = run([portfolio], concurrency=2)
+
+        self.assertEqual(results, {'task': {'a': 'a', 'b': 'b'}})
+
+    def test_cached_member_decisive(self):
+        portfolio = self.portfolio([sleep_job('slow', 5), Job('fast', 'test', result='fast')])
+
+        start = time.time()
+        results = run([portfolio])
+
+        self.assertLess(time.time() - start, 4)
+        self.assertEqual(results['task']['fast'], 'fast')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -158,5 +158,26 @@ foo,v8,TP"""
         self.assertEqual(score, expected)
 
 
+class TestSumTimings(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.temp_dir.cleanup()
+
+    def test_sum(self):
+        timings_paths = []
+        for i, rows in enumerate(['p1,v1,1.5,1.0,100\np1,v2,2.0,,', 'p1,v1,0.5,0.5,300']):
+            timings_path = os.path.join(self.temp_dir.name, f'timings{i}.csv')
+            with open(timings_path, 'w') as f:
+                f.write('property,version,wall_time,cpu_time,max_rss\n' + rows)
+            timings_paths.append(timings_path)
+
+        totals = scoring.sum_timings(timings_paths)
+
+        self.assertEqual(totals, {'tasks': 3, 'wall_time': 4.0, 'cpu_time': 1.5, 'max_rss': 300})
+
 if __name__ == '__main__':
     unittest.main()
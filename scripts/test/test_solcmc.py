@@ -1,4 +1,7 @@
-from tools.solcmc import run
+from tools.solcmc import run, classify, make_job, best_result, make_portfolio, BEST
+from unittest.mock import patch
+import stat
+from tools import scheduler
 import unittest
 import tempfile
 import os
@@ -9,7 +12,8 @@ from utils import (
         WEAK_NEGATIVE,
         NONDEFINABLE,
         UNKNOWN,
-        ERROR
+        ERROR,
+        OUT_OF_MEMORY
         )
 
 
@@ -177,5 +181,157 @@ contract TestContract {
         self.assertEqual(log, 'Use the dot to make a relative import: e.g. "./lib/lib.sol"')
 
 
+class TestClassifyFunction(unittest.TestCase):
+
+    def test_strong_negative(self):
+        stderr = 'Warning: CHC: Assertion violation happens here.\n --> a.sol:3:5:\n'
+        self.assertEqual(classify('', stderr, False), (STRONG_NEGATIVE, stderr))
+
+    def test_negate(self):
+        stderr = 'Info: CHC: 1 verification condition(s) proved safe!\n'
+        self.assertEqual(classify('', stderr, True)[0], STRONG_NEGATIVE)
+
+    def test_weak_before_strong(self):
+        stderr = ('Warning: CHC: Assertion violation happens here.\n'
+                  'Warning: CHC: Assertion violation might happen here.\n')
+        self.assertEqual(classify('', stderr, False)[0], WEAK_NEGATIVE)
+
+    def test_timeout(self):
+        self.assertEqual(classify('', '', False), (UNKNOWN, ''))
+
+    def test_error(self):
+        stderr = 'Error: Expected pragma.\nWarning: CHC: Assertion violation happens here.\n'
+        self.assertEqual(classify('', stderr, False), (ERROR, stderr))
+
+    def test_solver_not_found(self):
+        stderr = 'Warning: Solver Eldarica was selected for SMTChecker but it was not found.\n'
+        self.assertEqual(classify('', stderr, False),
+                         (ERROR, 'Solver Eldarica was not found. Check installation.'))
+
+    def test_out_of_memory(self):
+        stderr = "terminate called after throwing an instance of 'std::bad_alloc'\n"
+        self.assertEqual(classify('', stderr, False), (OUT_OF_MEMORY, stderr))
+
+    def test_killed(self):
+        stderr = 'Warning: CHC: Assertion violation might happen here.\n'
+        self.assertEqual(classify('', stderr, False, returncode=137)[0], OUT_OF_MEMORY)
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        # Fake solc printing a long log before the verdict
+        self.temp_dir = tempfile.TemporaryDirectory()
+        solc_path = os.path.join(self.temp_dir.name, 'solc')
+        with open(solc_path, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'seq 1 100000 >&2\n'
+                    'echo "Warning: CHC: Assertion violation happens here." >&2\n')
+        os.chmod(solc_path, os.stat(solc_path).st_mode | stat.S_IEXEC)
+
+        self.contract_path = os.path.join(self.temp_dir.name, 'p1_v1.sol')
+        with open(self.contract_path, 'w') as f:
+            f.write('contract C {}\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_log_file(self):
+        log_path = os.path.join(self.temp_dir.name, 'p1_v1.log')
+        path = self.temp_dir.name + os.pathsep + os.environ.get('PATH', '')
+
+        with patch.dict(os.environ, {'PATH': path}):
+            job = make_job('p1_v1', self.contract_path, log_path=log_path)
+            outcome, log = scheduler.run([job])['p1_v1']
+
+        self.assertEqual(outcome, STRONG_NEGATIVE)
+        self.assertIsNone(log)
+        with open(log_path) as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 100001)
+        self.assertEqual(lines[-1], 'Warning: CHC: Assertion violation happens here.\n')
+
+
+class TestTimeout(unittest.TestCase):
+
+    def setUp(self):
+        # Fake solc printing a partial log, then waiting for its solver
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pid_path = os.path.join(self.temp_dir.name, 'solver.pid')
+        solc_path = os.path.join(self.temp_dir.name, 'solc')
+        with open(solc_path, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'echo "Info: partial output" >&2\n'
+                    'sleep 30 &\n'
+                    f'echo $! > {self.pid_path}\n'
+                    'wait\n')
+        os.chmod(solc_path, os.stat(solc_path).st_mode | stat.S_IEXEC)
+
+        self.contract_path = os.path.join(self.temp_dir.name, 'p1_v1.sol')
+        with open(self.contract_path, 'w') as f:
+            f.write('contract C {}\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def is_running(self, pid):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                return f.read().split(') ')[1][0] != 'Z'
+        except FileNotFoundError:
+            return False
+
+    def test_partial_log(self):
+        path = self.temp_dir.name + os.pathsep + os.environ.get('PATH', '')
+
+        with patch.dict(os.environ, {'PATH': path}):
+            job = make_job('p1_v1', self.contract_path, timeout='1')
+            outcome, log = scheduler.run([job])['p1_v1']
+
+        self.assertEqual(outcome, UNKNOWN)
+        self.assertTrue(job.timed_out)
+        self.assertIn('Info: partial output', log)
+        self.assertIn('Timeout 1: stopped after', log)
+        self.assertLess(job.usage['wall_time'], 1 + scheduler.KILL_GRACE)
+
+        with open(self.pid_path) as f:
+            self.assertFalse(self.is_running(int(f.read())))
+
+    def test_not_cached(self):
+        path = self.temp_dir.name + os.pathsep + os.environ.get('PATH', '')
+        cache_dir = os.path.join(self.temp_dir.name, 'cache')
+
+        with patch.dict(os.environ, {'PATH': path}), \
+                patch('tools.solcmc.get_solc_version', return_value='fake'):
+            job = make_job('p1_v1', self.contract_path, timeout='1', cache_dir=cache_dir)
+            outcome, _ = scheduler.run([job])['p1_v1']
+
+        self.assertEqual(outcome, UNKNOWN)
+        self.assertFalse(os.path.isdir(cache_dir) and os.listdir(cache_dir))
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def test_best_result(self):
+        results = {'z3': (UNKNOWN, ''), 'eld': (STRONG_POSITIVE, 'eld log')}
+        self.assertEqual(best_result(results), (STRONG_POSITIVE, 'eld log'))
+
+    def test_best_result_negative_wins(self):
+        results = {'z3': (STRONG_POSITIVE, ''), 'eld': (STRONG_NEGATIVE, '')}
+        self.assertEqual(best_result(results)[0], STRONG_NEGATIVE)
+
+    def test_nondef(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            contract_path = os.path.join(temp_dir, 'p1_v1.sol')
+            with open(contract_path, 'w') as f:
+                f.write('/// @custom:nondef This property is nondefinable.\n')
+
+            portfolio = make_portfolio('p1_v1', contract_path)
+            results = scheduler.run([portfolio])['p1_v1']
+
+        self.assertEqual(set(results), {'z3', 'eld', BEST})
+        self.assertEqual(results[BEST][0], NONDEFINABLE)
+
+
 if __name__ == '__main__':
     unittest.main()
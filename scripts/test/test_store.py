@@ -0,0 +1,79 @@
+from tools.journal import Journal
+from tools import store
+import utils
+import unittest
+import tempfile
+import os
+
+GROUND_TRUTH = 'property,version,ground truth,footnote\r\np1,v1,1,\r\np1,v2,0,\r\np2,v1,0,\r\np2,v2,1,\r\n'
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.usecase_dir = os.path.join(self.temp_dir.name, 'contracts', 'bank')
+        os.makedirs(self.usecase_dir)
+        with open(os.path.join(self.usecase_dir, store.GROUND_TRUTH_FILE), 'w', newline='') as file:
+            file.write(GROUND_TRUTH)
+        self.store = store.Store(os.path.join(self.temp_dir.name, 'results.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.usecase_dir, name)
+
+    def test_results(self):
+        self.store.put_usecase(self.usecase_dir, 'certora',
+                               {'p1_v1': 'P!', 'p1_v2': 'P', 'p2_v1': 'N!', 'p2_v2': 'UNK'})
+        rows = self.store.query('''
+            SELECT property, version, result FROM results
+            WHERE usecase = 'contracts/bank' AND tool = 'certora' ORDER BY property, version''').fetchall()
+        self.assertEqual(rows, [('p1', 'v1', 'TP!'), ('p1', 'v2', 'FP'), ('p2', 'v1', 'TN!'), ('p2', 'v2', 'UNK')])
+
+    def test_llm_answers(self):
+        self.store.put_usecase(self.usecase_dir, 'gpt-5', {'p2_v2': 'FALSE', 'p1_v1': 'TRUE'},
+                               header=store.LLM_HEADER)
+        rows = self.store.query("SELECT property, result FROM results WHERE tool = 'gpt-5' ORDER BY property").fetchall()
+        self.assertEqual(rows, [('p1', 'TP'), ('p2', 'FN')])
+
+        self.store.export_csv('contracts/bank', 'gpt-5', self.path('gpt-5.csv'))
+        with open(self.path('gpt-5.csv'), newline='') as file:
+            self.assertEqual(file.read(), 'property_id,contract_id,llm_answer\np2,2,FALSE\np1,1,TRUE\n')
+
+    def test_round_trip(self):
+        utils.write_csv(self.path('halmos.csv'), [utils.OUT_HEADER + [utils.TIMEOUT_COLUMN],
+                                                 ['p1', 'v1', 'P!', '10m'], ['p2', 'v1', 'ND', '']])
+        self.assertEqual(self.store.import_csv(self.path('halmos.csv')), 2)
+        with open(self.path('halmos.csv'), 'rb') as file:
+            expected = file.read()
+
+        os.remove(self.path('halmos.csv'))
+        self.assertEqual(self.store.export_csv('contracts/bank', 'halmos', self.path('halmos.csv')), 2)
+        with open(self.path('halmos.csv'), 'rb') as file:
+            self.assertEqual(file.read(), expected)
+
+    def test_update(self):
+        usage = {'wall_time': 2.0, 'cpu_time': 1.5, 'max_rss': 1000}
+        self.store.put_usecase(self.usecase_dir, 'certora', {'p1_v1': 'UNK', 'p2_v1': 'N!'},
+                               usages={'p1_v1': usage, 'p2_v1': usage})
+        self.store.put_usecase(self.usecase_dir, 'certora', {'p1_v1': 'P!', 'p2_v1': 'N!'})
+        rows = self.store.query('SELECT property, outcome, wall_time FROM outcomes ORDER BY property').fetchall()
+        # The usage of the UNK run is not attached to the new outcome
+        self.assertEqual(rows, [('p1', 'P!', None), ('p2', 'N!', 2.0)])
+
+    def test_journal(self):
+        with Journal(os.path.join(self.temp_dir.name, 'journal.jsonl')) as journal:
+            journal.add('p1_v1', 'P!', {'wall_time': 2.0, 'cpu_time': 1.5, 'max_rss': 1000})
+            journal.add('p2_v1', 'N!')
+            journal.write_csvs(self.temp_dir.name, self.path('solcmc-z3.csv'), self.store)
+        rows = self.store.query('''
+            SELECT property, result, wall_time FROM results
+            WHERE tool = 'solcmc-z3' ORDER BY property''').fetchall()
+        self.assertEqual(rows, [('p1', 'TP!', 2.0), ('p2', 'TN!', None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+from setup.synthetic import generate, get_size, gen_property
+from setup.instrumentation import instrument_contracts, parse_ghosts
+from report_gen import cm
+import unittest
+import tempfile
+import os
+
+
+class TestGetSizeFunction(unittest.TestCase):
+
+    def test_bank(self):
+        self.assertEqual(get_size(1), (17, 27))
+
+    def test_tasks_scale(self):
+        versions, properties = get_size(100)
+        self.assertAlmostEqual(versions * properties / (17 * 27), 100, delta=2)
+
+
+class TestGenPropertyFunction(unittest.TestCase):
+
+    def test_all_tags(self):
+        ghosts = parse_ghosts(gen_property(0, 4, 4))
+        self.assertEqual(len(ghosts['pre']), 1)
+        self.assertEqual(len(ghosts['post']), 1)
+        self.assertEqual(len(ghosts['invariants']), 1)
+        self.assertTrue(ghosts['state'])
+
+
+class TestGenerateFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.inputs = generate(self.temp_dir.name, 3, 5, ghosts=6)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_instrument(self):
+        contracts = instrument_contracts(self.inputs['versions'], self.inputs['properties'], 1)
+        self.assertEqual(len(contracts), self.inputs['tasks'])
+        self.assertEqual(self.inputs['tasks'], 15)
+        for code in contracts.values():
+            self.assertIn('uint ghost_0;', code)
+            self.assertIn('function invariant_3()', code)
+
+    def test_deterministic(self):
+        with tempfile.TemporaryDirectory() as other_dir:
+            generate(other_dir, 3, 5, ghosts=6)
+            for path in ['ground-truth.csv', 'certora.csv', 'gpt-5.csv']:
+                with open(os.path.join(self.temp_dir.name, path)) as file:
+                    expected = file.read()
+                with open(os.path.join(other_dir, path)) as file:
+                    self.assertEqual(file.read(), expected)
+
+    def test_cm(self):
+        rows = cm.gen(os.path.join(self.temp_dir.name, 'ground-truth.csv'),
+                      os.path.join(self.temp_dir.name, 'solcmc/build/z3/out.csv'),
+                      os.path.join(self.temp_dir.name, 'solcmc'))
+        self.assertEqual(len(rows), 1 + self.inputs['tasks'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+from setup.usecases import find_usecases, LIB_DIR
+import unittest
+import tempfile
+import os
+
+
+class TestCertoraInputs(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.usecase_dir = os.path.join(self.temp_dir.name, 'contracts', 'bank')
+        for subdir in ['versions', 'certora']:
+            os.makedirs(os.path.join(self.usecase_dir, subdir))
+        with open(os.path.join(self.usecase_dir, 'ground-truth.csv'), 'w') as f:
+            f.write('property,version,ground truth\n')
+        with open(os.path.join(self.usecase_dir, 'versions', 'Bank_v1.sol'), 'w') as f:
+            f.write('import "./lib/ReentrancyGuard.sol";\ncontract Bank {\n}\n')
+        with open(os.path.join(self.usecase_dir, 'certora', 'p1.spec'), 'w') as f:
+            f.write('rule p1 { assert true; }\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_build_dir(self):
+        usecase, = find_usecases(self.temp_dir.name)
+        contracts_paths, specs_paths = usecase.certora_inputs()
+
+        contracts_dir = os.path.join(self.usecase_dir, 'certora', 'build', 'contracts')
+        self.assertEqual(contracts_paths, [os.path.join(contracts_dir, 'Bank_v1.sol')])
+        self.assertTrue(os.path.isdir(os.path.join(contracts_dir, LIB_DIR)))
+
+    def test_relative_root(self):
+        cwd = os.getcwd()
+        try:
+            os.chdir(self.temp_dir.name)
+            usecase, = find_usecases('.')
+        finally:
+            os.chdir(cwd)
+        contracts_paths, specs_paths = usecase.certora_inputs()
+
+        # certora runs in the use case directory
+        usecase_dir = os.path.realpath(self.usecase_dir)
+        self.assertEqual(contracts_paths, [os.path.join(usecase_dir, 'certora', 'build', 'contracts', 'Bank_v1.sol')])
+        self.assertEqual(specs_paths, [os.path.join(usecase_dir, 'certora', 'p1.spec')])
+
+    def test_getters(self):
+        with open(os.path.join(self.usecase_dir, 'certora', 'getters.sol'), 'w') as f:
+            f.write('function getX() public view returns (uint) { return 0; }\n')
+        usecase, = find_usecases(self.temp_dir.name)
+        contracts_paths, _ = usecase.certora_inputs()
+
+        with open(contracts_paths[0]) as f:
+            self.assertIn('function getX()', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
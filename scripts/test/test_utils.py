@@ -1,4 +1,5 @@
-from utils import get_properties
+from utils import (get_properties, update_out_csv, update_timings_csv, read_csv, parse_timeout, parse_timeouts,
+                   read_peak_rss, parse_memory)
 import unittest
 import tempfile
 import os
@@ -71,6 +72,125 @@ class TestGetPropertiesFunction(unittest.TestCase):
         res = get_properties(self.version_path, property_paths)
         self.assertEqual(res, expected_paths)
 
+    def test_dir_with_version_pattern(self):
+        property_dir = os.path.join(self.dir.name, 'call_verifier')
+        property_names = ['p1.sol', 'prop-3_v1.sol']
+        expected_names = ['prop-3_v1.sol', 'p1.sol']
+        property_paths = [os.path.join(property_dir, pn) for pn in property_names]
+        expected_paths = [os.path.join(property_dir, e) for e in expected_names]
+        res = get_properties(self.version_path, property_paths)
+        self.assertEqual(res, expected_paths)
+
+
+class TestUpdateOutCsvFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.out_csv_path = os.path.join(self.dir.name, 'out.csv')
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.dir.cleanup()
+
+    def test_keeps_other_tasks(self):
+        with open(self.out_csv_path, 'w') as f:
+            f.write('property,version,outcome\np1,v1,UNK\np2,v1,N!\n')
+
+        update_out_csv(self.out_csv_path, {'p1_v1': 'P!', 'p1_v2': 'N'})
+
+        self.assertEqual(read_csv(self.out_csv_path),
+                         [['property', 'version', 'outcome'],
+                          ['p1', 'v1', 'P!'],
+                          ['p1', 'v2', 'N'],
+                          ['p2', 'v1', 'N!']])
+
+    def test_timeouts(self):
+        with open(self.out_csv_path, 'w') as f:
+            f.write('property,version,outcome\np2,v1,N!\n')
+
+        update_out_csv(self.out_csv_path, {'p1_v1': 'P!', 'p_1_v2': 'UNK'},
+                       {'p1_v1': '30s', 'p_1_v2': '10m'})
+
+        self.assertEqual(read_csv(self.out_csv_path),
+                         [['property', 'version', 'outcome', 'timeout'],
+                          ['p1', 'v1', 'P!', '30s'],
+                          ['p2', 'v1', 'N!', ''],
+                          ['p_1', 'v2', 'UNK', '10m']])
+
+    def test_keeps_timeout_column(self):
+        with open(self.out_csv_path, 'w') as f:
+            f.write('property,version,outcome,timeout\np2,v1,N!,2m\n')
+
+        update_out_csv(self.out_csv_path, {'p1_v1': 'P!'})
+
+        self.assertEqual(read_csv(self.out_csv_path),
+                         [['property', 'version', 'outcome', 'timeout'],
+                          ['p1', 'v1', 'P!', ''],
+                          ['p2', 'v1', 'N!', '2m']])
+
+
+class TestUpdateTimingsCsvFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.timings_csv_path = os.path.join(self.dir.name, 'timings.csv')
+
+    def tearDown(self):
+        # Cleanup: close the temporary directory
+        self.dir.cleanup()
+
+    def test_keeps_other_tasks(self):
+        with open(self.timings_csv_path, 'w') as f:
+            f.write('property,version,wall_time,cpu_time,max_rss\np1,v1,1.000,1.000,100\np2,v1,2.000,,\n')
+
+        update_timings_csv(self.timings_csv_path,
+                           {'p1_v1': {'wall_time': 0.5, 'cpu_time': 0.25, 'max_rss': 2048},
+                            'p_1_v2': {'wall_time': 3, 'cpu_time': None, 'max_rss': None}})
+
+        self.assertEqual(read_csv(self.timings_csv_path),
+                         [['property', 'version', 'wall_time', 'cpu_time', 'max_rss'],
+                          ['p1', 'v1', '0.500', '0.250', '2048'],
+                          ['p2', 'v1', '2.000', '', ''],
+                          ['p_1', 'v2', '3.000', '', '']])
+
+    def test_read_peak_rss(self):
+        with open(self.timings_csv_path, 'w') as f:
+            f.write('property,version,wall_time,cpu_time,max_rss\np1,v1,1.000,1.000,100\np2,v1,2.000,,\n')
+
+        self.assertEqual(read_peak_rss(self.timings_csv_path), {'p1_v1': 100})
+        self.assertEqual(read_peak_rss(os.path.join(self.dir.name, 'missing.csv')), {})
+
+class TestParseTimeoutFunction(unittest.TestCase):
+
+    def test_units(self):
+        self.assertEqual(parse_timeout('30'), 30)
+        self.assertEqual(parse_timeout('30s'), 30)
+        self.assertEqual(parse_timeout('2m'), 120)
+        self.assertEqual(parse_timeout('1.5h'), 5400)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_timeout('10ms')
+
+    def test_parse_timeouts(self):
+        self.assertEqual(parse_timeouts('30s, 2m,10m'), ['30s', '2m', '10m'])
+        with self.assertRaises(ValueError):
+            parse_timeouts('2m,30s')
+
+
+class TestParseMemoryFunction(unittest.TestCase):
+
+    def test_units(self):
+        self.assertEqual(parse_memory('512'), 512 << 10)
+        self.assertEqual(parse_memory('512K'), 512)
+        self.assertEqual(parse_memory('8G'), 8 << 20)
+        self.assertEqual(parse_memory('1.5gb'), 3 << 19)
+
+    def test_invalid(self):
+        for memory in ['0', '8X', '-1G']:
+            with self.assertRaises(ValueError):
+                parse_memory(memory)
+
 
 if __name__ == '__main__':
     unittest.main()
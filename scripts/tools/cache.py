@@ -0,0 +1,209 @@
+'''
+Persistent content-addressed cache of verification outcomes.
+
+Every entry is identified by a key obtained hashing all the inputs of a
+verification task (source code, libraries, tool version, options...).
+Entries are stored as:
+    <cache_dir>/<key[:2]>/<key>.json    outcome and metadata
+    <cache_dir>/<key[:2]>/<key>.log     tool log
+'''
+
+from pathlib import Path
+import hashlib
+import logging
+import shutil
+import json
+import time
+import os
+
+import utils
+
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+        'CVB_CACHE_DIR',
+        Path.home().joinpath('.cache', 'contracts-verification-benchmark')))
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_MAX_AGE_DAYS = 60
+
+
+def hash_key(*parts) -> str:
+    '''
+    Hashes a sequence of str/bytes/None parts into a hex key.
+    Parts are length-prefixed, so that ('ab', 'c') and ('a', 'bc') differ.
+    '''
+    h = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b''
+        elif isinstance(part, str):
+            part = part.encode()
+        h.update(len(part).to_bytes(8, 'big'))
+        h.update(part)
+    return h.hexdigest()
+
+
+def hash_file(path) -> str:
+    '''
+    Hashes the content of a file. Returns an empty string if it does not exist.
+    '''
+    if not os.path.isfile(path):
+        return ''
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def hash_dir(path, suffixes=None) -> str:
+    '''
+    Hashes the relative paths and contents of the files in a directory tree.
+    Returns an empty string if the directory does not exist.
+    '''
+    path = Path(path)
+    if not path.is_dir():
+        return ''
+
+    parts = []
+    for file_path in sorted(path.rglob('*')):
+        if not file_path.is_file():
+            continue
+        if suffixes and file_path.suffix not in suffixes:
+            continue
+        parts += [str(file_path.relative_to(path)), hash_file(file_path)]
+    return hash_key(*parts)
+
+
+def hash_contract(contract_path, lib_dir='lib') -> str:
+    '''
+    Hashes a contract together with the files it imports through relative
+    imports and the library directory next to it.
+    '''
+    contract_dir = os.path.dirname(contract_path)
+    parts = [hash_file(contract_path)]
+    for import_path in sorted(utils.get_local_imports(contract_path)):
+        parts += [os.path.relpath(import_path, contract_dir), hash_file(import_path)]
+    parts.append(hash_dir(Path(contract_dir).joinpath(lib_dir)))
+    return hash_key(*parts)
+
+
+def _entry_paths(cache_dir, key):
+    entry_dir = Path(cache_dir).joinpath(key[:2])
+    return entry_dir.joinpath(key + '.json'), entry_dir.joinpath(key + '.log')
+
+
+def get(cache_dir, key, read_log=True):
+    '''
+    Retrieves a cache entry.
+
+    Args:
+        read_log (bool): Read the log, otherwise only its path is returned.
+
+    Returns:
+        dict: The stored entry, with the log under 'log' and its path under
+            'log_path', or None on a miss.
+    '''
+    meta_path, log_path = _entry_paths(cache_dir, key)
+
+    try:
+        with open(meta_path, 'r') as file:
+            entry = json.load(file)
+        if read_log:
+            with open(log_path, 'r') as file:
+                entry['log'] = file.read()
+        elif not log_path.is_file():
+            return None
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    entry['log_path'] = str(log_path)
+
+    # Refresh the entry, eviction removes the least recently used ones
+    try:
+        os.utime(meta_path)
+    except OSError:
+        pass
+
+    return entry
+
+
+def _tmp_path(path):
+    return path.with_name(f'{path.name}.{os.getpid()}.tmp')
+
+
+def _write_meta(meta_path, outcome, meta):
+    entry = dict(meta)
+    entry['outcome'] = outcome
+    entry['created'] = time.time()
+
+    tmp_path = _tmp_path(meta_path)
+    with open(tmp_path, 'w') as file:
+        file.write(json.dumps(entry))
+    os.replace(tmp_path, meta_path)
+
+
+def put(cache_dir, key, outcome, log, **meta):
+    '''
+    Stores a cache entry. Extra keyword arguments are stored as metadata.
+    Files are written atomically, so concurrent writers never corrupt entries.
+    '''
+    meta_path, log_path = _entry_paths(cache_dir, key)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Log first: an entry is visible only once its json exists
+    tmp_path = _tmp_path(log_path)
+    with open(tmp_path, 'w') as file:
+        file.write(log or '')
+    os.replace(tmp_path, log_path)
+
+    _write_meta(meta_path, outcome, meta)
+
+
+def put_file(cache_dir, key, outcome, log_file, **meta):
+    '''
+    Stores a cache entry whose log is copied from a file, see put.
+    '''
+    meta_path, log_path = _entry_paths(cache_dir, key)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = _tmp_path(log_path)
+    shutil.copyfile(log_file, tmp_path)
+    os.replace(tmp_path, log_path)
+
+    _write_meta(meta_path, outcome, meta)
+
+
+def evict(cache_dir,
+          max_entries=DEFAULT_MAX_ENTRIES,
+          max_age_days=DEFAULT_MAX_AGE_DAYS) -> int:
+    '''
+    Removes the entries not used in the last max_age_days days, then the least
+    recently used ones exceeding max_entries.
+
+    Returns:
+        int: Number of removed entries.
+    '''
+    cache_dir = Path(cache_dir)
+    if not cache_dir.is_dir():
+        return 0
+
+    entries = []    # [(last_use, meta_path), ...]
+    for meta_path in cache_dir.glob('*/*.json'):
+        try:
+            entries.append((meta_path.stat().st_mtime, meta_path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+
+    min_time = time.time() - max_age_days * 24 * 60 * 60
+    to_remove = [p for i, (t, p) in enumerate(entries)
+                 if t < min_time or i >= max_entries]
+
+    for meta_path in to_remove:
+        for path in [meta_path, meta_path.with_suffix('.log')]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    if to_remove:
+        logging.info(f'Evicted {len(to_remove)} entries from {cache_dir}.')
+
+    return len(to_remove)
@@ -5,27 +5,39 @@ Usage:
     python run_certora.py -c <file_or_dir> -s <spec_file> -o <output_dir>
 '''
 
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit, urlunsplit
+from urllib.request import urlopen
+from functools import lru_cache
 from string import Template
-from multiprocessing import Pool
 from pathlib import Path
+import importlib.metadata
 import subprocess
+import asyncio
 import logging
+import json
+import time
 import sys
 import os
 import re
-import time
-import random
-random.seed(42)
 
 import utils
+from tools import cache, scheduler
+from tools.scheduler import Job
 from utils import (STRONG_POSITIVE,
                    STRONG_NEGATIVE,
                    WEAK_POSITIVE,
                    WEAK_NEGATIVE,
                    NONDEFINABLE,
-                   ERROR)
+                   ERROR,
+                   OUT_OF_MEMORY)
+
+TOOL = 'certora'
+MAX_JOBS = 6    # n of jobs submitted in parallel
+SUBMIT_RATE = 2     # max n of submissions per second, to avoid conflicting runs
 
-THREADS = 6     # n of parallel executions
+LIB_DIR = 'lib'     # next to the contracts to verify
+CACHE_SUBDIR = 'certora'
 
 
 COMMAND_TEMPLATE = Template(
@@ -36,6 +48,20 @@ CONF_FILE_COMMAND_TEMPLATE = Template(
     'certoraRun.py $conf_path --wait_for_results --rule_sanity none'
 )
 
+# Asynchronous mode: jobs are submitted without waiting, then polled
+WAIT_FLAG = '--wait_for_results'
+TRACKER_FILE = 'certora-jobs.jsonl'
+JOB_URL = re.compile(r'(\w+://\S*/output/\w+/(\w+)\S*)')
+RESULTS_FILE = 'output.json'
+POLL_INTERVAL = 30  # seconds
+MAX_POLL_ERRORS = 10
+RULE_STATUSES = ['SUCCESS', 'FAILURE', 'TIMEOUT', 'UNKNOWN', 'SANITY_FAIL']
+
+# Batch mode: the specs of a version are verified by a single job
+BATCH_DIR = 'batches'   # next to the specs
+BATCH_DECLARATIONS = ['methods', 'rule', 'invariant']
+VERDICT_LINE = re.compile(r'^(\s*(?:Verified|Violated):\s*)(\w+)(.*)$')
+
 # Check if there is an error in the output (Deprec)
 def has_property_error(output, property):
     pattern = rf'.*ERROR: \[rule\] {re.escape(property).upper()}.*'
@@ -54,14 +80,50 @@ def violations_found(output):
     return re.search(pattern1, output, re.DOTALL) or re.search(pattern2, output, re.DOTALL)
 
 def property_violated(output, spec_path):
-    property_name = str(spec_path).replace("certora/","").replace(".spec","").replace("-","_")
+    property_name = Path(spec_path).stem.replace("-","_")
     return f"Violated: {property_name}" in output
 
 # Checks if the property was verified at least for one method
 def property_verified_at_least_one(output, spec_path):
-    property_name = str(spec_path).replace("certora/","").replace(".spec","").replace("-","_")
+    property_name = Path(spec_path).stem.replace("-","_")
     return f"Verified: {property_name}" in output
 
+def rule_statuses(value):
+    '''
+    Yields the statuses of a rule in the results of a job: either a status,
+    or a nested dict of statuses (e.g. per method of a parametric rule).
+    '''
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            if k in RULE_STATUSES:
+                if v:
+                    yield k
+            else:
+                yield from rule_statuses(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from rule_statuses(v)
+
+
+def render_results(results):
+    '''
+    Renders the results of a polled job as the short output of certoraRun,
+    e.g. "Verified: deposit_revert", so that they are classified the same way.
+    '''
+    lines = []
+    for rule, value in results.get('rules', {}).items():
+        statuses = set(rule_statuses(value))
+        if 'FAILURE' in statuses:
+            lines.append(f'Violated: {rule}')
+        elif statuses == {'SUCCESS'}:
+            lines.append(f'Verified: {rule}')
+    if any(l.startswith('Violated') for l in lines):
+        lines.append('Failures summary:')
+    return '\n'.join(lines) + '\n\n' + json.dumps(results, indent=2)
+
+
 def has_critical_error(output):
     pattern1 = r'.*CRITICAL.*'
     pattern2 = r'.*solc had an error.*'
@@ -73,30 +135,148 @@ def no_permission(output):
     return re.search(pattern, output, re.DOTALL)
 
 
-def run(contract_path, spec_path):
+def parse_verdicts(output):
+    """ Parse the per-rule verdicts, e.g. {'deposit_revert': 'Verified'}. """
+    verdicts = {}
+    for verdict, rule in re.findall(r'^\s*(Verified|Violated):\s*(\S+)', output, re.MULTILINE):
+        # A rule violated for at least one method is violated
+        if verdicts.get(rule) != 'Violated':
+            verdicts[rule] = verdict
+    return verdicts
+
+
+def get_command(contract_path, spec_path, spec_code, contract_name, cwd=None):
     '''
-    Runs a single certora experiment.
+    Builds the certoraRun command of an experiment, using, in order of
+    priority, the conf file in certora/conf/, the @custom:run line of the spec
+    or the default template. Conf files are relative to cwd (the use case dir).
+
+    Returns:
+        tuple: (command, conf_path) where conf_path is None if there is no conf.
+    '''
+    name, version_id = Path(contract_path).stem.split('_')
+    property_id = Path(spec_path).stem.split('_')[0]
+
+    conf_path = f'certora/conf/{name}_{property_id}_{version_id}.conf'
+    if os.path.isfile(os.path.join(cwd or '', conf_path)):
+        return CONF_FILE_COMMAND_TEMPLATE.substitute({'conf_path': conf_path}), conf_path
+
+    if re.search('/// @custom:run', spec_code):
+        command = utils.find_custom_run_line(spec_code)
+        command = command.replace('certoraRun ', 'certoraRun.py --short_output --rule_sanity none ')
+        command = command.replace('_v1.sol', f'_{version_id}.sol')
+    else:
+        params = {}
+        params['contract_path'] = contract_path
+        params['name'] = contract_name
+        params['spec_path'] = spec_path
+        params['msg'] = f'{name}_{property_id}_{version_id}'
+        command = COMMAND_TEMPLATE.substitute(params)
+
+    return command, None
+
+
+@lru_cache(maxsize=None)
+def get_certora_version():
+    '''
+    Returns the version of the installed certora-cli package, else the output
+    of `certoraRun.py --version`, or None if certora-cli is not installed.
+    '''
+    for package in ['certora-cli', 'certora-cli-beta']:
+        try:
+            return f'{package} {importlib.metadata.version(package)}'
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    try:
+        return subprocess.run(['certoraRun.py', '--version'],
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def cache_key(contract_path, spec_path, cwd=None):
+    '''
+    Computes the cache key of a certora experiment: a hash of the contract (with
+    its local imports and lib/), the spec, the conf file, the command and the
+    certora-cli version.
+    Returns None if the experiment cannot be run.
+    '''
+    contract_name = (utils.get_contract_name(contract_path)
+                     if os.path.isfile(contract_path) else None)
+    if not contract_name or not os.path.isfile(spec_path):
+        return None
+
+    with open(spec_path, 'r') as file:
+        spec_code = file.read()
+
+    command, conf_path = get_command(contract_path, spec_path, spec_code, contract_name, cwd)
+
+    return cache.hash_key(cache.hash_contract(contract_path, LIB_DIR),
+                          cache.hash_file(spec_path),
+                          cache.hash_file(os.path.join(cwd or '', conf_path)) if conf_path else None,
+                          command,
+                          get_certora_version())
+
+
+def classify(stdout, stderr, spec_path, negate, has_assert, has_invariant, returncode=None):
+    '''
+    Classifies the output of certoraRun.
+
+    Args:
+        returncode (int): Exit status of certoraRun, to detect the OOM killer.
 
     Returns:
         tuple: (outcome, log)
     '''
+    # Local compilation or type checking out of memory
+    if scheduler.out_of_memory(returncode, stderr):
+        print(stderr, file=sys.stderr)
+        return OUT_OF_MEMORY, f'{stdout}\n\n{stderr}'
 
-    # Check if the contract to verify exists
-    if not os.path.isfile(contract_path):
-        msg = f'{contract_path} not found.'
-        logging.error(msg)
-        return ERROR, msg
+    is_violated = property_violated(stdout, spec_path)
+    is_verified_once = property_verified_at_least_one(stdout, spec_path)
 
-    # Name of the Solidity contract to verify
-    contract_name = utils.get_contract_name(contract_path)
+    # is_violated and is_verified must be mutually exclusive
+    if (not is_violated) and (not is_verified_once):
+        logging.error(stdout)
+        return ERROR, stdout
+
+    # Handle Certora errors
+    if stderr:
+        print(stderr, file=sys.stderr)
+
+    if has_critical_error(stdout) and not is_violated:
+        logging.error(stdout)
+        return ERROR, stdout
+
+    if no_permission(stdout) and not is_violated:
+        logging.error(stdout)
+        return ERROR, stdout
+
+    # Save result
+    is_positive = no_errors_found(stdout)
+    # Negation
+    is_positive = not is_positive if negate else is_positive
+
+    if is_violated:
+        is_positive = False 
+
+    res = STRONG_POSITIVE if has_assert or has_invariant else WEAK_POSITIVE
+    if not is_positive:
+        res = WEAK_NEGATIVE if has_assert or has_invariant else STRONG_NEGATIVE
+
+    return res, f'{stdout}\n\n{stderr}'
 
-    # Check the contract name
-    if not contract_name:
-        msg = f'Could not retrieve {contract_path} contract name.'
-        logging.error(msg)
-        return ERROR, msg
 
-    # Process specs file
+def read_spec(contract_path, spec_path):
+    '''
+    Reads a CVL spec and processes its tags.
+
+    Returns:
+        tuple: (spec, result), where spec is a dict {'code', 'negate',
+        'has_assert', 'has_invariant'} and result is the (outcome, log) of
+        specs that are not to be verified (errors, nondefinable), else None.
+    '''
     negate = False
     has_satisfy = False
     has_assert = False
@@ -108,151 +288,559 @@ def run(contract_path, spec_path):
         has_satisfy = re.search('satisfy', spec_no_comments)
         has_assert = re.search('assert', spec_no_comments)
         has_invariant = re.search('invariant', spec_no_comments)
-        has_custom_run = re.search('/// @custom:run', spec_code)
 
         # Check if there are asserts or satisfy
         if not has_assert and not has_satisfy and not has_invariant:
             msg = f'Error in {spec_path}: No "assert" or "satisfy" found.'
             logging.error(msg)
-            return ERROR, msg
+            return None, (ERROR, msg)
 
         # Exit if both are used
         if has_assert and has_satisfy:
             msg = f'Error in {spec_path}: Combining both "satisfy" and "assert" is not allowed.'
             logging.error(msg)
-            return ERROR, msg
+            return None, (ERROR, msg)
 
         # Process tags
         # Tag Nondefinable
         nondef = re.search('/// @custom:nondef (.*)', spec_code)
         if nondef:
             print(f'{contract_path}: {NONDEFINABLE} (nondefinable)')
-            return NONDEFINABLE, nondef.group(1)
+            return None, (NONDEFINABLE, nondef.group(1))
 
         # Tag Negate
         negate = re.search('/// @custom:negate', spec_code)
 
+    spec = {'code': spec_code,
+            'negate': negate,
+            'has_assert': has_assert,
+            'has_invariant': has_invariant}
+    return spec, None
 
-    # Prepare to fill template command
-    params = {}
-    params['contract_path'] = contract_path
-    params['name'] = contract_name
-    params['spec_path'] = spec_path
+
+def split_declarations(code):
+    '''
+    Splits CVL code without comments into its top-level declarations.
+
+    Returns:
+        list: [(kind, text), ...], e.g. [('rule', 'rule p { ... }'), ...]
+    '''
+    declarations = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(code + ';'):
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        if depth > 0 or c not in '};':
+            continue
+
+        text = code[start:i + 1].strip().rstrip(';' if i == len(code) else '').strip()
+        start = i + 1
+        if not text:
+            continue
+        if text.startswith('{') and declarations:
+            # Body following a filter, e.g. rule r(method f) filtered {...} {...}
+            kind, previous = declarations.pop()
+            declarations.append((kind, previous + '\n' + text))
+        else:
+            declarations.append((re.match(r'\w*', text).group(), text))
+
+    return declarations
+
+
+def batch_key(contract_path, spec_path, spec, cwd=None):
+    '''
+    Returns the key of the specs that can be verified by the same job, i.e.
+    their methods block, None if the spec must be verified alone: specs run
+    with a conf file or a @custom:run line, and specs declaring anything but
+    rules and invariants (e.g. ghosts or hooks, which may clash).
+    '''
+    if re.search('/// @custom:run', spec['code']):
+        return None
     name, version_id = Path(contract_path).stem.split('_')
     property_id = Path(spec_path).stem.split('_')[0]
-    params['msg'] = f'{name}_{property_id}_{version_id}'
-    
-    conf_params = {}
-    conf_params['conf_path'] = f'certora/conf/{name}_{property_id}_{version_id}.conf'
-    conf_command = CONF_FILE_COMMAND_TEMPLATE.substitute(conf_params)
-
-    if os.path.isfile(conf_params['conf_path']):
-        #print(conf_command)
-        try:
-            log = subprocess.run(conf_command.split(), capture_output=True, text=True)
-        except FileNotFoundError as e:
-            if 'certoraRun' in str(e):
-                logging.error('Certora is not installed. Use:\npip install certora-cli.')
-                return ERROR, str(e)
-    else:
-        if has_custom_run:
-            command = utils.find_custom_run_line(spec_code)
-            command = command.replace('certoraRun ', 'certoraRun.py --short_output --rule_sanity none ')
-            command = command.replace('_v1.sol', f'_{version_id}.sol')
-        else:
-            command = COMMAND_TEMPLATE.substitute(params)
+    if os.path.isfile(os.path.join(cwd or '', f'certora/conf/{name}_{property_id}_{version_id}.conf')):
+        return None
+
+    declarations = split_declarations(utils.remove_comments(spec['code']))
+    if any(kind not in BATCH_DECLARATIONS for kind, _ in declarations):
+        return None
+
+    return '\n'.join(text for kind, text in declarations if kind == 'methods')
+
 
-        # Random wait to avoid conflicting Certora runs
-        wait_time = random.randint(1,1000)/1000
-        time.sleep(wait_time)
-        #print(command) #- substitute with a log that does not go to stdout
+def make_batch_spec(specs):
+    '''
+    Concatenates specs with the same methods block, renaming their rules and
+    invariants to <property>__<name>.
+
+    Args:
+        specs (list): [(id, spec_path, spec), ...]
+
+    Returns:
+        tuple: (code, {new_name: (id, name)})
+    '''
+    renames = {}
+    methods = []
+    code = []
+    for id, spec_path, spec in specs:
+        prefix = Path(spec_path).stem.split('_')[0].replace('-', '_')
+        declarations = split_declarations(utils.remove_comments(spec['code']))
+
+        names = {}
+        for kind, text in declarations:
+            if kind != 'methods':
+                names[re.match(r'\w+\s+(\w+)', text).group(1)] = f'{prefix}__'
+        renames.update({p + n: (id, n) for n, p in names.items()})
+
+        code.append(f'// {spec_path}')
+        for kind, text in declarations:
+            if kind == 'methods':
+                methods = methods or [text]
+                continue
+            text = re.sub(r'^(\w+\s+)(\w+)', lambda m: m.group(1) + names[m.group(2)] + m.group(2), text)
+            text = re.sub(r'(requireInvariant\s+)(\w+)',
+                          lambda m: m.group(1) + names.get(m.group(2), '') + m.group(2), text)
+            code.append(text + '\n')
+
+    return '\n'.join(methods + code), renames
+
+
+def split_batch_output(output, renames):
+    '''
+    Splits the output of a batch job into the output of each property: the
+    verdicts of its own rules (with their original names) and the lines not
+    about any rule, e.g. errors.
+
+    Returns:
+        dict: {id: output}
+    '''
+    ids = dict.fromkeys(id for id, _ in renames.values())
+    lines = {id: [] for id in ids}
+    violated = set()
+
+    for line in output.splitlines():
+        verdict = VERDICT_LINE.match(line)
+        if verdict and verdict.group(2) in renames:
+            id, name = renames[verdict.group(2)]
+            lines[id].append(verdict.group(1) + name + verdict.group(3))
+            if 'Violated' in verdict.group(1):
+                violated.add(id)
+        elif not re.search('Failures summary', line):
+            for id in ids:
+                lines[id].append(line)
+
+    # The failures summary is about the violated properties only
+    return {id: '\n'.join(lines[id] + (['Failures summary:'] if id in violated else []))
+            for id in ids}
+
+
+class Tracker:
+    '''
+    Local log of the jobs submitted without waiting for results, one JSON
+    record per line: a submission {'id', 'key', 'job_id', 'url', ...}, then,
+    once polled, the same record with the 'outcome'.
+    A job submitted but not polled (e.g. the run was interrupted) is polled
+    again, instead of being resubmitted, if its inputs did not change.
+    '''
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = {}   # {id: last record}
+        if self.path.is_file():
+            with open(self.path, 'r') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # truncated by an interrupted run
+                    self.records[record['id']] = record
+
+    def pending(self, id, key):
+        '''
+        Returns the submission of a job not yet polled, None if there is none.
+        '''
+        record = self.records.get(id)
+        if record and record.get('key') == key and 'outcome' not in record:
+            return record
+        return None
+
+    def add(self, record):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+        self.records[record['id']] = record
+
+
+def get_results_url(job_url):
+    scheme, netloc, path, query, _ = urlsplit(job_url)
+    return urlunsplit((scheme, netloc, path.rstrip('/') + '/' + RESULTS_FILE, query, ''))
+
+
+def fetch_results(job_url):
+    '''
+    Fetches the results of a submitted job.
+
+    Returns:
+        dict: Results of the job, None if it is still running.
+    '''
+    try:
+        with urlopen(get_results_url(job_url), timeout=60) as response:
+            return json.load(response)
+    except HTTPError as e:
+        if e.code == 404:
+            return None
+        raise
+    except URLError as e:
+        if isinstance(e.reason, FileNotFoundError):
+            return None
+        raise
+
+
+async def poll(job_url, interval=POLL_INTERVAL):
+    '''
+    Waits for the results of a submitted job.
+
+    Returns:
+        dict: Results of the job, None if they cannot be fetched.
+    '''
+    errors = 0
+    while True:
         try:
-            log = subprocess.run(command.split(), capture_output=True, text=True)
-        except FileNotFoundError as e:
-            if 'certoraRun' in str(e):
-                logging.error('Certora is not installed. Use:\npip install certora-cli.')
-                return ERROR, str(e)
-    is_violated = property_violated(log.stdout, spec_path)
-    is_verified_once = property_verified_at_least_one(log.stdout, spec_path)
+            results = await asyncio.to_thread(fetch_results, job_url)
+            errors = 0
+        except (OSError, ValueError) as e:
+            errors += 1
+            logging.warning(f'{job_url}: {e}')
+            if errors >= MAX_POLL_ERRORS:
+                return None
+            results = None
+        if results is not None:
+            return results
+        await asyncio.sleep(interval)
+
+
+def make_job(id, contract_path, spec_path, cache_dir=None, cwd=None, tracker=None,
+             poll_interval=POLL_INTERVAL, memory_limit=None):
+    '''
+    Prepares a certora experiment to be run by the scheduler.
+    If cache_dir is given, outcomes are looked up there before submitting the
+    job and stored there afterwards (errors and OOM are never stored).
+    The job runs in cwd (default: the current directory).
+    If tracker is given, the job is submitted without waiting for results:
+    the submission is recorded in the tracker, then the job polls the results
+    every poll_interval seconds without holding a scheduler slot.
+    If memory_limit (KiB) is given, it caps the address space of the local
+    certoraRun processes (compilation and type checking).
 
-    # is_violated and is_verified must be mutually exclusive
-    if (not is_violated) and (not is_verified_once):
-        logging.error(log.stdout)
-        return ERROR, log.stdout
+    Returns:
+        scheduler.Job: A job whose result is a tuple (outcome, log).
+    '''
 
-    # Handle Certora errors
-    if log.stderr:
-        print(log.stderr, file=sys.stderr)
+    # Check if the contract to verify exists
+    if not os.path.isfile(contract_path):
+        msg = f'{contract_path} not found.'
+        logging.error(msg)
+        return Job(id, TOOL, result=(ERROR, msg))
 
-    if has_critical_error(log.stdout) and not is_violated:
-        logging.error(log.stdout)
-        return ERROR, log.stdout
+    # Name of the Solidity contract to verify
+    contract_name = utils.get_contract_name(contract_path)
 
-    if no_permission(log.stdout) and not is_violated:
-        logging.error(log.stdout)
-        return ERROR, log.stdout
+    # Check the contract name
+    if not contract_name:
+        msg = f'Could not retrieve {contract_path} contract name.'
+        logging.error(msg)
+        return Job(id, TOOL, result=(ERROR, msg))
+
+    spec, result = read_spec(contract_path, spec_path)
+    if result:
+        return Job(id, TOOL, result=result)
+
+    spec_code = spec['code']
+    negate = spec['negate']
+    has_assert = spec['has_assert']
+    has_invariant = spec['has_invariant']
+
+    command, conf_path = get_command(contract_path, spec_path, spec_code, contract_name, cwd)
+
+    key = None
+    if cache_dir or tracker:
+        key = cache_key(contract_path, spec_path, cwd)
+
+    if cache_dir:
+        entry = cache.get(cache_dir, key)
+        if entry:
+            print(f'{contract_path}, {spec_path}: {entry["outcome"]} (cached)')
+            return Job(id, TOOL, result=(entry['outcome'], entry['log']))
+
+    #print(command) #- substitute with a log that does not go to stdout
+
+    def finish(returncode, stdout, stderr):
+        res, log = classify(stdout, stderr, spec_path, negate, has_assert, has_invariant, returncode)
+
+        if cache_dir and res not in (ERROR, OUT_OF_MEMORY):
+            cache.put(cache_dir, key, res, log,
+                      verdicts=parse_verdicts(stdout),
+                      contract=str(contract_path), spec=str(spec_path))
+
+        print(f'{contract_path}, {spec_path}: {res}')
+        return res, log
+
+    if not tracker:
+        return Job(id, TOOL, command.split(), finish, cwd=cwd, memory_limit=memory_limit)
+
+    def submitted(returncode, stdout, stderr):
+        job_url = JOB_URL.search(stdout) or JOB_URL.search(stderr)
+        if not job_url and scheduler.out_of_memory(returncode, stderr):
+            logging.error(f'{contract_path}, {spec_path}: out of memory.')
+            return OUT_OF_MEMORY, f'{stdout}\n\n{stderr}'
+        if not job_url:
+            logging.error(f'{contract_path}, {spec_path}: job not submitted.')
+            return ERROR, f'{stdout}\n\n{stderr}'
+
+        record = {'id': id, 'key': key,
+                  'job_id': job_url.group(2), 'url': job_url.group(1),
+                  'contract': str(contract_path), 'spec': str(spec_path),
+                  'submitted': time.time()}
+        tracker.add(record)
+        print(f'{contract_path}, {spec_path}: submitted {record["url"]}')
+        return record
+
+    async def then(result):
+        if isinstance(result, tuple):
+            return result   # not submitted
+
+        results = await poll(result['url'], poll_interval)
+        if results is None:
+            msg = f'Cannot fetch the results of {result["url"]}.'
+            logging.error(msg)
+            return ERROR, msg
 
-    # Save result
-    is_positive = no_errors_found(log.stdout)
-    # Negation
-    is_positive = not is_positive if negate else is_positive
+        res, log = finish(0, render_results(results), '')
+        tracker.add({**result, 'outcome': res, 'done': time.time()})
+        return res, log
 
-    if is_violated:
-        is_positive = False 
+    record = tracker.pending(id, key)
+    if record:
+        print(f'{contract_path}, {spec_path}: polling {record["url"]}')
+        return Job(id, TOOL, result=record, then=then)
 
-    res = STRONG_POSITIVE if has_assert or has_invariant else WEAK_POSITIVE
-    if not is_positive:
-        res = WEAK_NEGATIVE if has_assert or has_invariant else STRONG_NEGATIVE
+    command = [arg for arg in command.split() if arg != WAIT_FLAG]
+    return Job(id, TOOL, command, submitted, cwd=cwd, then=then, memory_limit=memory_limit)
 
-    print(f'{contract_path}, {spec_path}: {res}')
-    return res, f'{log.stdout}\n\n{log.stderr}'
 
+def make_batch_job(id, contract_path, specs, batch_path, cache_dir=None, cwd=None, memory_limit=None):
+    '''
+    Prepares a certora job verifying several specs of the same contract,
+    concatenated in batch_path, see make_batch_spec.
+    Each spec is classified from its own verdicts, as if it were verified by
+    its own job: if the job runs out of memory, all of them are OUT_OF_MEMORY.
+
+    Args:
+        specs (list): [(id, spec_path, spec), ...], spec as returned by read_spec.
 
-def run_log(id, contract_path, spec_path, logs_dir=None):
+    Returns:
+        scheduler.Job: A job whose result is a dict {id: (outcome, log)}.
     '''
-    Calls run() and writes the log.
+    code, renames = make_batch_spec(specs)
+    Path(batch_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(batch_path, 'w') as file:
+        file.write(code)
+
+    name, version_id = Path(contract_path).stem.split('_')
+    command = COMMAND_TEMPLATE.substitute({'contract_path': contract_path,
+                                           'name': utils.get_contract_name(contract_path),
+                                           'spec_path': batch_path,
+                                           'msg': f'{name}_{version_id}_batch'})
+
+    def finish(returncode, stdout, stderr):
+        outputs = split_batch_output(stdout, renames)
+        results = {}
+        for spec_id, spec_path, spec in specs:
+            res, log = classify(outputs[spec_id], stderr, spec_path,
+                                spec['negate'], spec['has_assert'], spec['has_invariant'], returncode)
+
+            if cache_dir and res not in (ERROR, OUT_OF_MEMORY):
+                cache.put(cache_dir, cache_key(contract_path, spec_path, cwd), res, log,
+                          verdicts=parse_verdicts(outputs[spec_id]),
+                          contract=str(contract_path), spec=str(spec_path))
+
+            print(f'{contract_path}, {spec_path}: {res} (batch)')
+            results[spec_id] = res, log
+        return results
+
+    return Job(id, TOOL, command.split(), finish, cwd=cwd, memory_limit=memory_limit)
+
+
+def run(contract_path, spec_path, cache_dir=None):
     '''
-    outcome, log = run(contract_path, spec_path)
+    Runs a single certora experiment.
+
+    Returns:
+        tuple: (outcome, log)
+    '''
+    job = make_job(contract_path, contract_path, spec_path, cache_dir)
+    return scheduler.run([job])[job.id]
+
+
+def write_log(id, outcome, log, logs_dir=None):
     if logs_dir:
         logs_dir.mkdir(parents=True, exist_ok=True)
         utils.write_log(Path(logs_dir).joinpath(id + '.log'), log)
     else:
         print(log)
         print(f'Result: {outcome}') 
-    return id, outcome
 
 
-def run_all(contracts_paths, specs_paths, only_ground_truth, logs_dir=None):
+def task_results(job, result):
     '''
-    Runs certora on all files of a directory.
+    Returns:
+        dict: {id: (outcome, log)} of the tasks of a job, several for batches.
+    '''
+    return result if isinstance(result, dict) else {job.id: result}
 
-    Args:
-        contracts_paths (list): Contracts paths.
-        specs_paths (list): CVL specs paths.
-        log_dir (str): Log directory path.
 
+def task_usage(job, tasks):
+    '''
     Returns:
-        dict: {key_v*: outcome}
+        dict: Usage of a task of a job with the given number of tasks: the
+        times of a batch are split evenly among its tasks. None if unknown.
     '''
-    outcomes = {}
-    inputs = []     # inputs for run_log()
+    if not job.usage:
+        return None
+    return {'wall_time': job.usage['wall_time'] / tasks,
+            'cpu_time': job.usage['cpu_time'] / tasks,
+            'max_rss': job.usage['max_rss']}
+
+
+def make_jobs(contracts_paths, specs_paths, only_ground_truth, cache_dir=None, cwd=None,
+              tracker=None, poll_interval=POLL_INTERVAL, batch=False, memory_limit=None, peak_rss=None,
+              done=None):
+    '''
+    Prepares the jobs of every (contract, spec) pair to verify, with ids p_v.
+    The jobs run in cwd, the use case directory (default: the current one).
+    With a tracker, jobs are submitted without waiting, see make_job.
+    With batch, the specs of a contract that can be verified together (see
+    batch_key) are verified by a single job, with id batch:<contract>_<n>,
+    waiting for its results even with a tracker.
+    If peak_rss ({id: KiB}, e.g. from timings.csv) is given, it is the memory
+    estimate of the jobs, the max of its tasks for a batch.
+    The ids in done (e.g. the tasks of a resumed journal) are skipped.
+    '''
+    peak_rss = peak_rss or {}
+    done = done or {}
+    jobs = []
+    ground_truth_path = os.path.join(cwd or '', 'ground-truth.csv')
 
     for contract_path in contracts_paths:
         # Get list of properties to verify for this contract
         contract_properties_paths = utils.get_properties(contract_path, specs_paths)
+        batches = {}    # {batch key: [(id, property_path, spec), ...]}
 
         for property_path in contract_properties_paths:
             property_id = Path(property_path).stem.split('_')[0]    # split to eventually remove version
             version_id = Path(contract_path).stem.split('_')[1]
             id = f'{property_id}_{version_id}'
-            if ((not only_ground_truth or utils.has_ground_truth(contract_path, property_path))
+            if id in done:
+                continue
+            if not ((not only_ground_truth or utils.has_ground_truth(contract_path, property_path, ground_truth_path))
                     and utils.has_rule_or_invariant(property_path)):
-                inputs.append((id, contract_path, property_path, logs_dir))
+                continue
+
+            key = None
+            if batch and os.path.isfile(contract_path) and utils.get_contract_name(contract_path):
+                spec, result = read_spec(contract_path, property_path)
+                if result:
+                    jobs.append(Job(id, TOOL, result=result))
+                    continue
+                cached = cache_dir and cache.get(cache_dir, cache_key(contract_path, property_path, cwd),
+                                                 read_log=False)
+                if not cached:
+                    key = batch_key(contract_path, property_path, spec, cwd)
+
+            if key is None:
+                job = make_job(id, contract_path, property_path, cache_dir, cwd,
+                               tracker, poll_interval, memory_limit)
+                job.memory = peak_rss.get(id)
+                jobs.append(job)
+            else:
+                batches.setdefault(key, []).append((id, property_path, spec))
+
+        for i, specs in enumerate(batches.values()):
+            if len(specs) == 1:
+                id, property_path, _ = specs[0]
+                job = make_job(id, contract_path, property_path, cache_dir, cwd,
+                               tracker, poll_interval, memory_limit)
+            else:
+                batch_path = Path(specs[0][1]).parent.joinpath(BATCH_DIR, f'{Path(contract_path).stem}_{i}.spec')
+                job = make_batch_job(f'batch:{batch_path.stem}', contract_path, specs,
+                                     batch_path, cache_dir, cwd, memory_limit)
+            job.memory = max((peak_rss[id] for id, _, _ in specs if id in peak_rss), default=None)
+            jobs.append(job)
+
+    return jobs
+
+
+def run_all(contracts_paths, specs_paths, only_ground_truth, logs_dir=None, cache_dir=None, max_jobs=MAX_JOBS,
+            tracker_path=None, poll_interval=POLL_INTERVAL, batch=False, usages=None,
+            memory_limit=None, memory_budget=None, peak_rss=None, journal=None):
+    '''
+    Runs certora on all files of a directory.
+    Cached outcomes are served directly, only cache misses are submitted.
+    Submissions are rate limited to SUBMIT_RATE per second.
 
-    with Pool(processes=THREADS) as pool:
-        # [(id, outcome), ...]
-        results = pool.starmap(run_log, inputs)
-        for id, outcome in results:
+    Args:
+        contracts_paths (list): Contracts paths.
+        specs_paths (list): CVL specs paths.
+        log_dir (str): Log directory path.
+        cache_dir (str): Outcomes cache directory, None to disable caching.
+        max_jobs (int): Max number of jobs submitted at the same time.
+        tracker_path (str): If given, jobs are submitted without waiting and
+            recorded in this file, then their results are polled concurrently
+            every poll_interval seconds.
+        batch (bool): Verify the compatible specs of a contract in one job.
+        usages (dict): If given, updated with the {key_v*: usage} of the local
+            certoraRun processes (see scheduler.Job.usage). The usage of a
+            batch is split evenly among its tasks.
+        memory_limit (int): Max memory of a certoraRun process in KiB, None
+            for no limit.
+        memory_budget (int): Max memory of the running certoraRun processes
+            in KiB, None for no budget.
+        peak_rss (dict): {key_v*: KiB}, memory estimates of the tasks.
+        journal (journal.Journal): If given, every completed task is recorded
+            there, and the tasks already in it are skipped.
+
+    Returns:
+        dict: {key_v*: outcome}
+    '''
+    tracker = Tracker(tracker_path) if tracker_path else None
+    jobs = make_jobs(contracts_paths, specs_paths, only_ground_truth, cache_dir,
+                     tracker=tracker, poll_interval=poll_interval, batch=batch,
+                     memory_limit=memory_limit, peak_rss=peak_rss,
+                     done=journal.records if journal else None)
+
+    def on_result(job, result):
+        tasks = task_results(job, result)
+        for id, (outcome, log) in tasks.items():
+            write_log(id, outcome, log, logs_dir)
+            if journal:
+                log_path = Path(logs_dir).joinpath(id + '.log') if logs_dir else None
+                journal.add(id, outcome, task_usage(job, len(tasks)), log_path)
+
+    results = scheduler.run(jobs, limits={TOOL: max_jobs}, on_result=on_result,
+                            rates={TOOL: SUBMIT_RATE}, memory=memory_budget)
+
+    outcomes = {}
+    for job in jobs:
+        tasks = task_results(job, results[job.id])
+        for id, (outcome, _) in tasks.items():
             outcomes[id] = outcome
+            if usages is not None and job.usage:
+                usages[id] = task_usage(job, len(tasks))
+
+    if cache_dir:
+        cache.evict(cache_dir)
 
     return outcomes
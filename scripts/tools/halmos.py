@@ -0,0 +1,171 @@
+'''
+Runs Halmos once on the test suite of a use case and demultiplexes its
+results per verification task.
+
+Tests of the task (p, v) are named check_<p> (with '-' replaced by '_') and
+are found in a file named <Name>_<p>_<v>.t.sol, e.g.:
+    Running 1 tests for CallVerifier_call-failure_v1.t.sol:CallVerifierTest
+    [PASS] check_call_failure(address) (paths: 2, time: 0.05s, bounds: [])
+'''
+
+from pathlib import Path
+import re
+
+from tools import scheduler
+from tools.scheduler import Job
+from utils import (STRONG_POSITIVE,
+                   STRONG_NEGATIVE,
+                   UNKNOWN,
+                   ERROR)
+
+TOOL = 'halmos'
+TEST_PREFIX = 'check_'
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+HEADER = re.compile(r'Running \d+ tests? for (\S+):(\S+)')
+RESULT = re.compile(r'\[(PASS|FAIL|TIMEOUT|ERROR)\]\s+(\w+)\(', re.IGNORECASE)
+TEST_TIME = re.compile(r'time:\s*([\d.]+)s')
+
+OUTCOMES = {'PASS': STRONG_POSITIVE,     # property holds
+            'FAIL': STRONG_NEGATIVE,     # counterexample found
+            'TIMEOUT': UNKNOWN,          # solver timeout, retried by --escalate
+            'ERROR': ERROR}
+
+
+def get_test_name(p):
+    return TEST_PREFIX + p.replace('-', '_')
+
+
+def parse_output(output):
+    '''
+    Parses the output of a Halmos run on several test files.
+
+    Returns:
+        tuple: ({(test_file, test_name): outcome}, {test_file: output section})
+    '''
+    results = {}
+    sections = {}
+    test_file = ''
+    section = []
+
+    for line in ANSI_ESCAPE.sub('', output).splitlines(keepends=True):
+        header = HEADER.search(line)
+        if header:
+            sections[test_file] = sections.get(test_file, '') + ''.join(section)
+            test_file = header.group(1)
+            section = []
+        section.append(line)
+
+        result = RESULT.search(line)
+        if result:
+            status, test_name = result.groups()
+            results[(test_file, test_name)] = OUTCOMES[status.upper()]
+
+    sections[test_file] = sections.get(test_file, '') + ''.join(section)
+    return results, sections
+
+
+def parse_times(output):
+    '''
+    Returns:
+        dict: {(test_file, test_name): seconds}, as reported by Halmos.
+    '''
+    times = {}
+    test_file = ''
+    for line in ANSI_ESCAPE.sub('', output).splitlines():
+        header = HEADER.search(line)
+        if header:
+            test_file = header.group(1)
+        result = RESULT.search(line)
+        time = TEST_TIME.search(line)
+        if result and time:
+            times[(test_file, result.group(2))] = float(time.group(1))
+    return times
+
+
+def find_test_file(results, p, v):
+    '''
+    Returns the test file of the task (p, v), None if not found.
+    Falls back to the only file with a test check_<p>, for suites where test
+    files are not named after tasks.
+    '''
+    test_name = get_test_name(p)
+    files = {f for f, t in results if t == test_name}
+
+    for test_file in files:
+        if Path(test_file).name.endswith(f'_{p}_{v}.t.sol'):
+            return test_file
+
+    return files.pop() if len(files) == 1 else None
+
+
+def run(halmos_dir, timeout=None, test_names=None, usage=None):
+    '''
+    Runs Halmos in halmos_dir.
+
+    Args:
+        timeout (int): Solver timeout for assertions, in milliseconds.
+        test_names (list): Run these tests only, all of them if None.
+        usage (dict): If given, updated with the resource usage of the run,
+            see scheduler.Job.usage.
+
+    Returns:
+        str: Output of Halmos (stdout and stderr), None if it cannot be run.
+    '''
+    command = ['halmos']
+    if timeout:
+        command += ['--solver-timeout-assertion', str(timeout)]
+    if test_names:
+        command += ['--function', '|'.join(sorted(set(test_names)))]
+
+    job = Job(TOOL, TOOL, command, lambda returncode, stdout, stderr: stdout + stderr, cwd=halmos_dir)
+    output = scheduler.run([job])[job.id]
+    if isinstance(output, tuple):
+        return None     # (ERROR, msg), already logged
+
+    if usage is not None and job.usage:
+        usage.update(job.usage)
+    return output
+
+
+def run_all(tasks, halmos_dir, timeout=None, only_tasks=False, usages=None):
+    '''
+    Runs Halmos once for all the tasks.
+
+    Args:
+        tasks (list): [(p, v), ...]
+        timeout (int): Solver timeout for assertions, in milliseconds.
+        only_tasks (bool): Run only the tests of the tasks, not the whole suite.
+        usages (dict): If given, updated with the {(p, v): usage} of the
+            tasks: the wall time of their test as reported by Halmos and the
+            peak RSS of the whole run. CPU time is not available per test.
+
+    Returns:
+        tuple: ({(p, v): outcome}, {(p, v): log}, output)
+    '''
+    test_names = [get_test_name(p) for p, _ in tasks] if only_tasks else None
+    usage = {}
+    output = run(halmos_dir, timeout, test_names, usage)
+    if output is None:
+        return {t: ERROR for t in tasks}, {t: 'Cannot run halmos.' for t in tasks}, ''
+
+    results, sections = parse_output(output)
+    times = parse_times(output)
+
+    outcomes = {}
+    logs = {}
+    for p, v in tasks:
+        test_file = find_test_file(results, p, v)
+        if test_file is None:
+            outcomes[(p, v)] = UNKNOWN
+            logs[(p, v)] = f'{get_test_name(p)}: no result for {p} {v}.\n'
+        else:
+            outcomes[(p, v)] = results[(test_file, get_test_name(p))]
+            logs[(p, v)] = sections[test_file]
+            time = times.get((test_file, get_test_name(p)))
+            if usages is not None and time is not None:
+                usages[(p, v)] = scheduler.add_usage(
+                        usages.get((p, v)),
+                        {'wall_time': time, 'cpu_time': None, 'max_rss': usage.get('max_rss')})
+
+    return outcomes, logs, output
@@ -0,0 +1,116 @@
+'''
+Append-only journal of the verification tasks completed by a run, so that
+their outcomes survive a crash, a Ctrl-C or a lost session.
+
+Every task is appended to <output_dir>/journal.jsonl as soon as it completes,
+and fsynced, one JSON record per line:
+    {"id": "p1_v1", "outcome": "P!", "timeout": "10m",
+     "usage": {"wall_time": 12.3, "cpu_time": 12.1, "max_rss": 81234},
+     "log": "build/z3/logs/p1_v1.log", "time": 1718000000.0}
+
+out.csv, timings.csv and the merged csv of the tool are written from the
+journal, and a resumed run skips the tasks already in it.
+'''
+
+from pathlib import Path
+import json
+import time
+import os
+
+import utils
+from tools import scheduler
+
+
+JOURNAL_FILE = 'journal.jsonl'
+
+
+class Journal:
+    '''
+    Args:
+        path (str): Journal path.
+        resume (bool): Keep the records of the previous run, instead of
+            starting a new journal.
+
+    Attributes:
+        records (dict): {id: last record}.
+    '''
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.records = {}
+        self.usages = {}    # {id: usage summed over the records}
+        if resume and self.path.is_file():
+            with open(self.path, 'r') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # truncated by a crash
+                    self.update(record)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'a' if resume else 'w')
+
+    def update(self, record):
+        self.records[record['id']] = record
+        # Several records of a task are steps of the same run, e.g. --escalate
+        if record.get('usage'):
+            self.usages[record['id']] = scheduler.add_usage(self.usages.get(record['id']), record['usage'])
+
+    def add(self, id, outcome, usage=None, log=None, **fields):
+        '''
+        Appends the record of a completed task and flushes it to disk.
+
+        Args:
+            usage (dict): Resource usage, see scheduler.Job.usage.
+            log (str): Log path.
+            fields: Other fields, e.g. timeout.
+        '''
+        record = {'id': id, 'outcome': outcome, **fields,
+                  'usage': usage, 'log': None if log is None else str(log),
+                  'time': time.time()}
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.update(record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def outcomes(self) -> dict:
+        return {id: record['outcome'] for id, record in self.records.items()}
+
+    def timeouts(self) -> dict:
+        return {id: record['timeout'] for id, record in self.records.items() if record.get('timeout')}
+
+    def write_csvs(self, output_dir, summary_csv=None, store=None, with_timeouts=False):
+        '''
+        Writes the outcomes and resource usage of the journal to out.csv and
+        timings.csv in output_dir, and merges out.csv into summary_csv.
+
+        Args:
+            store (Store): Results store (see tools/store.py), also written
+                with the outcomes, as those of the tool named after
+                summary_csv (e.g. solcmc-z3) in its use case.
+            with_timeouts (bool): Add the timeout column of every task, e.g.
+                with --escalate. By default, timeouts stay in the journal.
+
+        Returns:
+            Path: out.csv path.
+        '''
+        out_csv_path = Path(output_dir).joinpath('out.csv')
+        timeouts = (self.timeouts() or None) if with_timeouts else None
+        utils.update_out_csv(out_csv_path, self.outcomes(), timeouts)
+        utils.update_timings_csv(Path(output_dir).joinpath(utils.TIMINGS_FILE), self.usages)
+        if summary_csv:
+            utils.merge_csvs(out_csv_path, summary_csv)
+            if store is not None:
+                store.put_usecase(Path(summary_csv).parent, Path(summary_csv).stem,
+                                  self.outcomes(), timeouts, self.usages)
+        return out_csv_path
@@ -0,0 +1,257 @@
+'''
+Asyncio executor of LLM requests, with a concurrency limit adapting to the
+rate limits of the provider.
+
+Requests are blocking calls of the provider SDKs, run in threads. The number
+of requests in flight follows AIMD (additive increase, multiplicative
+decrease): it grows by one after as many successes as the current limit, about
+one per round trip, and it is halved on a 429 or a timeout, which is then
+retried after an exponential backoff. Results are returned in the order of the
+tasks, whatever the order in which they complete.
+
+Raw responses are cached (see tools/cache.py), keyed by the prompt, the model
+and the token limit, so that a task is never paid twice, whatever the results
+file it belongs to.
+
+Tasks whose prompts share a prefix (instructions and contract code) can be
+ordered so that the prefix is cached by the provider (see order_by_prefix),
+and the tokens read from the provider cache are reported (see token_usage).
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import asyncio
+import logging
+import random
+
+from tools import cache
+
+
+DEFAULT_CONCURRENCY = 8
+RETRIES = 6
+BACKOFF = 1         # seconds, doubled at every retry
+MAX_BACKOFF = 60
+
+# 429 Too Many Requests, 529 Overloaded (Anthropic)
+OVERLOAD_STATUSES = [429, 529]
+
+CACHE_SUBDIR = 'llm'
+
+USAGE_HEADER = ['property_id', 'contract_id', 'input_tokens', 'cache_read_tokens',
+                'cache_write_tokens', 'output_tokens']
+
+
+def token_usage(usage) -> dict:
+    '''
+    Returns:
+        dict: {'input_tokens', 'cache_read_tokens', 'cache_write_tokens',
+        'output_tokens'} of the usage of an OpenAI response or chat
+        completion, or of an Anthropic message. input_tokens includes the
+        tokens read from and written to the provider cache.
+    '''
+    if hasattr(usage, 'prompt_tokens'):
+        # OpenAI chat completions
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {'input_tokens': usage.prompt_tokens,
+                'cache_read_tokens': getattr(details, 'cached_tokens', None) or 0,
+                'cache_write_tokens': 0,
+                'output_tokens': usage.completion_tokens}
+    if hasattr(usage, 'input_tokens_details'):
+        # OpenAI responses
+        return {'input_tokens': usage.input_tokens,
+                'cache_read_tokens': getattr(usage.input_tokens_details, 'cached_tokens', None) or 0,
+                'cache_write_tokens': 0,
+                'output_tokens': usage.output_tokens}
+    # Anthropic, whose input_tokens exclude the cached ones
+    read = getattr(usage, 'cache_read_input_tokens', None) or 0
+    write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+    return {'input_tokens': usage.input_tokens + read + write,
+            'cache_read_tokens': read,
+            'cache_write_tokens': write,
+            'output_tokens': usage.output_tokens}
+
+
+def order_by_prefix(prefixes) -> tuple:
+    '''
+    Orders the tasks for the provider to cache their shared prompt prefixes.
+
+    Args:
+        prefixes (list): Prefix key of every task, e.g. its version.
+
+    Returns:
+        tuple: (first, rest), indices of the tasks: the first task of every
+        prefix, whose request writes the prefix to the cache, and the other
+        tasks grouped by prefix, whose requests read it. first is to be
+        completed before rest starts.
+    '''
+    groups = {}
+    for i, prefix in enumerate(prefixes):
+        groups.setdefault(prefix, []).append(i)
+    first = [group[0] for group in groups.values()]
+    rest = [i for group in groups.values() for i in group[1:]]
+    return first, rest
+
+
+def cache_key(prompt, model, token_limit, base_url=None) -> str:
+    '''
+    Returns:
+        str: Cache key of a request. base_url is None for the provider API,
+        so that the answers of a stand-in server are kept apart.
+    '''
+    return cache.hash_key(model, str(token_limit), base_url, prompt)
+
+
+class ResponseCache:
+    '''
+    Persistent cache of raw responses, counting hits and misses. Safe to use
+    from the threads of the requests.
+
+    Args:
+        cache_dir (str): Cache directory, e.g. <DEFAULT_CACHE_DIR>/llm.
+    '''
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        '''
+        Returns:
+            tuple: (output, seconds taken by the request), or None on a miss.
+        '''
+        entry = cache.get(self.cache_dir, key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry['log'], entry.get('time')
+
+    def put(self, key, output, seconds, **meta):
+        cache.put(self.cache_dir, key, None, output, time=seconds, **meta)
+
+    def evict(self):
+        cache.evict(self.cache_dir)
+
+    def __str__(self):
+        return f'{self.hits} hits, {self.misses} misses'
+
+
+def is_overload(error) -> bool:
+    '''
+    Returns:
+        bool: True if error is a rate limit or a timeout, i.e. if the request
+        should be retried with fewer requests in flight.
+    '''
+    if isinstance(error, TimeoutError):
+        return True
+    # status_code: openai and anthropic errors, code: urllib.error.HTTPError
+    for attribute in ['status_code', 'code']:
+        if getattr(error, attribute, None) in OVERLOAD_STATUSES:
+            return True
+    # e.g. openai.APITimeoutError, which has no status
+    name = type(error).__name__
+    return 'RateLimit' in name or 'Timeout' in name
+
+
+class AIMD:
+    '''
+    Adaptive limit of the requests in flight, between 1 and maximum.
+
+    Every request is admitted in an epoch, which ends at every decrease: the
+    overloads of the requests of an earlier epoch are not counted again, so
+    that a burst of 429s halves the limit once.
+    '''
+
+    def __init__(self, maximum, decrease=0.5):
+        self.maximum = maximum
+        self.decrease = decrease
+        self.limit = float(maximum)
+        self.running = 0
+        self.successes = 0
+        self.epoch = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> int:
+        '''
+        Returns:
+            int: Epoch of the request, to be passed to release.
+        '''
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.running < int(self.limit))
+            self.running += 1
+            return self.epoch
+
+    async def release(self, epoch, overload=False):
+        async with self.condition:
+            self.running -= 1
+            if overload:
+                if epoch == self.epoch:
+                    self.limit = max(1.0, self.limit * self.decrease)
+                    self.successes = 0
+                    self.epoch += 1
+            else:
+                self.successes += 1
+                if self.successes >= int(self.limit):
+                    self.limit = min(float(self.maximum), self.limit + 1)
+                    self.successes = 0
+            self.condition.notify_all()
+
+
+async def run_async(tasks, call, concurrency=DEFAULT_CONCURRENCY, retries=RETRIES, on_result=None,
+                    backoff=BACKOFF) -> list:
+    limiter = AIMD(concurrency)
+    results = [None] * len(tasks)
+    loop = asyncio.get_running_loop()
+    # The default executor may have fewer threads than concurrency
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def run_task(i, task):
+        for attempt in range(retries + 1):
+            epoch = await limiter.acquire()
+            try:
+                result = await loop.run_in_executor(executor, call, task)
+            except Exception as e:
+                overload = is_overload(e)
+                await limiter.release(epoch, overload)
+                if not overload or attempt == retries:
+                    raise
+                delay = min(MAX_BACKOFF, backoff * 2 ** attempt) * random.uniform(0.5, 1)
+                logging.warning(f'{task}: {e}, retry in {delay:.1f}s '
+                                f'(limit {int(limiter.limit)} requests).')
+                await asyncio.sleep(delay)
+            else:
+                await limiter.release(epoch)
+                results[i] = result
+                if on_result:
+                    on_result(i, result)
+                return
+
+    try:
+        await asyncio.gather(*(run_task(i, task) for i, task in enumerate(tasks)))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def run(tasks, call, concurrency=DEFAULT_CONCURRENCY, retries=RETRIES, on_result=None, backoff=BACKOFF) -> list:
+    '''
+    Calls call(task) for every task, with at most concurrency calls in
+    flight, fewer while the provider is overloaded (see AIMD).
+
+    Args:
+        tasks (list): Tasks, e.g. (property, version) pairs.
+        call (function): Blocking request of a task, returning its result.
+            Overloads (see is_overload) are retried at most retries times,
+            other errors are raised.
+        on_result (function): Called with (index of the task, result) as soon
+            as every task completes.
+        backoff (float): Delay of the first retry in seconds, doubled at every
+            retry.
+
+    Returns:
+        list: The results, in the order of tasks.
+    '''
+    return asyncio.run(run_async(tasks, call, concurrency, retries, on_result, backoff))
@@ -0,0 +1,154 @@
+'''
+Reader of the results files of run_llm.py (llms_results/*.csv).
+
+Rows are parsed as CSV, with quotes doubled inside fields and newlines written
+as \\n (see run_llm.sanitize_for_csv). Files written by older versions may have
+undoubled quotes inside fields: a line that is not valid CSV, or that does not
+parse into a row of the header, is split on '","' instead, and skipped with a
+warning if that fails too.
+
+load_results returns the results as a DataFrame with typed columns, cached in
+a pickle next to the CSV (<name>.csv.pkl), rebuilt when the CSV is modified.
+'''
+
+from pathlib import Path
+import logging
+import pickle
+import csv
+import io
+import os
+import sys
+
+from tools import cache
+
+
+RESULTS_HEADER = ['contract_id', 'property_id', 'ground_truth', 'llm_answer', 'llm_explanation',
+                  'llm_counterexample', 'time', 'tokens', 'raw_output']
+SIDECAR_SUFFIX = '.pkl'
+SIDECAR_VERSION = 1
+
+# raw_output can exceed the default limit of 128 KiB
+csv.field_size_limit(sys.maxsize)
+
+
+def parse_line(line, header) -> dict:
+    '''
+    Returns:
+        dict: Row of a line written by an older version, whose fields may
+        contain undoubled quotes, or None if it cannot be split.
+    '''
+    line = line.rstrip('\r\n')
+    if not (line.startswith('"') and line.endswith('"')):
+        return None
+    parts = line[1:-1].split('","')
+    if len(parts) != len(header):
+        return None
+    return dict(zip(header, parts))
+
+
+def parse_csv(lines) -> list:
+    '''
+    Returns:
+        list: Rows of lines, or None if they are not valid CSV.
+    '''
+    try:
+        return list(csv.reader(lines, strict=True))
+    except csv.Error:
+        return None
+
+
+def read_results_csv(path) -> list:
+    '''
+    Returns:
+        list: Rows of a results file, as dicts of str, in the order of the file.
+    '''
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        text = file.read()
+
+    lines = text.splitlines()
+    if not lines:
+        return []
+    header = parse_csv(lines[:1])[0]
+    rows = parse_csv(io.StringIO(text))
+    if rows and all(len(row) == len(header) for row in rows[1:]):
+        return [dict(zip(header, row)) for row in rows[1:]]
+
+    # Some fields have undoubled quotes: rows are parsed line by line
+    results = []
+    for line in lines[1:]:
+        row = (parse_csv([line]) or [None])[0]
+        if row and len(row) == len(header):
+            results.append(dict(zip(header, row)))
+            continue
+        result = parse_line(line, header)
+        if result is None:
+            logging.warning(f'{path}: malformed line: {line[:200]}')
+            continue
+        results.append(result)
+    return results
+
+
+def to_dataframe(results):
+    '''
+    Returns:
+        DataFrame: The results, with ground_truth as boolean, time as float
+        and tokens as Int64; missing or invalid values are NA.
+    '''
+    # Imported here, so that run_llm.py does not load pandas to read and write results
+    import pandas as pd
+
+    df = pd.DataFrame(results) if results else pd.DataFrame(columns=RESULTS_HEADER)
+    if 'ground_truth' in df:
+        df['ground_truth'] = df['ground_truth'].str.strip().str.upper().map(
+                {'TRUE': True, 'FALSE': False}).astype('boolean')
+    if 'time' in df:
+        df['time'] = pd.to_numeric(df['time'], errors='coerce')
+    if 'tokens' in df:
+        df['tokens'] = pd.to_numeric(df['tokens'], errors='coerce').astype('Int64')
+    return df
+
+
+def sidecar_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + SIDECAR_SUFFIX)
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return SIDECAR_VERSION, stat.st_mtime_ns, stat.st_size
+
+
+def load_results(path, use_sidecar=True):
+    '''
+    Loads a results file, from its sidecar if it is up to date.
+
+    Args:
+        path (str): Results file, e.g. llms_results/results_gpt-5_zeroshot_bank_20000tok.csv.
+        use_sidecar (bool): Read and write the sidecar.
+
+    Returns:
+        DataFrame: See to_dataframe.
+    '''
+    stamp = _stamp(path)
+    sidecar = sidecar_path(path)
+    if use_sidecar and sidecar.is_file():
+        try:
+            with open(sidecar, 'rb') as file:
+                cached_stamp, df = pickle.load(file)
+            if cached_stamp == stamp:
+                return df
+        except Exception as e:
+            logging.warning(f'{sidecar}: cannot read: {e}')
+
+    df = to_dataframe(read_results_csv(path))
+    if use_sidecar:
+        tmp_path = cache._tmp_path(sidecar)
+        try:
+            with open(tmp_path, 'wb') as file:
+                pickle.dump((stamp, df), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            logging.warning(f'{sidecar}: cannot write: {e}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return df
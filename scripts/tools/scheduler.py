@@ -0,0 +1,530 @@
+'''
+Asyncio scheduler to run the processes of verification tools.
+
+Tools processes are launched directly by the event loop, without a Python
+worker in between, bounded by a global concurrency limit (by default the
+number of cores) and by optional per-tool limits.
+
+Usage:
+    jobs = [Job('p1_v1', 'solcmc', ['solc', ...], finish), ...]
+    results = run(jobs, concurrency=8, limits={'certora': 6})
+
+A Portfolio groups jobs racing on the same task (e.g. the same contract with
+different solvers): as soon as one of them returns a decisive result, the
+others are killed.
+
+Launches of a tool can be rate limited, e.g. rates={'certora': 2} starts at
+most 2 certora processes per second.
+
+Processes are reaped with wait4, so that every job records the resource usage
+of its process tree in job.usage.
+
+Every process runs in its own process group. A job with a timeout is stopped
+at the deadline with SIGTERM, then SIGKILL, sent to the whole group, so that
+no solver outlives it, and finishes with the output read so far.
+
+A job may cap the address space of its processes (job.memory_limit), and
+processes can be admitted against a global memory budget, e.g. memory=32 << 20
+(KiB) starts a job only when its estimated peak memory (job.memory, usually the
+peak RSS of its last run) fits in what the running jobs left.
+'''
+
+import subprocess
+import threading
+import resource
+import asyncio
+import logging
+import signal
+import time
+import re
+import os
+
+from utils import ERROR
+
+
+DEFAULT_CONCURRENCY = os.cpu_count() or 1
+
+# Seconds between SIGTERM and SIGKILL when stopping a process group
+KILL_GRACE = 5
+
+# Exit status of a process killed by the OOM killer, directly or under a shell
+OOM_RETURNCODES = [-signal.SIGKILL, 128 + signal.SIGKILL]
+
+# Allocation failures of C++, the JVM, Python and the libc, e.g. under RLIMIT_AS
+OOM_MESSAGE = re.compile(r'std::bad_alloc|[Oo]ut of memory|OutOfMemoryError|MemoryError'
+                         r'|Cannot allocate memory|Could not reserve enough space')
+
+
+class Job:
+    '''
+    A verification task to run as a process.
+
+    Args:
+        id (str): Task identifier (e.g. p1_v1).
+        tool (str): Tool name, used for per-tool limits.
+        command (list): Process arguments, None if the result is already known
+            (e.g. nondefinable properties or cached outcomes).
+        finish (callable): finish(returncode, stdout, stderr) -> result.
+        result: Result of jobs that do not need a process.
+        cwd (str): Working directory of the process.
+        delay (float): Seconds to wait before launching the process.
+        on_line (callable): on_line(stream, line), with stream 'stdout' or
+            'stderr'. If given, the output is streamed line by line as it
+            arrives instead of being buffered, and finish gets None for
+            stdout and stderr.
+        on_cancel (callable): on_cancel(), called if the process is killed
+            before completion (e.g. by a portfolio).
+        then (coroutine function): then(result) -> result, awaited after the
+            process completes (or on result, if there is no process) without
+            holding a slot, e.g. to poll a job submitted to a remote server.
+        memory (int): Estimated peak memory of the process in KiB, to admit
+            it against the memory budget, None if unknown.
+        memory_limit (int): Max address space (RLIMIT_AS) of the process and
+            of each of its descendants in KiB, None for no limit.
+        timeout (float): Seconds after which the process group is stopped,
+            None for no timeout. finish then gets the output read so far.
+
+    Attributes:
+        usage (dict): Resource usage of the process and its descendants, None
+            if there is no process: {'wall_time': seconds,
+            'cpu_time': user+sys seconds, 'max_rss': peak RSS in KiB}.
+        timed_out (bool): True if the process was stopped by the timeout,
+            set before finish is called.
+    '''
+
+    def __init__(self, id, tool, command=None, finish=None, result=None, cwd=None, delay=0,
+                 on_line=None, on_cancel=None, then=None, memory=None, memory_limit=None, timeout=None):
+        self.id = id
+        self.tool = tool
+        self.command = command
+        self.finish = finish
+        self.result = result
+        self.cwd = cwd
+        self.delay = delay
+        self.on_line = on_line
+        self.on_cancel = on_cancel
+        self.then = then
+        self.memory = memory
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self.timed_out = False
+        self.usage = None
+
+    def fail(self, error):
+        '''
+        Result of a job whose process could not be started.
+        '''
+        logging.error(f'{self.id}: cannot run {self.command[0]}: {error}')
+        return ERROR, str(error)
+
+
+class Portfolio:
+    '''
+    Jobs racing on the same task.
+
+    Args:
+        id (str): Task identifier.
+        jobs (list): Racing jobs, with distinct ids.
+        decisive (callable): decisive(result) -> bool, True to stop the race.
+        combine (callable): combine({job_id: result or None}) -> result,
+            where None marks the jobs killed before completion.
+    '''
+
+    def __init__(self, id, jobs, decisive, combine):
+        self.id = id
+        self.jobs = jobs
+        self.decisive = decisive
+        self.combine = combine
+
+
+class Process:
+    '''
+    A child process with asyncio pipes, leader of its own process group,
+    reaped with wait4 by a thread to collect the resource usage of its process
+    tree, including the descendants it waited for (e.g. the solver run by solc).
+    '''
+
+    def __init__(self, command, cwd=None, memory_limit=None):
+        preexec_fn = None
+        if memory_limit:
+            def preexec_fn():
+                limit = memory_limit * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        self.start = time.monotonic()
+        self.popen = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE, cwd=cwd,
+                                      preexec_fn=preexec_fn, start_new_session=True)
+        self.pid = self.popen.pid
+        self.stdout = None
+        self.stderr = None
+        self.returncode = None
+        self.usage = None
+
+        loop = asyncio.get_running_loop()
+        self.exited = loop.create_future()
+
+        def reap():
+            try:
+                _, status, rusage = os.wait4(self.pid, 0)
+            except ChildProcessError as e:
+                status, rusage = None, e
+            loop.call_soon_threadsafe(self.set_exited, status, rusage)
+
+        threading.Thread(target=reap, daemon=True).start()
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        readers = []
+        for pipe in [self.popen.stdout, self.popen.stderr]:
+            reader = asyncio.StreamReader()
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+            readers.append(reader)
+        self.stdout, self.stderr = readers
+        return self
+
+    def set_exited(self, status, rusage):
+        if status is None:
+            logging.warning(f'{self.pid}: cannot collect resource usage: {rusage}')
+            self.returncode = -1
+        else:
+            self.returncode = os.waitstatus_to_exitcode(status)
+            self.usage = {'wall_time': time.monotonic() - self.start,
+                          'cpu_time': rusage.ru_utime + rusage.ru_stime,
+                          'max_rss': rusage.ru_maxrss}
+        # Already reaped, Popen must not wait for it
+        self.popen.returncode = self.returncode
+        self.exited.set_result(self.returncode)
+
+    async def wait(self):
+        return await asyncio.shield(self.exited)
+
+    def signal_group(self, sig):
+        # Not through Popen, whose poll() would reap the process
+        try:
+            os.killpg(self.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass    # the whole group already exited
+
+    async def kill(self, grace=None):
+        '''
+        Stops the process group: SIGTERM, then SIGKILL after grace seconds
+        (default: KILL_GRACE), also to the descendants outliving the process.
+        '''
+        self.signal_group(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(self.wait(), KILL_GRACE if grace is None else grace)
+        except asyncio.TimeoutError:
+            pass
+        self.signal_group(signal.SIGKILL)
+        await self.wait()
+
+
+async def create_process(command, cwd=None, memory_limit=None):
+    return await Process(command, cwd, memory_limit).connect()
+
+
+def out_of_memory(returncode, output=''):
+    '''
+    Returns True if a process was killed by the OOM killer or failed to
+    allocate memory (e.g. beyond its memory limit), according to its exit
+    status and its error output.
+    '''
+    return returncode in OOM_RETURNCODES or bool(OOM_MESSAGE.search(output or ''))
+
+
+def add_usage(usage, other):
+    '''
+    Returns the usage of two runs of the same task, e.g. with escalating
+    timeouts: times are summed, the peak RSS is the max.
+    '''
+    if usage is None or other is None:
+        return usage or other
+    total = {}
+    for key in ['wall_time', 'cpu_time', 'max_rss']:
+        values = [u[key] for u in [usage, other] if u.get(key) is not None]
+        total[key] = (max if key == 'max_rss' else sum)(values) if values else None
+    return total
+
+
+def get_usages(jobs) -> dict:
+    '''
+    Returns:
+        dict: {job_id: usage} of the jobs that ran a process, the members of
+        portfolios included.
+    '''
+    usages = {}
+    for job in jobs:
+        for member in (job.jobs if isinstance(job, Portfolio) else [job]):
+            if member.usage:
+                usages[member.id] = member.usage
+    return usages
+
+
+class RateLimiter:
+    '''
+    Token bucket: at most burst acquisitions at once, refilled at rate tokens
+    per second. Waiters are served in order.
+    '''
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class MemoryBudget:
+    '''
+    Memory shared by the running processes, in KiB. Reservations are served
+    in order, as soon as they fit in the memory left; a reservation larger
+    than the whole budget waits for all the others to be released.
+    '''
+
+    def __init__(self, total):
+        self.total = total
+        self.free = total
+        self.lock = asyncio.Lock()
+        self.released = asyncio.Condition()
+
+    async def acquire(self, amount):
+        '''
+        Returns:
+            int: The amount reserved, at most the whole budget.
+        '''
+        amount = min(amount, self.total)
+        async with self.lock, self.released:
+            await self.released.wait_for(lambda: self.free >= amount)
+            self.free -= amount
+        return amount
+
+    async def release(self, amount):
+        async with self.released:
+            self.free += amount
+            self.released.notify_all()
+
+
+async def read_lines(stream, chunk_size=1 << 16):
+    '''
+    Yields the lines of a stream as they arrive, of any length.
+    '''
+    pending = b''
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+    if pending:
+        yield pending
+
+
+async def stream_lines(job, proc):
+    async def pump(stream, name):
+        async for line in read_lines(stream):
+            job.on_line(name, line.decode(errors='replace'))
+
+    await asyncio.gather(pump(proc.stdout, 'stdout'), pump(proc.stderr, 'stderr'))
+
+
+async def read_chunks(proc, stdout, stderr, chunk_size=1 << 16):
+    '''
+    Appends the output of a process to the stdout and stderr lists of chunks
+    as it arrives, so that it is kept if reading is interrupted.
+    '''
+    async def pump(stream, chunks):
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    await asyncio.gather(pump(proc.stdout, stdout), pump(proc.stderr, stderr))
+
+
+async def read_output(job, proc, reading):
+    '''
+    Waits for the output of a process until EOF or the job timeout, then for
+    its exit. At the timeout, the process group is stopped.
+    '''
+    done, _ = await asyncio.wait([reading], timeout=job.timeout)
+    if not done:
+        job.timed_out = True
+        await proc.kill()
+        # Descendants that left the group may still hold the pipes
+        done, _ = await asyncio.wait([reading], timeout=KILL_GRACE)
+        if not done:
+            reading.cancel()
+            await asyncio.gather(reading, return_exceptions=True)
+    await proc.wait()
+
+
+async def run_job(job):
+    '''
+    Runs the process of a job and returns its result.
+    '''
+    if job.command is None:
+        return job.result
+
+    if job.delay:
+        await asyncio.sleep(job.delay)
+
+    try:
+        proc = await create_process(job.command, job.cwd, job.memory_limit)
+    except OSError as e:
+        return job.fail(e)
+
+    stdout, stderr = [], []
+    if job.on_line:
+        reading = asyncio.ensure_future(stream_lines(job, proc))
+    else:
+        reading = asyncio.ensure_future(read_chunks(proc, stdout, stderr))
+
+    try:
+        await read_output(job, proc, reading)
+    except asyncio.CancelledError:
+        reading.cancel()
+        await proc.kill()
+        job.usage = proc.usage
+        if job.on_cancel:
+            job.on_cancel()
+        raise
+
+    job.usage = proc.usage
+    if job.on_line:
+        return job.finish(proc.returncode, None, None)
+    return job.finish(proc.returncode,
+                      b''.join(stdout).decode(errors='replace'),
+                      b''.join(stderr).decode(errors='replace'))
+
+
+async def run_portfolio(portfolio, run_member=run_job):
+    '''
+    Runs the jobs of a portfolio concurrently, killing the remaining ones as
+    soon as a decisive result is returned.
+    '''
+    tasks = {asyncio.ensure_future(run_member(job)): job for job in portfolio.jobs}
+    results = {job.id: None for job in portfolio.jobs}
+    pending = set(tasks)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[tasks[task].id] = task.result()
+            if any(portfolio.decisive(task.result()) for task in done):
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return portfolio.combine(results)
+
+
+async def iter_results(jobs, concurrency=None, limits=None, rates=None, memory=None):
+    '''
+    Runs jobs concurrently, yielding (job, result) as they complete.
+    Each member of a portfolio takes a slot.
+
+    Args:
+        jobs (list): Jobs or portfolios to run.
+        concurrency (int): Max number of processes, default: number of cores.
+        limits (dict): Max number of processes per tool, e.g. {'certora': 6}.
+        rates (dict): Max number of process launches per second per tool,
+            e.g. {'certora': 2}.
+        memory (int): Memory budget of the processes in KiB, None for no
+            budget. Each process reserves its job.memory, else its
+            job.memory_limit, else an equal share of the budget per slot.
+    '''
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    limits = limits or {}
+    rates = rates or {}
+
+    global_slots = asyncio.Semaphore(concurrency)
+    tool_slots = {tool: asyncio.Semaphore(n) for tool, n in limits.items()}
+    tool_rates = {tool: RateLimiter(rate) for tool, rate in rates.items()}
+    budget = MemoryBudget(memory) if memory else None
+
+    async def run_limited(job):
+        rate = tool_rates.get(job.tool)
+        if rate:
+            await rate.acquire()
+        if not budget:
+            return await run_job(job)
+
+        reserved = await budget.acquire(job.memory or job.memory_limit or memory // concurrency)
+        try:
+            return await run_job(job)
+        finally:
+            await budget.release(reserved)
+
+    async def run_bounded(job):
+        if job.command is None:
+            return job.result
+        tool_slot = tool_slots.get(job.tool)
+        if tool_slot:
+            # Take the tool slot first, so that jobs waiting for a busy tool
+            # do not hold global slots
+            async with tool_slot, global_slots:
+                return await run_limited(job)
+        async with global_slots:
+            return await run_limited(job)
+
+    async def bounded(job):
+        if isinstance(job, Portfolio):
+            return job, await run_portfolio(job, run_bounded)
+        result = await run_bounded(job)
+        if job.then:
+            result = await job.then(result)
+        return job, result
+
+    tasks = [asyncio.ensure_future(bounded(job)) for job in jobs]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def run(jobs, concurrency=None, limits=None, on_result=None, rates=None, memory=None) -> dict:
+    '''
+    Runs jobs concurrently, blocking until all of them complete.
+
+    Args:
+        jobs (list): Jobs or portfolios to run.
+        concurrency (int): Max number of processes, default: number of cores.
+        limits (dict): Max number of processes per tool.
+        rates (dict): Max number of process launches per second per tool.
+        memory (int): Memory budget of the processes in KiB.
+        on_result (callable): on_result(job, result), called on completion.
+
+    Returns:
+        dict: {job_id: result}
+    '''
+    results = {}
+
+    async def consume():
+        async for job, result in iter_results(jobs, concurrency, limits, rates, memory):
+            if on_result:
+                on_result(job, result)
+            results[job.id] = result
+
+    asyncio.run(consume())
+
+    return results
@@ -5,33 +5,55 @@ Usage:
     python run_solcmc.py -i <file_or_dir> -o <output_dir> [-t <timeout>]
 '''
 
-from multiprocessing import Pool
+from functools import lru_cache
 from string import Template
 from pathlib import Path
 import subprocess
 import logging
+import shutil
+import io
 import sys
 import re
 import os
 
 import utils
+from tools import cache, scheduler
+from tools.scheduler import Job, Portfolio
 from utils import (STRONG_POSITIVE,
                    STRONG_NEGATIVE,
                    WEAK_POSITIVE,
                    WEAK_NEGATIVE,
                    NONDEFINABLE,
                    UNKNOWN,
-                   ERROR)
+                   ERROR,
+                   OUT_OF_MEMORY)
 
 DEFAULT_TIMEOUT = '10m'
 DEFAULT_SOLVER = 'z3'
-THREADS = 6
+PORTFOLIO_SOLVERS = ['z3', 'eld']
+BEST = 'best'
+
+# Outcomes of the portfolio members, from the best to the worst.
+# Negatives come first, as in merge_tools_results.determine_solcmc_best
+OUTCOMES_RANK = [STRONG_NEGATIVE,
+                 STRONG_POSITIVE,
+                 WEAK_NEGATIVE,
+                 WEAK_POSITIVE,
+                 NONDEFINABLE,
+                 UNKNOWN,
+                 OUT_OF_MEMORY,
+                 ERROR]
+
+TOOL = 'solcmc'
 
 TAG_NONDEF = '/// @custom:nondef'
 TAG_NEGATE = '/// @custom:negate'
 
+LIB_DIR = 'lib'     # next to the contracts to verify
+CACHE_SUBDIR = 'solcmc'
+
+# The timeout is enforced by the scheduler, see scheduler.Job
 COMMAND_TEMPLATE = Template(
-        'timeout $timeout ' +
         'solc $contract_path ' +
         '--model-checker-engine chc ' +
         '--model-checker-timeout 10000000 ' +
@@ -40,51 +62,171 @@ COMMAND_TEMPLATE = Template(
         '--model-checker-solvers=$solver')
 
 
-def has_error(output):
-    pattern = r'.*Error:.*'
-    return re.search(pattern, output, re.DOTALL)
+SOLVER_NOT_FOUND = re.compile(r'Warning: Solver (.*) was selected for SMTChecker but it was not found')
 
+# Lines of an error printed to stderr
+MAX_ERROR_LINES = 100
 
-def has_source_error(output):
-    pattern = r'.*Error: Source.*'
-    return re.search(pattern, output, re.DOTALL)
 
+class OutputClassifier:
+    '''
+    Classifies the output of solc in a single pass, line by line, as it
+    arrives. Only a few flags are kept, so memory does not grow with the output.
+    '''
 
-def has_assertion_violation(output):
-    pattern = r'.*Warning: CHC: Assertion violation happens here.*'
-    return re.search(pattern, output, re.DOTALL)
+    def __init__(self):
+        self.has_output = False
+        self.error_lines = []       # first lines of the first error
+        self.source_error = False
+        self.solver_not_found = None
+        self.weak_violation = False
+        self.violation = False
+        self.proved = False
+        self.ignoring_timeout = False
+        self.out_of_memory = False
+
+    def feed(self, line, stream='stderr'):
+        if line:
+            self.has_output = True
+        if stream != 'stderr':
+            return
+
+        if scheduler.OOM_MESSAGE.search(line):
+            self.out_of_memory = True
+
+        if self.error_lines and len(self.error_lines) < MAX_ERROR_LINES:
+            self.error_lines.append(line)
+
+        if 'Error:' in line:
+            if not self.error_lines:
+                self.error_lines.append(line)
+            if 'Error: Source' in line:
+                self.source_error = True
+        elif 'Warning: CHC: Assertion violation might happen here' in line:
+            self.weak_violation = True
+        elif 'Warning: CHC: Assertion violation happens here' in line:
+            self.violation = True
+        elif 'verification condition(s) proved safe!' in line:
+            self.proved = True
+        elif 'ignoring option :timeout' in line:
+            self.ignoring_timeout = True
+        elif self.solver_not_found is None and 'was not found' in line:
+            match = SOLVER_NOT_FOUND.search(line)
+            if match:
+                self.solver_not_found = match.group(1)
+
+    def result(self, negate, returncode=None, timed_out=False):
+        '''
+        Args:
+            returncode (int): Exit status of solc, to detect the OOM killer.
+            timed_out (bool): True if solc was stopped by the timeout.
+
+        Returns:
+            tuple: (outcome, msg), where msg replaces the output as the log
+                of some errors, None otherwise.
+        '''
+        # Stopped at the timeout, whatever it printed so far
+        if timed_out:
+            return UNKNOWN, None
+
+        # Killed by the OOM killer or out of its memory limit
+        if self.out_of_memory or returncode in scheduler.OOM_RETURNCODES:
+            return OUT_OF_MEMORY, None
+
+        if self.error_lines:
+            print(''.join(self.error_lines), file=sys.stderr)
+            if self.source_error:
+                msg = 'Use the dot to make a relative import: e.g. "./lib/lib.sol"'
+                logging.error(msg)
+                return ERROR, msg
+            logging.error(''.join(self.error_lines))
+            return ERROR, None
+
+        if self.solver_not_found is not None:
+            msg = f'Solver {self.solver_not_found} was not found. Check installation.'
+            logging.error(msg)
+            return ERROR, msg
+
+        if self.weak_violation:
+            res = WEAK_POSITIVE if negate else WEAK_NEGATIVE
+        elif self.violation:
+            res = STRONG_POSITIVE if negate else STRONG_NEGATIVE
+        elif self.proved:
+            res = STRONG_NEGATIVE if negate else STRONG_POSITIVE
+        elif not self.has_output or self.ignoring_timeout:   # Solver timeout
+            res = UNKNOWN
+        else:
+            res = ERROR
 
+        return res, None
 
-def has_weak_assertion_violation(output):
-    pattern = r'.*Warning: CHC: Assertion violation might happen here.*'
-    return re.search(pattern, output, re.DOTALL)
 
+@lru_cache(maxsize=None)
+def get_solc_version():
+    '''
+    Returns the output of `solc --version`, or None if solc is not installed.
+    '''
+    try:
+        return subprocess.run(['solc', '--version'],
+                              capture_output=True, text=True).stdout.strip()
+    except FileNotFoundError:
+        return None
 
-def warning_solver_not_found(output):
-    pattern = r'.*Warning: Solver (.*) was selected for SMTChecker but it was not found.*'
-    return re.search(pattern, output, re.DOTALL)
 
+def cache_key(contract_path, timeout=DEFAULT_TIMEOUT, solver=DEFAULT_SOLVER):
+    '''
+    Computes the cache key of a solcmc experiment: a hash of the contract, its
+    local imports, the lib/ directory next to it, the solver, the solc version
+    and the timeout.
+    '''
+    parts = [cache.hash_contract(contract_path, LIB_DIR)]
+    parts += [solver, get_solc_version(), timeout]
+    return cache.hash_key(*parts)
 
-def is_ignoring_timeout(output):
-    return 'ignoring option :timeout' in output
 
+def classify(stdout, stderr, negate, returncode=None, timed_out=False):
+    '''
+    Classifies the whole output of solc.
 
-def verification_passed(output):
-    return 'verification condition(s) proved safe!' in output
+    Returns:
+        tuple: (outcome, log)
+    '''
+    classifier = OutputClassifier()
+    for stream, output in [('stdout', stdout), ('stderr', stderr)]:
+        for line in io.StringIO(output):
+            classifier.feed(line, stream)
+
+    res, msg = classifier.result(negate, returncode, timed_out)
+    return res, stderr if msg is None else msg
 
 
-def run(contract_path, timeout=DEFAULT_TIMEOUT, solver=DEFAULT_SOLVER):
+def make_job(id, contract_path, timeout=DEFAULT_TIMEOUT, solver=DEFAULT_SOLVER, cache_dir=None, log_path=None,
+             memory_limit=None):
     '''
-    Runs a single solcmc experiment.
+    Prepares a solcmc experiment to be run by the scheduler.
+    If cache_dir is given, outcomes are looked up there before running solc
+    and stored there afterwards (errors, OOM and timeouts are never stored).
+    If log_path is given, the output of solc is written there as it arrives.
+    If memory_limit (KiB) is given, it caps the address space of solc and of
+    the solver it launches: a task exceeding it is OUT_OF_MEMORY.
+    At the timeout, solc and its solvers are stopped and the task is UNKNOWN,
+    with the output printed so far and the elapsed time as its log.
 
     Returns:
-        tuple: (outcome, log)
+        scheduler.Job: A job whose result is a tuple (outcome, log), where log
+            is None if it was written to log_path.
     '''
+    def result(outcome, log):
+        if log_path:
+            utils.write_log(log_path, log)
+            return outcome, None
+        return outcome, log
+
     # File not found
     if not os.path.isfile(contract_path):
         msg = f'{contract_path} not found.'
         logging.error(msg)
-        return ERROR, msg
+        return Job(id, TOOL, result=result(ERROR, msg))
 
     with open(contract_path, 'r') as file:
         contract_code = file.read()
@@ -94,98 +236,338 @@ def run(contract_path, timeout=DEFAULT_TIMEOUT, solver=DEFAULT_SOLVER):
     nondef = re.search(TAG_NONDEF + ' (.*)', contract_code)
     if nondef:
         print(f'{contract_path}: {NONDEFINABLE}')
-        return NONDEFINABLE, nondef.group(1)
+        return Job(id, TOOL, result=result(NONDEFINABLE, nondef.group(1)))
 
     # Tag Negate
     negate = re.search(TAG_NEGATE, contract_code)
 
+    if cache_dir:
+        key = cache_key(contract_path, timeout, solver)
+        entry = cache.get(cache_dir, key, read_log=not log_path)
+        if entry:
+            print(f'{contract_path}: {entry["outcome"]} (cached)')
+            if log_path:
+                shutil.copyfile(entry['log_path'], log_path)
+                return Job(id, TOOL, result=(entry['outcome'], None))
+            return Job(id, TOOL, result=(entry['outcome'], entry['log']))
+
+    # Invalid time interval
+    try:
+        seconds = utils.parse_timeout(timeout)
+    except ValueError as e:
+        msg = str(e)
+        logging.error(msg)
+        return Job(id, TOOL, result=result(ERROR, msg))
+
     # Prepare to fill template command
     params = {}
     params['contract_path'] = contract_path
-    params['timeout'] = timeout
     params['solver'] = solver
 
     command = COMMAND_TEMPLATE.substitute(params)
     #print(command) # substitute with a log that does not go to stdout
-    log = subprocess.run(command.split(), capture_output=True, text=True)
 
-    # Invalid time interval
-    if 'invalid time' in log.stderr:
-        msg = f'Invalid time interval "{timeout}".'
-        logging.error(msg)
-        return ERROR, msg
+    classifier = OutputClassifier()
+    log = []    # log file, opened when the process starts writing
+
+    def open_log():
+        if not log:
+            log.append(open(log_path, 'w') if log_path else io.StringIO())
+        return log[0]
+
+    def close_log():
+        if log_path:
+            open_log().close()
+
+    def on_line(stream, line):
+        classifier.feed(line, stream)
+        if stream == 'stderr':
+            open_log().write(line)
+
+    def finish(returncode, stdout, stderr):
+        res, msg = classifier.result(negate, returncode, job.timed_out)
+        if job.timed_out:
+            elapsed = (job.usage or {}).get('wall_time', seconds)
+            open_log().write(f'Timeout {timeout}: stopped after {elapsed:.1f}s.\n')
+        if log_path:
+            close_log()
+            if msg is not None:
+                utils.write_log(log_path, msg)
+        elif msg is None:
+            msg = open_log().getvalue()
+
+        # A timeout depends on the load of the machine: it is not a property of the inputs
+        if cache_dir and not job.timed_out and res not in (ERROR, OUT_OF_MEMORY):
+            if log_path:
+                cache.put_file(cache_dir, key, res, log_path,
+                               contract=str(contract_path), solver=solver, timeout=timeout)
+            else:
+                cache.put(cache_dir, key, res, msg,
+                          contract=str(contract_path), solver=solver, timeout=timeout)
+
+        print(f'{contract_path}: {res}')
+        return res, msg
+
+    job = Job(id, TOOL, command.split(), finish, on_line=on_line, on_cancel=close_log,
+              memory_limit=memory_limit, timeout=seconds)
+    return job
+
+
+def run(contract_path, timeout=DEFAULT_TIMEOUT, solver=DEFAULT_SOLVER, cache_dir=None):
+    '''
+    Runs a single solcmc experiment.
 
-    if has_error(log.stderr):
-        if has_source_error(log.stderr):
-            msg = 'Use the dot to make a relative import: e.g. "./lib/lib.sol"'
-        else:
-            msg = log.stderr
-        print(log.stderr, file=sys.stderr)
-        logging.error(msg)
-        return ERROR, msg
+    Returns:
+        tuple: (outcome, log)
+    '''
+    job = make_job(contract_path, contract_path, timeout, solver, cache_dir)
+    return scheduler.run([job])[job.id]
 
-    solver_not_found = warning_solver_not_found(log.stderr)
 
-    if solver_not_found:
-        solver = solver_not_found.group(1)
-        msg = f'Solver {solver} was not found. Check installation.'
-        logging.error(msg)
-        return ERROR, msg
-        
-    if has_weak_assertion_violation(log.stderr):
-        res = WEAK_POSITIVE if negate else WEAK_NEGATIVE
-    elif has_assertion_violation(log.stderr):
-        res = STRONG_POSITIVE if negate else STRONG_NEGATIVE
-    elif verification_passed(log.stderr):
-        res = STRONG_NEGATIVE if negate else STRONG_POSITIVE
-    elif ((not log.stderr) and (not log.stdout)
-        or is_ignoring_timeout(log.stderr)):   # Timeout
-        res = UNKNOWN
-    else:
-        res = ERROR
+def is_definitive(result):
+    return result[0] in (STRONG_POSITIVE, STRONG_NEGATIVE)
 
-    print(f'{contract_path}: {res}')
-    return res, log.stderr
 
+def best_solver(results):
+    '''
+    Returns the solver with the best outcome among the portfolio members.
+    '''
+    return min(results, key=lambda solver: OUTCOMES_RANK.index(results[solver][0]))
 
-def run_log(id, contract_path, timeout=DEFAULT_TIMEOUT, logs_dir=None, solver=DEFAULT_SOLVER):
+
+def best_result(results):
+    '''
+    Returns the best (outcome, log) among the results of the portfolio members.
     '''
-    Calls run() and writes the log.
+    return results[best_solver(results)]
+
+
+def make_portfolio(id, contract_path, timeout=DEFAULT_TIMEOUT, solvers=PORTFOLIO_SOLVERS, cache_dir=None, logs_dirs=None,
+                   memory_limit=None, peak_rss=None):
     '''
-    outcome, log = run(contract_path, timeout, solver)
+    Prepares an experiment racing several solvers on the same contract: as
+    soon as one of them returns a definitive outcome (P!/N!), the others are
+    killed and their outcome is UNKNOWN.
+    If logs_dirs ({solver or BEST: logs dir}) is given, the logs of the
+    completed solvers are written there as <id>.log.
+    If peak_rss ({solver: {id: KiB}}) is given, it is the memory estimate of
+    each solver.
+
+    Returns:
+        scheduler.Portfolio: A portfolio whose result is a dict
+            {solver: (outcome, log)}, plus the best one under key BEST.
+    '''
+    def log_path(name):
+        return Path(logs_dirs[name]).joinpath(id + '.log') if logs_dirs else None
+
+    jobs = [make_job(solver, contract_path, timeout, solver, cache_dir, log_path(solver), memory_limit)
+            for solver in solvers]
+    for job in jobs:
+        job.memory = (peak_rss or {}).get(job.id, {}).get(id)
+
+    def combine(results):
+        winners = [s for s, r in results.items() if r and is_definitive(r)]
+        for solver, result in results.items():
+            if result is None:
+                msg = f'Killed: {winners[0]} returned a definitive outcome first.'
+                results[solver] = (UNKNOWN, msg)
+        best = best_solver(results)
+        results[BEST] = results[best]
+        if results[BEST][1] is None:
+            shutil.copyfile(log_path(best), log_path(BEST))
+        print(f'{contract_path}: {results[BEST][0]} ({BEST})')
+        return results
+
+    return Portfolio(id, jobs, is_definitive, combine)
+
+
+def write_log(id, outcome, log, logs_dir=None):
+    if log is None:
+        return      # already written by the job
     if logs_dir:
         utils.write_log(Path(logs_dir).joinpath(id + '.log'), log)
     else:
         print(log)
         print(f'Result: {outcome}')
-    return id, outcome
 
 
-def run_all(contracts_paths, timeout=DEFAULT_TIMEOUT, logs_dir=None, solver=DEFAULT_SOLVER):
+def get_id(contract_path):
+    return '_'.join(contract_path.split('_')[-2:]).split('.sol')[0]
+
+
+def make_jobs(contracts_paths, timeout=DEFAULT_TIMEOUT, solver=DEFAULT_SOLVER, cache_dir=None, logs_dir=None,
+              memory_limit=None, peak_rss=None):
+    '''
+    Prepares the jobs of a list of instrumented contracts, with ids p_v.
+    If logs_dir is given, the logs are written there as <id>.log.
+    If peak_rss ({id: KiB}, e.g. from timings.csv) is given, it is the memory
+    estimate of the jobs.
+    '''
+    jobs = []
+
+    for contract_path in contracts_paths:
+        id = get_id(contract_path)
+        log_path = Path(logs_dir).joinpath(id + '.log') if logs_dir else None
+        job = make_job(id, contract_path, timeout, solver, cache_dir, log_path, memory_limit)
+        job.memory = (peak_rss or {}).get(id)
+        jobs.append(job)
+
+    return jobs
+
+
+def run_all(contracts_paths, timeout=DEFAULT_TIMEOUT, logs_dir=None, solver=DEFAULT_SOLVER, cache_dir=None, concurrency=None,
+            usages=None, memory_limit=None, memory_budget=None, peak_rss=None, journal=None):
     '''
     Runs solcmc on all files of a directory.
 
     Args:
         contracts_paths (list): Contracts paths.
         timeout (int): Solcmc timeout.
+        cache_dir (str): Outcomes cache directory, None to disable caching.
+        concurrency (int): Max number of solc processes, default: number of cores.
+        usages (dict): If given, updated with the {key_v*: usage} of the tasks
+            run by solc (see scheduler.Job.usage).
+        memory_limit (int): Max memory of a task in KiB, None for no limit.
+        memory_budget (int): Max memory of the running tasks in KiB, None for
+            no budget.
+        peak_rss (dict): {key_v*: KiB}, memory estimates of the tasks.
+        journal (journal.Journal): If given, every completed task is recorded
+            there, with its timeout.
 
     Returns:
         dict: {key_v*: outcome}
     '''
-    outcomes = {}
+    jobs = make_jobs(contracts_paths, timeout, solver, cache_dir, logs_dir, memory_limit, peak_rss)
 
-    # inputs for run_solcmc_parallel()
-    # [(id, contract_path, timeout, logs_dir), ...]
-    inputs = []
+    def on_result(job, result):
+        write_log(job.id, *result, logs_dir)
+        if journal:
+            log_path = Path(logs_dir).joinpath(job.id + '.log') if logs_dir else None
+            journal.add(job.id, result[0], job.usage, log_path, timeout=timeout)
+
+    # {id: (outcome, log)}
+    results = scheduler.run(jobs, concurrency, on_result=on_result, memory=memory_budget)
+    outcomes = {id: outcome for id, (outcome, _) in results.items()}
+    if usages is not None:
+        for id, usage in scheduler.get_usages(jobs).items():
+            usages[id] = scheduler.add_usage(usages.get(id), usage)
+
+    if cache_dir:
+        cache.evict(cache_dir)
+
+    return outcomes
 
-    for contract_path in contracts_paths:
-        id = '_'.join(contract_path.split('_')[-2:]).split('.sol')[0]
-        inputs.append((id, contract_path, timeout, logs_dir, solver))
 
-    with Pool(processes=THREADS) as pool:
-        # [(id, outcome), ...]
-        results = pool.starmap(run_log, inputs)
-        for (id, outcome) in results:
-            outcomes[id] = outcome
+def run_all_portfolio(contracts_paths, timeout=DEFAULT_TIMEOUT, logs_dirs=None, solvers=PORTFOLIO_SOLVERS, cache_dir=None, concurrency=None,
+                      usages=None, memory_limit=None, memory_budget=None, peak_rss=None, journals=None):
+    '''
+    Runs solcmc on all files of a directory, racing the solvers on each file.
+
+    Args:
+        contracts_paths (list): Contracts paths.
+        timeout (int): Solcmc timeout.
+        logs_dirs (dict): {solver: logs dir}, plus the logs dir of the best
+            outcomes under key BEST. None to print the best logs.
+        solvers (list): Racing solvers.
+        cache_dir (str): Outcomes cache directory, None to disable caching.
+        concurrency (int): Max number of solc processes, default: number of cores.
+        usages (dict): If given, updated with {solver: {key_v*: usage}}, plus
+            the usage of all the racing solvers of a task under key BEST.
+        memory_limit (int): Max memory of a solver in KiB, None for no limit.
+        memory_budget (int): Max memory of the running solvers in KiB, None
+            for no budget.
+        peak_rss (dict): {solver: {key_v*: KiB}}, memory estimates of the solvers.
+        journals (dict): {solver or BEST: journal.Journal}, if given every
+            completed task is recorded there.
+
+    Returns:
+        dict: {solver: {key_v*: outcome}}, plus the best outcomes under key BEST.
+    '''
+    portfolios = [make_portfolio(get_id(contract_path), contract_path, timeout, solvers, cache_dir, logs_dirs,
+                                 memory_limit, peak_rss)
+                  for contract_path in contracts_paths]
+
+    def record(portfolio, results):
+        # member ids are solver names
+        usages = {job.id: job.usage for job in portfolio.jobs}
+        usages[BEST] = None
+        for usage in filter(None, usages.values()):
+            usages[BEST] = scheduler.add_usage(usages[BEST], usage)
+        for name, (outcome, _) in results.items():
+            log_path = Path(logs_dirs[name]).joinpath(portfolio.id + '.log') if logs_dirs else None
+            journals[name].add(portfolio.id, outcome, usages[name], log_path, timeout=timeout)
+
+    def on_result(portfolio, results):
+        if journals:
+            record(portfolio, results)
+        if not logs_dirs:
+            write_log(portfolio.id, *results[BEST])
+            return
+        for name, result in results.items():
+            write_log(portfolio.id, *result, logs_dirs[name])
+
+    # {id: {solver: (outcome, log)}}
+    results = scheduler.run(portfolios, concurrency, on_result=on_result, memory=memory_budget)
+    outcomes = {name: {} for name in solvers + [BEST]}
+    for id, portfolio_results in results.items():
+        for name, (outcome, _) in portfolio_results.items():
+            outcomes[name][id] = outcome
+
+    if usages is not None:
+        for portfolio in portfolios:
+            for job in portfolio.jobs:
+                if job.usage:   # member ids are solver names
+                    usages.setdefault(job.id, {})[portfolio.id] = job.usage
+                    usages.setdefault(BEST, {})[portfolio.id] = scheduler.add_usage(
+                            usages[BEST].get(portfolio.id), job.usage)
+
+    if cache_dir:
+        cache.evict(cache_dir)
 
     return outcomes
+
+
+def run_all_escalating(contracts_paths, timeouts, logs_dir=None, solver=DEFAULT_SOLVER, cache_dir=None, concurrency=None,
+                       usages=None, memory_limit=None, memory_budget=None, peak_rss=None, journal=None, start=None):
+    '''
+    Runs solcmc on all files of a directory with increasing timeouts: each
+    step re-runs only the tasks whose outcome is still UNKNOWN.
+
+    Args:
+        contracts_paths (list): Contracts paths.
+        timeouts (list): Increasing timeouts, e.g. ['30s', '2m', '10m'].
+        usages (dict): If given, updated with the {key_v*: usage} of the
+            tasks, summed over the steps.
+        memory_limit, memory_budget, peak_rss: See run_all. The peak RSS of
+            a step is the estimate of the next one.
+        journal (journal.Journal): If given, every step of a task is
+            recorded there.
+        start (dict): {key_v*: index of the first timeout}, e.g. to resume
+            the tasks still UNKNOWN at some step. Default: 0.
+
+    Returns:
+        tuple: ({key_v*: outcome}, {key_v*: timeout at which the outcome was reached})
+    '''
+    outcomes = {}
+    reached = {}
+    pending = []
+    start = start or {}
+
+    for step, timeout in enumerate(timeouts):
+        pending += [c for c in contracts_paths if start.get(get_id(c), 0) == step]
+        if not pending:
+            continue
+        print(f'Timeout {timeout}: {len(pending)} tasks.')
+        step_usages = {}
+        step_outcomes = run_all(pending, timeout, logs_dir, solver, cache_dir, concurrency, step_usages,
+                                memory_limit, memory_budget, peak_rss, journal)
+        peak_rss = {**(peak_rss or {}),
+                    **{id: usage['max_rss'] for id, usage in step_usages.items()}}
+        if usages is not None:
+            for id, usage in step_usages.items():
+                usages[id] = scheduler.add_usage(usages.get(id), usage)
+        outcomes.update(step_outcomes)
+        reached.update({id: timeout for id in step_outcomes})
+        pending = [c for c in pending if step_outcomes[get_id(c)] == UNKNOWN]
+
+    return outcomes, reached
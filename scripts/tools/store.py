@@ -0,0 +1,271 @@
+'''
+SQLite store of the outcomes of every tool on every use case.
+
+Runners write their outcomes to the store as well as to their CSVs, so that
+questions across the benchmark are queries instead of scripts, e.g. the
+strong false negatives of Certora:
+    SELECT usecase, property, version FROM results
+    WHERE tool = 'certora' AND result = 'FN!'
+
+Tables:
+    outcomes(usecase, tool, property, version, outcome, timeout,
+             wall_time, cpu_time, max_rss, updated)
+        usecase is the name of the use case, e.g. contracts/bank (see
+        setup.usecases.UseCase), tool the name of its CSV, e.g. solcmc-z3,
+        certora, halmos, gpt-5. Versions are v1, v2..., also for LLMs.
+    ground_truth(usecase, property, version, truth, footnote)
+    headers(usecase, tool, header)
+        Columns of the CSV of a tool, to export it as it was written.
+    results (view)
+        outcomes with their ground truth, and their confusion matrix result
+        (see report_gen.cm.get_result), e.g. TP!, FN; LLM answers are
+        classified as weak outcomes (TRUE as P, FALSE as N).
+
+The database is in WAL mode, so reports can read it while runners write it.
+The CSVs of the use cases can be imported (import_csv) and regenerated from
+the store (export_csv).
+'''
+
+from pathlib import Path
+import contextlib
+import sqlite3
+import json
+import time
+import csv
+import os
+
+import utils
+
+
+DEFAULT_STORE = Path(os.environ.get('CVB_RESULTS_DB', Path(__file__).parents[2].joinpath('results.db')))
+GROUND_TRUTH_FILE = 'ground-truth.csv'
+LLM_HEADER = ['property_id', 'contract_id', 'llm_answer']   # version without v
+BUSY_TIMEOUT = 60   # seconds waited for a concurrent writer
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outcomes (
+    usecase TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    property TEXT NOT NULL,
+    version TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    timeout TEXT,
+    wall_time REAL,
+    cpu_time REAL,
+    max_rss INTEGER,
+    updated REAL,
+    PRIMARY KEY (usecase, tool, property, version)
+);
+CREATE INDEX IF NOT EXISTS outcomes_tool ON outcomes (tool, outcome);
+CREATE INDEX IF NOT EXISTS outcomes_task ON outcomes (property, version);
+
+CREATE TABLE IF NOT EXISTS ground_truth (
+    usecase TEXT NOT NULL,
+    property TEXT NOT NULL,
+    version TEXT NOT NULL,
+    truth TEXT NOT NULL,
+    footnote TEXT,
+    PRIMARY KEY (usecase, property, version)
+);
+
+CREATE TABLE IF NOT EXISTS headers (
+    usecase TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    header TEXT NOT NULL,
+    PRIMARY KEY (usecase, tool)
+);
+
+CREATE VIEW IF NOT EXISTS results AS
+SELECT o.usecase, o.tool, o.property, o.version, o.outcome, g.truth,
+    CASE
+        WHEN g.truth IS NULL THEN NULL
+        WHEN o.outcome IN ('P', 'P!', 'TRUE') THEN
+            (CASE g.truth WHEN '0' THEN 'F' ELSE 'T' END) ||
+            (CASE o.outcome WHEN 'TRUE' THEN 'P' ELSE o.outcome END)
+        WHEN o.outcome IN ('N', 'N!', 'FALSE') THEN
+            (CASE g.truth WHEN '0' THEN 'T' ELSE 'F' END) ||
+            (CASE o.outcome WHEN 'FALSE' THEN 'N' ELSE o.outcome END)
+        ELSE o.outcome
+    END AS result,
+    o.timeout, o.wall_time, o.cpu_time, o.max_rss, o.updated
+FROM outcomes o LEFT JOIN ground_truth g USING (usecase, property, version);
+'''
+
+
+def usecase_name(path) -> str:
+    '''
+    Returns:
+        str: Name of the use case in directory path, e.g. contracts/bank.
+    '''
+    path = Path(path).resolve()
+    return f'{path.parent.name}/{path.name}'
+
+
+def open_store(path):
+    '''
+    Returns:
+        Store at path, or a context of None if path is None (e.g.
+        --no-store), to be used in a with statement.
+    '''
+    if path is None:
+        return contextlib.nullcontext()
+    return Store(path)
+
+
+class Store:
+    '''
+    Args:
+        path (str): Database path, created if it does not exist.
+    '''
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def query(self, sql, params=()) -> sqlite3.Cursor:
+        return self.connection.execute(sql, params)
+
+    def put_outcomes(self, usecase, tool, outcomes, timeouts=None, usages=None, header=None):
+        '''
+        Writes the outcomes of a tool, replacing those of the same tasks.
+
+        Args:
+            outcomes (dict): {p_v: outcome}, e.g. {'p1_v1': 'P!'}.
+            timeouts (dict): {p_v: timeout at which the outcome was reached}.
+            usages (dict): {p_v: usage}, see scheduler.Job.usage. Tasks
+                without a usage keep the previous one only if their outcome
+                and timeout did not change, otherwise it is cleared.
+            header (list): Columns of the CSV of the tool, see export_csv.
+                By default, those of out.csv, with the timeout column if
+                timeouts are given or if it was already there.
+        '''
+        if header is None and timeouts is not None:
+            header = utils.OUT_HEADER + [utils.TIMEOUT_COLUMN]
+        now = time.time()
+        rows = []
+        for id, outcome in outcomes.items():
+            p, v = id.rsplit('_', 1)     # properties may contain '_'
+            usage = (usages or {}).get(id) or {}
+            rows.append((usecase, tool, p, v, outcome, (timeouts or {}).get(id),
+                         usage.get('wall_time'), usage.get('cpu_time'), usage.get('max_rss'), now))
+
+        # A usage belongs to the run that reached the outcome: it is kept only
+        # if the outcome is written again unchanged, e.g. by import_csv
+        same = 'excluded.outcome = outcome AND excluded.timeout IS timeout'
+        with self.connection:
+            self.connection.executemany(f'''
+                INSERT INTO outcomes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (usecase, tool, property, version) DO UPDATE SET
+                    outcome = excluded.outcome,
+                    timeout = excluded.timeout,
+                    wall_time = CASE WHEN {same} THEN coalesce(excluded.wall_time, wall_time) ELSE excluded.wall_time END,
+                    cpu_time = CASE WHEN {same} THEN coalesce(excluded.cpu_time, cpu_time) ELSE excluded.cpu_time END,
+                    max_rss = CASE WHEN {same} THEN coalesce(excluded.max_rss, max_rss) ELSE excluded.max_rss END,
+                    updated = excluded.updated''', rows)
+            if header is None:
+                self.connection.execute('INSERT OR IGNORE INTO headers VALUES (?, ?, ?)',
+                                        (usecase, tool, json.dumps(utils.OUT_HEADER)))
+            else:
+                self.connection.execute('INSERT OR REPLACE INTO headers VALUES (?, ?, ?)',
+                                        (usecase, tool, json.dumps(header)))
+
+    def put_usecase(self, usecase_dir, tool, outcomes, timeouts=None, usages=None, header=None):
+        '''
+        Writes the outcomes of a tool on the use case in usecase_dir (see
+        put_outcomes), and its ground truth, so that they are classified in
+        the results view.
+        '''
+        usecase = usecase_name(usecase_dir)
+        ground_truth_path = Path(usecase_dir).joinpath(GROUND_TRUTH_FILE)
+        if ground_truth_path.is_file():
+            self.import_csv(ground_truth_path, usecase)
+        self.put_outcomes(usecase, tool, outcomes, timeouts, usages, header)
+
+    def put_ground_truth(self, usecase, rows):
+        '''
+        Args:
+            rows (list): [[property, version, truth, footnote], ...], footnote
+                is optional.
+        '''
+        with self.connection:
+            self.connection.executemany('''
+                INSERT OR REPLACE INTO ground_truth VALUES (?, ?, ?, ?, ?)''',
+                [(usecase, row[0], row[1], row[2], row[3] if len(row) > 3 and row[3] else None)
+                 for row in rows])
+
+    def import_csv(self, path, usecase=None, tool=None) -> int:
+        '''
+        Imports a CSV of a use case: the ground truth, the outcomes of a tool
+        (property,version,outcome[,timeout]) or the answers of an LLM
+        (property_id,contract_id,llm_answer[,...]).
+
+        Args:
+            usecase (str): By default, the name of the directory of path.
+            tool (str): By default, the name of path, e.g. certora.
+
+        Returns:
+            int: Number of rows imported, or None if the CSV has another format.
+        '''
+        path = Path(path)
+        usecase = usecase or usecase_name(path.parent)
+        rows = [row for row in utils.read_csv(path) if row and not row[0].startswith('#')]
+        if not rows:
+            return 0
+        header, rows = rows[0], [row for row in rows[1:] if len(row) >= 3]
+
+        if path.name == GROUND_TRUTH_FILE:
+            self.put_ground_truth(usecase, rows)
+            return len(rows)
+
+        tool = tool or path.stem
+        if header[:3] == LLM_HEADER:
+            # In the order of the file, e.g. a sample of the tasks
+            self.put_outcomes(usecase, tool, {f'{p}_v{v}': answer for p, v, answer, *_ in rows},
+                              header=LLM_HEADER)
+        elif header[:2] == utils.OUT_HEADER[:2]:
+            with_timeouts = len(header) > 3 and header[3] == utils.TIMEOUT_COLUMN
+            self.put_outcomes(usecase, tool, {f'{p}_{v}': outcome for p, v, outcome, *_ in rows},
+                              {f'{row[0]}_{row[1]}': row[3] or None for row in rows if len(row) > 3}
+                              if with_timeouts else None)
+        else:
+            return None
+        return len(rows)
+
+    def export_csv(self, usecase, tool, path):
+        '''
+        Writes the outcomes of a tool to a CSV, with the columns it was
+        written with: sorted like utils.write_csv for out.csv columns, in the
+        order they were written for LLM answers.
+
+        Returns:
+            int: Number of rows written.
+        '''
+        row = self.query('SELECT header FROM headers WHERE usecase = ? AND tool = ?', (usecase, tool)).fetchone()
+        header = json.loads(row[0]) if row else utils.OUT_HEADER
+        outcomes = self.query('''
+            SELECT property, version, outcome, timeout FROM outcomes
+            WHERE usecase = ? AND tool = ? ORDER BY rowid''', (usecase, tool)).fetchall()
+
+        if header == LLM_HEADER:
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file, lineterminator='\n')
+                writer.writerow(header)
+                writer.writerows([p, v.removeprefix('v'), outcome] for p, v, outcome, _ in outcomes)
+        else:
+            with_timeouts = utils.TIMEOUT_COLUMN in header
+            utils.write_csv(path, [header] + [[p, v, outcome] + ([timeout or ''] if with_timeouts else [])
+                                              for p, v, outcome, timeout in outcomes])
+        return len(outcomes)
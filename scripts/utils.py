@@ -8,6 +8,9 @@ import re
 import os
 
 OUT_HEADER = ['property', 'version', 'outcome']     # outcome in P,P!,N,N!
+TIMEOUT_COLUMN = 'timeout'      # optional, timeout at which the outcome was reached
+TIMINGS_FILE = 'timings.csv'    # next to out.csv
+TIMINGS_HEADER = ['property', 'version', 'wall_time', 'cpu_time', 'max_rss']    # s, s, KiB
 
 WEAK_POSITIVE = 'P'
 WEAK_NEGATIVE = 'N'
@@ -16,6 +19,7 @@ STRONG_NEGATIVE = 'N!'
 NONDEFINABLE = 'ND'
 UNKNOWN = 'UNK'
 ERROR = 'ERR'
+OUT_OF_MEMORY = 'OOM'   # killed or failed for lack of memory
 
 
 def write_log(path, log):
@@ -37,6 +41,145 @@ def read_csv(path):
                 rows.append(row)
     return rows
 
+def update_out_csv(path, outcomes, timeouts=None):
+    """
+    Writes outcomes to an out.csv file, keeping the existing rows of the
+    verification tasks that are not in outcomes.
+
+    Args:
+        path (str): out.csv path.
+        outcomes (dict): {p_v: outcome}, e.g. {'p1_v1': 'P!'}
+        timeouts (dict): {p_v: timeout}, timeout at which each outcome was
+            reached, written to the timeout column.
+    """
+    existing_rows = read_csv(path)
+    with_timeouts = (timeouts is not None or
+                     (existing_rows and TIMEOUT_COLUMN in existing_rows[0]))
+
+    out_csv = [OUT_HEADER + [TIMEOUT_COLUMN] if with_timeouts else OUT_HEADER]
+    verification_tasks = []
+    for id, outcome in outcomes.items():
+        p, v = id.rsplit('_', 1)     # properties may contain '_'
+        row = [p, v, outcome]
+        if with_timeouts:
+            row.append((timeouts or {}).get(id, ''))
+        out_csv.append(row)
+        verification_tasks.append([p, v])
+
+    for existing_row in existing_rows:
+        existing_verification_task = existing_row[:2]
+        if existing_verification_task in verification_tasks:
+            continue
+        if existing_verification_task == OUT_HEADER[:2]:
+            continue
+        if with_timeouts and len(existing_row) == len(OUT_HEADER):
+            existing_row.append('')
+        out_csv.append(existing_row)
+
+    write_csv(path, out_csv)
+
+
+def update_timings_csv(path, usages):
+    """
+    Writes the resource usage of verification tasks to a timings.csv file,
+    keeping the existing rows of the tasks that are not in usages.
+
+    Args:
+        path (str): timings.csv path.
+        usages (dict): {p_v: usage}, see scheduler.Job.usage. Missing values
+            (e.g. tools not reporting the peak RSS) are left empty.
+    """
+    timings_csv = [TIMINGS_HEADER]
+    verification_tasks = []
+    for id, usage in usages.items():
+        p, v = id.rsplit('_', 1)     # properties may contain '_'
+        wall_time, cpu_time, max_rss = (usage.get(k) for k in TIMINGS_HEADER[2:])
+        timings_csv.append([p, v,
+                            '' if wall_time is None else f'{wall_time:.3f}',
+                            '' if cpu_time is None else f'{cpu_time:.3f}',
+                            '' if max_rss is None else max_rss])
+        verification_tasks.append([p, v])
+
+    for existing_row in read_csv(path):
+        if existing_row[:2] not in verification_tasks + [TIMINGS_HEADER[:2]]:
+            timings_csv.append(existing_row)
+
+    write_csv(path, timings_csv)
+
+
+def parse_timeout(timeout):
+    """
+    Parses a timeout in the format of coreutils timeout: a number with an
+    optional suffix s (default), m, h or d.
+
+    Args:
+        timeout (str): e.g. '30s', '10m', '600'.
+
+    Returns:
+        float: Timeout in seconds.
+
+    Raises:
+        ValueError: If the timeout is not valid.
+    """
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd]?)', str(timeout).strip())
+    if not match:
+        raise ValueError(f'Invalid time interval "{timeout}".')
+    return float(match.group(1)) * units[match.group(2) or 's']
+
+
+def read_peak_rss(path):
+    """
+    Reads the peak RSS of the verification tasks from a timings.csv file.
+
+    Returns:
+        dict: {p_v: max_rss in KiB}, empty if there is no file.
+    """
+    peak_rss = {}
+    for row in read_csv(path)[1:]:
+        if len(row) == len(TIMINGS_HEADER) and row[4]:
+            peak_rss[f'{row[0]}_{row[1]}'] = int(row[4])
+    return peak_rss
+
+
+def parse_memory(memory):
+    """
+    Parses a memory size: a number with an optional suffix K, M (default), G
+    or T, powers of 1024.
+
+    Args:
+        memory (str): e.g. '512M', '8G', '2048'.
+
+    Returns:
+        int: Memory size in KiB.
+
+    Raises:
+        ValueError: If the memory size is not valid.
+    """
+    units = {'K': 1, 'M': 1 << 10, 'G': 1 << 20, 'T': 1 << 30}
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([KMGT]?)B?', str(memory).strip().upper())
+    if not match or float(match.group(1)) == 0:
+        raise ValueError(f'Invalid memory size "{memory}".')
+    return int(float(match.group(1)) * units[match.group(2) or 'M'])
+
+
+def parse_timeouts(timeouts):
+    """
+    Parses a comma separated list of increasing timeouts, e.g. '30s,2m,10m'.
+
+    Returns:
+        list: Timeouts strings, in the order given.
+
+    Raises:
+        ValueError: If a timeout is not valid or timeouts are not increasing.
+    """
+    timeouts = [t.strip() for t in timeouts.split(',') if t.strip()]
+    seconds = [parse_timeout(t) for t in timeouts]
+    if not timeouts or seconds != sorted(set(seconds)):
+        raise ValueError(f'Timeouts must be increasing: "{",".join(timeouts)}".')
+    return timeouts
+
+
 def merge_csvs(path_from, path_to):
     rows_from = read_csv(path_from)
     rows_to = read_csv(path_to)
@@ -71,20 +214,20 @@ def find_custom_run_line(text):
         if line.strip().startswith("/// @custom:run"):
             return line[len("/// @custom:run"):].strip()
 
-def get_contract_name(contract_path):
+def get_contract_name(contract_path, contract_code=None):
     """
     Extracts the contract name from a contract path.
 
     Args:
         contract (str): Contract file path.
+        contract_code (str): Contract code, read from contract_path if None.
 
     Returns:
         str: Contract name.
     """
-    contract_code = ''
-
-    with open(contract_path, 'r') as contract_file:
-        contract_code = contract_file.read()
+    if contract_code is None:
+        with open(contract_path, 'r') as contract_file:
+            contract_code = contract_file.read()
 
     contract_code = remove_comments(contract_code)
 
@@ -100,6 +243,25 @@ def get_contract_name(contract_path):
         return
 
 
+def get_local_imports(contract_path, visited=None):
+    """
+    Returns the set of files transitively imported by a contract through
+    relative imports (e.g. "./lib/IERC20.sol").
+    """
+    visited = set() if visited is None else visited
+    with open(contract_path, 'r') as file:
+        code = file.read()
+
+    for match in re.finditer(r'import\s+(?:[^"\']*from\s+)?["\'](\.[^"\']+)["\']', code):
+        import_path = os.path.normpath(
+                os.path.join(os.path.dirname(contract_path), match.group(1)))
+        if import_path not in visited and os.path.isfile(import_path):
+            visited.add(import_path)
+            get_local_imports(import_path, visited)
+
+    return visited
+
+
 def get_files_in_path(input_path, extensions=None):
     path = Path(input_path)
     if path.is_dir():
@@ -146,24 +308,26 @@ def get_properties(version_path: str, properties_paths: list):
     # Extract base id from base path (e.g. v1)
     version_id = Path(version_path).stem.split('_')[1]
 
+    # Match file names only, directories may contain '_v' (e.g. call_verifier/)
     # Properties associated with the current version
-    version_specific_properties_paths = [p for p in properties_paths if f'_{version_id}.' in p]
+    version_specific_properties_paths = [p for p in properties_paths
+                                         if f'_{version_id}.' in Path(p).name]
 
     # Remove the generic version when there is a specific one
-    version_generic_properties_paths = [p for p in properties_paths if '_v' not in p]
+    version_generic_properties_paths = [p for p in properties_paths if '_v' not in Path(p).name]
     for specific_property_path in version_specific_properties_paths:
 
         property_id = Path(specific_property_path).stem.split('_')[0]
 
         version_generic_properties_paths = [p for p in version_generic_properties_paths
-                                            if (property_id not in p)]
+                                            if (property_id not in Path(p).name)]
 
     return version_specific_properties_paths + version_generic_properties_paths
 
-def has_ground_truth(contract_path, property_path):
+def has_ground_truth(contract_path, property_path, ground_truth_path='ground-truth.csv'):
     version = re.search(r'v(\d+)\.sol', contract_path).group(1)
-    property = property_path.replace(f"_v{version}","").replace("certora/","").replace(".spec","")
-    with open('ground-truth.csv', 'r') as file:
+    property = Path(property_path).stem.replace(f"_v{version}","")
+    with open(ground_truth_path, 'r') as file:
         text = file.read()
         res = f"{property},v{version},0" in text or f"{property},v{version},1" in text
     return res
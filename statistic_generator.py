@@ -1,16 +1,20 @@
 import pandas as pd
 import json
 import os
+import sys
 
 # === INPUT FILE ===
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "scripts"))
+from tools import llm_results
 CSV_RESULTS = os.path.join(SCRIPT_DIR, "llm_property_check_results.csv")
 
 SKELETON_JSON = "./contracts/bank/skeleton.json" # REPLACE HERE  contract_name! i.e. bank
 OUTPUT_FILE = os.path.join(SCRIPT_DIR, "statistics_results.csv")
 
 # === READ FILE ===
-df = pd.read_csv(CSV_RESULTS)
+# Typed columns, cached in a sidecar (see scripts/tools/llm_results.py)
+df = llm_results.load_results(CSV_RESULTS)
 
 # Normalize values
 df["ground_truth"] = df["ground_truth"].astype(str).str.strip().str.upper()